@@ -0,0 +1,284 @@
+"""Virtual-channel and switch allocators for the router backends.
+
+Each router owns one allocator instance, selected with
+``create_mesh(..., allocator=name)``:
+
+``random``
+    The original behaviour: random output VC, random VA and SA winners.
+``separable``
+    Separable input-first allocation.  Every input port picks one of its
+    requesting VCs round-robin, then every output picks one of the
+    requesting input ports round-robin.
+``islip``
+    iSLIP request/grant/accept iterations between input and output ports.
+    Pointers only move on a first-iteration accept.
+``wavefront``
+    Wavefront allocation over the input x output port matrix with a
+    rotating priority diagonal.
+
+Apart from ``random``, the allocators are deterministic and work on integer
+bitmasks.  Output VCs are picked round-robin from ``router.vc_rr`` and VA
+winners round-robin per input port.  A switch request is identified by its
+input slot ``port * num_vcs + vc``.  In a real crossbar an input port sends
+at most one packet per cycle; ``random`` keeps the original model, where
+several VCs of one input port may win different outputs together.
+"""
+
+import random
+
+
+def select_output_vc(router, out_port, allowed=None):
+    """Randomly select an available output VC with credit.
+
+    Only VCs set in ``router.vc_free_masks[out_port]`` (unallocated) and,
+    when given, in the ``allowed`` bitmask are considered.
+    """
+    free = router.vc_free_masks[out_port]
+    if allowed is not None:
+        free &= allowed
+    if not free:
+        return None
+    credits = router.credit_counts[out_port]
+    choices = [
+        vc
+        for vc in router.vc_bits[free]
+        if credits[vc] is None or credits[vc] > 0
+    ]
+    if not choices:
+        return None
+    return random.choice(choices)
+
+
+def arbitrate_va(candidates):
+    """Randomly pick one VC for each output (port, vc) pair."""
+    result = {}
+    for pair, vc_list in candidates.items():
+        result[pair] = random.choice(vc_list)
+    return result
+
+
+def arbitrate_sa(candidates):
+    """Randomly choose one candidate per output port."""
+    selected = []
+    for out_port, lst in candidates.items():
+        selected.append(random.choice(lst))
+    return selected
+
+
+def rr_pick(mask, pointer):
+    """Index of the first set bit of ``mask`` at or after ``pointer``, wrapping."""
+    high = mask >> pointer << pointer
+    if high:
+        mask = high
+    return (mask & -mask).bit_length() - 1
+
+
+class RandomAllocator:
+    """Random VC and switch allocation (the original router behaviour)."""
+
+    name = "random"
+
+    def __init__(self, router=None):
+        self.num_vcs = router.num_vcs if router is not None else 1
+
+    def select_output_vc(self, router, out_port, allowed=None):
+        return select_output_vc(router, out_port, allowed)
+
+    def arbitrate_va(self, port_idx, candidates):
+        """Pick one input VC (or slot) per requested ``(out_port, out_vc)``."""
+        return arbitrate_va(candidates)
+
+    def allocate(self, requests):
+        """Return the winning input slots for ``requests`` (slot -> out_port)."""
+        by_out = {}
+        for slot, out_port in requests.items():
+            by_out.setdefault(out_port, []).append(slot)
+        return [random.choice(slots) for slots in by_out.values()]
+
+
+class RoundRobinAllocator(RandomAllocator):
+    """Round-robin VC allocation shared by the deterministic allocators."""
+
+    def __init__(self, router):
+        super().__init__(router)
+        self.num_ports = router.num_ports
+        # The output VC pointers are the router's ``vc_rr``
+        self.vc_rr = router.vc_rr
+        self.va_rr = [0] * router.num_ports
+        # Per input port pointer choosing among its VCs in switch allocation
+        self.in_rr = [0] * router.num_ports
+
+    def select_output_vc(self, router, out_port, allowed=None):
+        free = router.vc_free_masks[out_port]
+        if allowed is not None:
+            free &= allowed
+        if not free:
+            return None
+        credits = router.credit_counts[out_port]
+        ready = 0
+        for vc in router.vc_bits[free]:
+            if credits[vc] is None or credits[vc] > 0:
+                ready |= 1 << vc
+        if not ready:
+            return None
+        vc = rr_pick(ready, self.vc_rr[out_port])
+        self.vc_rr[out_port] = vc + 1
+        return vc
+
+    def arbitrate_va(self, port_idx, candidates):
+        nv = self.num_vcs
+        pointer = self.va_rr[port_idx]
+        result = {}
+        for pair, inputs in candidates.items():
+            if len(inputs) == 1:
+                winner = inputs[0]
+            else:
+                mask = 0
+                for c in inputs:
+                    mask |= 1 << (c % nv)
+                vc = rr_pick(mask, pointer)
+                winner = next(c for c in inputs if c % nv == vc)
+            result[pair] = winner
+            self.va_rr[port_idx] = winner % nv + 1
+        return result
+
+    def _port_requests(self, requests, by_output=False):
+        """Group ``requests`` into port request masks and per-pair VC masks.
+
+        The masks map input port -> output mask, or output -> input port
+        mask when ``by_output`` is set.
+        """
+        nv = self.num_vcs
+        masks = {}
+        vc_masks = {}
+        for slot, out_port in requests.items():
+            port, vc = divmod(slot, nv)
+            if by_output:
+                masks[out_port] = masks.get(out_port, 0) | 1 << port
+            else:
+                masks[port] = masks.get(port, 0) | 1 << out_port
+            key = (port, out_port)
+            vc_masks[key] = vc_masks.get(key, 0) | 1 << vc
+        return masks, vc_masks
+
+    def _pick_vc(self, vc_masks, port, out_port):
+        vc = rr_pick(vc_masks[(port, out_port)], self.in_rr[port])
+        self.in_rr[port] = vc + 1
+        return port * self.num_vcs + vc
+
+
+class SeparableAllocator(RoundRobinAllocator):
+    """Separable input-first switch allocator with round-robin arbiters."""
+
+    name = "separable"
+
+    def __init__(self, router):
+        super().__init__(router)
+        self.out_rr = [0] * router.num_ports
+
+    def allocate(self, requests):
+        nv = self.num_vcs
+        port_vcs = {}
+        for slot in requests:
+            port, vc = divmod(slot, nv)
+            port_vcs[port] = port_vcs.get(port, 0) | 1 << vc
+        # Input stage: one VC per input port
+        out_ports = {}
+        chosen = {}
+        for port, vcs in port_vcs.items():
+            slot = port * nv + rr_pick(vcs, self.in_rr[port])
+            chosen[port] = slot
+            out_port = requests[slot]
+            out_ports[out_port] = out_ports.get(out_port, 0) | 1 << port
+        # Output stage: one input port per output
+        winners = []
+        for out_port, ports in out_ports.items():
+            port = rr_pick(ports, self.out_rr[out_port])
+            self.out_rr[out_port] = port + 1
+            slot = chosen[port]
+            self.in_rr[port] = slot % nv + 1
+            winners.append(slot)
+        return winners
+
+
+class ISlipAllocator(RoundRobinAllocator):
+    """iSLIP switch allocator between input and output ports."""
+
+    name = "islip"
+
+    def __init__(self, router, iterations=2):
+        super().__init__(router)
+        self.iterations = iterations
+        self.grant_rr = [0] * router.num_ports
+        self.accept_rr = [0] * router.num_ports
+
+    def allocate(self, requests):
+        out_ports, vc_masks = self._port_requests(requests, by_output=True)
+        matched_in = 0
+        matched_out = 0
+        winners = []
+        for iteration in range(self.iterations):
+            grants = {}
+            for out_port, ports in out_ports.items():
+                if matched_out >> out_port & 1:
+                    continue
+                ports &= ~matched_in
+                if ports:
+                    port = rr_pick(ports, self.grant_rr[out_port])
+                    grants[port] = grants.get(port, 0) | 1 << out_port
+            if not grants:
+                break
+            for port, outs in grants.items():
+                out_port = rr_pick(outs, self.accept_rr[port])
+                matched_in |= 1 << port
+                matched_out |= 1 << out_port
+                if iteration == 0:
+                    self.accept_rr[port] = out_port + 1
+                    self.grant_rr[out_port] = port + 1
+                winners.append(self._pick_vc(vc_masks, port, out_port))
+        return winners
+
+
+class WavefrontAllocator(RoundRobinAllocator):
+    """Wavefront switch allocator with a rotating priority diagonal."""
+
+    name = "wavefront"
+
+    def __init__(self, router):
+        super().__init__(router)
+        self.priority = 0
+
+    def allocate(self, requests):
+        port_outs, vc_masks = self._port_requests(requests)
+        n = self.num_ports
+        offset = self.priority
+        self.priority = (offset + 1) % n
+        free_out = (1 << n) - 1
+        winners = []
+        pending = dict(port_outs)
+        for k in range(n):
+            if not pending:
+                break
+            diagonal = (offset + k) % n
+            for port in list(pending):
+                out_port = (port + diagonal) % n
+                if pending[port] >> out_port & 1 and free_out >> out_port & 1:
+                    free_out &= ~(1 << out_port)
+                    del pending[port]
+                    winners.append(self._pick_vc(vc_masks, port, out_port))
+        return winners
+
+
+ALLOCATORS = {
+    "random": RandomAllocator,
+    "separable": SeparableAllocator,
+    "islip": ISlipAllocator,
+    "wavefront": WavefrontAllocator,
+}
+
+
+def make_allocator(name, router):
+    """Instantiate the allocator called ``name`` for ``router``."""
+    if name not in ALLOCATORS:
+        raise ValueError(f"unknown allocator {name!r}")
+    return ALLOCATORS[name](router)
@@ -0,0 +1,252 @@
+"""Analytical queueing-model NoC for fast design-space sweeps.
+
+:class:`AnalyticMesh` never simulates router pipelines.  A packet handed to
+a router view is delivered to the destination endpoint after::
+
+    (hops + 1) * (pipeline_delay + 1) + sum(M/D/1 wait of each link)
+
+cycles.  The first term is the zero-load latency of
+:class:`~sim_core.router.Router`: every router on the XY path takes
+``pipeline_delay`` stage cycles plus one cycle of link traversal.  The
+second term treats each network link as an M/D/1 queue with a one-cycle
+service time.  Its utilisation comes from an exponentially weighted
+arrival rate tracked online per link; saturated links fall back to the
+backlog of a deterministic queue.  The ejection port is modelled the same
+way with the two-cycle service time of its single VC, and each endpoint
+injects at most one packet per cycle.  A packet of ``f`` flits of
+``bitwidth`` bits adds ``f - 1`` cycles of serialization to its latency and
+to the service time of every link it crosses.  A multicast packet is
+injected once and charged each destination's own path; shared tree links are
+not merged.
+
+The model holds while every ejection port keeps up with the packets sent
+to it.  Once one is oversubscribed, for instance a hotspot taking more than
+one packet per ``eject_service`` cycles, the detailed routers suffer tree
+saturation.  Packets for the hotspot fill the buffers on their way and the
+single injection VC of every source sending to it, and traffic to other
+destinations waits behind them.  The model still charges hotspot packets
+their ejection backlog but leaves other traffic at its own links' waits, so
+it underestimates the mean latency.  A destination whose ejection backlog
+exceeds ``saturation_backlog`` cycles is added to
+:attr:`AnalyticMesh.saturated`.  Results of a run that sets it are out of
+the model's range; ``tests/test_traffic/validate_analytic.py`` checks the
+rest against a detailed backend.
+"""
+
+from .module import HardwareModule
+from .event import Event
+from .router import DIR_INDEX, OPPOSITE, packet_flits
+from .routing import RoutingTable
+
+
+def md1_wait(rho, service=1.0):
+    """Mean queueing delay of an M/D/1 server at utilisation ``rho``."""
+    return rho * service / (2.0 * (1.0 - rho))
+
+
+class AnalyticRouter(HardwareModule):
+    """Per-router endpoint facade over :class:`AnalyticMesh`."""
+
+    multicast = True
+
+    def __init__(self, mesh, mesh_x, mesh_y):
+        super().__init__(mesh.engine, f"Router_{mesh_x}_{mesh_y}", mesh.mesh_info,
+                         mesh.buffer_capacity, mesh.frequency)
+        self.mesh = mesh
+        self.x = mesh_x
+        self.y = mesh_y
+        self.num_ports = 5
+        self.num_vcs = mesh.num_vcs
+        self.port_num_vcs = [1] + [mesh.num_vcs] * (self.num_ports - 1)
+        self.pipeline_delay = mesh.pipeline_delay
+        self.output_links = [(None, None) for _ in range(self.num_ports)]
+        self.neighbors = {}
+        self.attached_module = None
+
+    def set_neighbors(self, neighbor_dict):
+        self.neighbors = neighbor_dict
+        for d, n in neighbor_dict.items():
+            self.output_links[DIR_INDEX[d]] = (n, DIR_INDEX[OPPOSITE[d]])
+
+    def attach_module(self, mod):
+        self.attached_module = mod
+        self.output_links[DIR_INDEX["LOCAL"]] = (mod, None)
+
+    def _reserve_slot(self, event=None):
+        # Injection backpressure is folded into the analytical latency
+        return True
+
+    def _release_slot(self, payload):
+        pass
+
+    def _process_event(self, event):
+        logger = self.engine.logger
+        if logger and logger.accepts(self.engine.current_cycle, self.name, event.event_type):
+            logger.log_event(self.engine.current_cycle, self.name, "P0_IN", event.event_type)
+        self.handle_event(event)
+
+    def handle_event(self, event):
+        if event.event_type == "RETRY_SEND":
+            super().handle_event(event)
+            return
+        if event.event_type == "RECV_CRED":
+            return
+        if event.event_type == "NOC_DELIVER":
+            self.mesh.deliver(self, event.payload["event"])
+            return
+        self.mesh.route(self, event)
+
+
+class AnalyticMesh:
+    """Latency model shared by all :class:`AnalyticRouter` views.
+
+    ``load_window`` is the time constant (in cycles) of the per-link arrival
+    rate estimate and ``max_utilization`` caps the utilisation fed to the
+    M/D/1 formula so saturated links report a large but finite wait.
+    ``saturation_backlog`` (default ``load_window``) is the ejection backlog
+    past which a destination counts as oversubscribed.
+    """
+
+    def __init__(self, engine, x_size, y_size, mesh_info, buffer_capacity=4,
+                 num_vcs=2, frequency=1000, pipeline_delay=4,
+                 load_window=64, max_utilization=0.95, bitwidth=256,
+                 saturation_backlog=None):
+        self.engine = engine
+        self.mesh_info = mesh_info
+        self.x_size = x_size
+        self.y_size = y_size
+        self.buffer_capacity = buffer_capacity
+        self.num_vcs = num_vcs
+        self.frequency = frequency
+        self.pipeline_delay = pipeline_delay
+        self.bitwidth = bitwidth
+        self.decay = 1.0 - 1.0 / load_window
+        self.max_utilization = max_utilization
+        # (x, y, out_port) -> [arrival rate, cycle of last update, cycle the
+        # deterministic queue drains]
+        self.link_load = {}
+        self.next_inject = {}
+        # An output VC is held from VA until ST (two cycles), so a port with
+        # ``n`` VCs accepts a packet every ``2 / n`` cycles, at best one.
+        self.link_service = max(1.0, 2.0 / num_vcs)
+        self.eject_service = 2.0
+        self.saturation_backlog = load_window if saturation_backlog is None else saturation_backlog
+        # Destinations whose ejection port fell behind, see the module docstring
+        self.saturated = set()
+        self.delivered = 0
+        self.routers = {(x, y): AnalyticRouter(self, x, y)
+                        for x in range(x_size) for y in range(y_size)}
+        self.set_routing(RoutingTable(self.routers, "xy"))
+
+    def set_routing(self, routing):
+        """Follow the deterministic :class:`~sim_core.routing.RoutingTable` ``routing``."""
+        if not routing.deterministic:
+            raise ValueError(
+                f"analytic mesh only supports deterministic routing, not {routing.algorithm!r}")
+        self.routing = routing
+        self._paths = {}
+
+    def _link_wait(self, link, cycle, service=1.0):
+        """Record an arrival on ``link`` at ``cycle`` and return its wait.
+
+        The wait is the M/D/1 mean for the current utilisation estimate or,
+        once arrivals outpace the link, the backlog of a deterministic
+        single-server queue, whichever is larger.
+        """
+        state = self.link_load.get(link)
+        if state is None:
+            state = [0.0, cycle, 0.0]
+            self.link_load[link] = state
+        rate, last, free_at = state
+        if cycle > last:
+            rate *= self.decay ** (cycle - last)
+            state[1] = cycle
+        rho = min(rate * service, self.max_utilization)
+        state[0] = rate + (1.0 - self.decay)
+        backlog = max(0.0, free_at - cycle)
+        state[2] = max(free_at, cycle) + service
+        return max(md1_wait(rho, service), backlog)
+
+    def path(self, src, dst):
+        """Return the ``(x, y, out_port)`` network links from ``src`` to ``dst``."""
+        key = (src, dst)
+        links = self._paths.get(key)
+        if links is not None:
+            return links
+        links = []
+        x, y = src
+        while (x, y) != tuple(dst):
+            router = self.routers[(x, y)]
+            port = self.routing.next_port((x, y), dst)
+            links.append((x, y, port))
+            n, _ = router.output_links[port]
+            x, y = n.x, n.y
+        self._paths[key] = links
+        return links
+
+    def latency(self, src, dst, cycle, flits=1):
+        """Analytical router-arrival to endpoint latency for one packet.
+
+        Link state is sampled at ``cycle`` rather than at the (later) hop
+        times so every link sees its arrivals in time order.  Body flits
+        hold every link ``flits - 1`` cycles longer.
+        """
+        links = self.path(src, dst)
+        body = flits - 1
+        t = (len(links) + 1) * (self.pipeline_delay + 1) + body
+        for link in links:
+            t += self._link_wait(link, cycle, self.link_service + body)
+        wait = self._link_wait((dst[0], dst[1], 0), cycle, self.eject_service + body)
+        if wait > self.saturation_backlog:
+            self.saturated.add(tuple(dst))
+        return t + wait
+
+    def route(self, router, event):
+        now = self.engine.current_cycle
+        dst = event.payload.get("dst_coords")
+        if dst is None:
+            raise ValueError(f"[{router.name}] dst_coords missing in payload")
+        src = (router.x, router.y)
+        flits = packet_flits(event.data_size, self.bitwidth)
+        start = max(now, self.next_inject.get(src, now))
+        self.next_inject[src] = start + flits
+        dsts = event.payload.get("dst_set") or (dst,)
+        for i, dst in enumerate(dsts):
+            pkt = event
+            if i:
+                pkt = Event(src=event.src, dst=event.dst, cycle=event.cycle,
+                            data_size=event.data_size, program=event.program,
+                            event_type=event.event_type, payload=dict(event.payload))
+            dst = tuple(dst)
+            if len(dsts) > 1:
+                pkt.payload["dst_set"] = (dst,)
+                pkt.payload["dst_coords"] = dst
+            # Links are sampled at ``now`` so each one sees arrivals in time order
+            latency = self.latency(src, dst, now, flits)
+            arrive = start + max(1, int(round(latency)))
+
+            # Hand over one cycle early so the endpoint reserves its buffer at
+            # the same point a router's switch traversal would.
+            target = self.routers[dst]
+            self.engine.push_event(Event(
+                src=target,
+                dst=target,
+                cycle=arrive - 1,
+                event_type="NOC_DELIVER",
+                payload={"event": pkt},
+                priority=-3,
+            ))
+
+    def deliver(self, router, event):
+        event.payload["input_port"] = 0
+        event.payload["vc"] = 0
+        self.delivered += 1
+        router.send_event(Event(
+            src=router,
+            dst=router.attached_module,
+            cycle=self.engine.current_cycle + 1,
+            data_size=event.data_size,
+            program=event.program,
+            event_type=event.event_type,
+            payload=event.payload,
+        ))
@@ -11,6 +11,8 @@ class SimulatorEngine:
         self.module_times = {}
         self.module_cycles = {}
         self.logger = None
+        # Event being handled, for modules that need its place in the queue
+        self.current_event = None
         self._order = 0
     
     def register_module(self, module):
@@ -49,6 +51,7 @@ class SimulatorEngine:
             self.module_cycles[event.dst.name] = cycle
             self.module_times[event.dst.name] = event_time
             self.current_cycle = cycle
+        self.current_event = event
         event.handle()
 
     def run_until_idle(self, max_tick=None):
@@ -0,0 +1,408 @@
+from collections import defaultdict
+
+from .module import HardwareModule
+from .event import Event
+from .allocators import RandomAllocator
+from .router import (
+    DIRS,
+    DIR_INDEX,
+    OPPOSITE,
+    Router,
+    mask_bits,
+    local_port_ids,
+    multicast_branches,
+    multicast_input_port,
+    packet_flits,
+    xy_route,
+)
+
+
+class FlatRouter(HardwareModule):
+    """Router with :class:`Router` timing but no per-port/per-VC sub-modules.
+
+    Buffer, VA, SA and ST state lives in flat per-router lists indexed by
+    ``port * num_vcs + vc`` and all four stages advance in a single
+    ``ROUTER_TICK`` event per active cycle.  Stages are evaluated in reverse
+    pipeline order (ST, SA, VA, RC) so a packet moves at most one stage per
+    cycle, giving the same RC -> VA -> SA -> ST hop latency as :class:`Router`.
+    Credits returned by a downstream router later in the same cycle re-run VA
+    for the heads that were waiting on them, as the reference model does.
+    """
+
+    STAGE_NAMES = Router.STAGE_NAMES
+    multicast = True
+
+    def __init__(self, engine, name, mesh_x, mesh_y, mesh_info,
+                 bitwidth=256, pipeline_delay=4,
+                 num_ports=5, num_vcs=2, buffer_capacity=4, frequency=1000,
+                 num_local_ports=1):
+        super().__init__(engine, name, mesh_info, buffer_capacity, frequency)
+        self.x = mesh_x
+        self.y = mesh_y
+        self.bitwidth = bitwidth
+        self.pipeline_delay = pipeline_delay
+        self.local_ports = local_port_ids(num_local_ports)
+        num_ports = max(num_ports, len(DIRS) + num_local_ports - 1)
+        self.num_ports = num_ports
+        self.num_vcs = num_vcs
+        self.port_num_vcs = [1 if i in self.local_ports else num_vcs
+                             for i in range(num_ports)]
+
+        # output side resources
+        self.output_links = [(None, None) for _ in range(num_ports)]
+        self.output_vc_allocation = [[None for _ in range(self.port_num_vcs[i])]
+                                     for i in range(num_ports)]
+        self.vc_rr = [0 for _ in range(num_ports)]
+        self.crossbar_busy = [False for _ in range(num_ports)]
+        # out_port -> (release cycle, in_port, in_vc, out_vc) of multi-flit packets
+        self.held_outputs = {}
+        self.vc_free_masks = [(1 << n) - 1 for n in self.port_num_vcs]
+        self.vc_bits = mask_bits(max(self.port_num_vcs))
+        self.credit_counts = [[None for _ in range(self.port_num_vcs[i])]
+                              for i in range(num_ports)]
+        self.neighbors = {}
+        self.attached_module = None
+        self.module_ports = {}
+        self.routing = None
+        self.route_table = None
+        self.stall_cycles = defaultdict(int)
+        self.noc_stats = None
+        self.trace = None
+        self.allocator = RandomAllocator(self)
+        self.lookahead = False
+        self.bypass = False
+        self.traffic_classes = None
+
+        # input side state, one slot per (port, vc)
+        slots = num_ports * num_vcs
+        self.input_ids = [p * num_vcs + v
+                          for p in range(num_ports)
+                          for v in range(self.port_num_vcs[p])]
+        # Queues hold at most ``buffer_capacity`` packets, so plain lists
+        # are smaller than deques and as fast
+        self.rc_queues = [[] for _ in range(slots)]  # (arrival, event)
+        self.va_queues = [[] for _ in range(slots)]
+        self.sa_queues = [[] for _ in range(slots)]
+        self.st_queues = [[] for _ in range(num_ports)]
+        self.packets = 0  # packets currently inside the router
+        self._next_tick = -1
+        self._free_ticks = []  # handled ROUTER_TICK events for reuse
+        self._tick_cycle = None
+        self._va_blocked = []
+        self._log_stages = None
+
+    # ------------------------------------------------------------------
+    # basic infrastructure overrides
+    def _process_event(self, event):
+        """Router delays releasing reserved slot until packet leaves."""
+        logger = self.engine.logger
+        if (
+            event.event_type != "ROUTER_TICK"
+            and logger
+            and logger.accepts(self.engine.current_cycle, self.name, event.event_type)
+        ):
+            port = event.payload.get("input_port", 0)
+            logger.log_event(self.engine.current_cycle, self.name, f"P{port}_IN",
+                             event.event_type)
+        self.handle_event(event)
+
+    def _reserve_slot(self, event=None):
+        """Check downstream VC buffer capacity before accepting packet."""
+        if event is None:
+            return True
+        if self.module_ports and event.src in self.module_ports:
+            event.payload["input_port"] = self.module_ports[event.src]
+        port = event.payload.get("input_port", 0)
+        vc = event.payload.get("vc", 0)
+        slot = port * self.num_vcs + vc
+        count = (
+            len(self.rc_queues[slot])
+            + len(self.va_queues[slot])
+            + len(self.sa_queues[slot])
+        )
+        if self.noc_stats is not None:
+            self.noc_stats.record_occupancy(self.x, self.y, port, vc, count)
+        return count < self.buffer_capacity
+
+    def _release_slot(self, payload):
+        """Increment credit count when receiving a credit return."""
+        port = payload.get("port")
+        if port is not None:
+            self._return_credit(port, payload.get("vc", 0))
+
+    def _return_credit(self, port, vc):
+        """Return one credit of output ``port``/``vc`` without an event."""
+        Router._return_credit(self, port, vc)
+        if self._va_blocked and self._tick_cycle == self.engine.current_cycle:
+            # Downstream ST ran after our tick this cycle; the reference
+            # model always sees such credits in VA.
+            blocked = self._va_blocked
+            self._va_blocked = []
+            self._stage_va(blocked, retry=True)
+
+    # ------------------------------------------------------------------
+    def set_neighbors(self, neighbor_dict):
+        self.neighbors = neighbor_dict
+        for d, n in neighbor_dict.items():
+            out_port = DIR_INDEX[d]
+            in_port = DIR_INDEX[OPPOSITE[d]]
+            self.output_links[out_port] = (n, in_port)
+            vc_count = self.port_num_vcs[out_port]
+            self.credit_counts[out_port] = [n.buffer_capacity for _ in range(vc_count)]
+
+    attach_module = Router.attach_module
+
+    _forward = Router._forward
+    _release_output = Router._release_output
+    _record_credit_stall = Router._record_credit_stall
+    _record_sa_conflicts = Router._record_sa_conflicts
+    _allocate_vc = Router._allocate_vc
+    _free_vc = Router._free_vc
+    set_pipeline = Router.set_pipeline
+    _set_lookahead = Router._set_lookahead
+    _bypass_vc = Router._bypass_vc
+    _take_output = Router._take_output
+    _take_escape = Router._take_escape
+
+    def _schedule_tick(self, cycle):
+        if cycle <= self._next_tick:
+            return
+        self._next_tick = cycle
+        if self._free_ticks:
+            evt = self._free_ticks.pop()
+            evt.cycle = cycle
+        else:
+            evt = Event(src=self, dst=self, cycle=cycle,
+                        event_type="ROUTER_TICK", priority=-3)
+        self.engine.push_event(evt)
+
+    def handle_event(self, event):
+        etype = event.event_type
+        if etype == "ROUTER_TICK":
+            self._free_ticks.append(event)
+            if event.cycle >= self._next_tick:
+                # Float event times can run a tick a cycle before its label,
+                # so the next request must not be mistaken for this one
+                self._next_tick = -1
+            self._tick()
+            return
+        if etype == "RECV_CRED":
+            self._release_slot(event.payload)
+            return
+        if etype == "RETRY_SEND":
+            super().handle_event(event)
+            return
+
+        # incoming packet is queued to the appropriate input VC
+        now = self.engine.current_cycle
+        port = event.payload.get("input_port", 0)
+        vc = event.payload.get("vc", 0)
+        slot = port * self.num_vcs + vc
+        if port in self.local_ports:
+            if self.trace is not None:
+                self.trace.record_injection(self, port, event)
+        elif self.lookahead and self._skip_rc(slot, event):
+            self.packets += 1
+            self._schedule_tick(now + 1)
+            return
+        self.rc_queues[slot].append((now, event))
+        self.packets += 1
+        self._schedule_tick(now + 1)
+
+    def _skip_rc(self, slot, event):
+        """Queue a packet routed upstream for VA, or for ST when bypassing."""
+        payload = event.payload
+        out_port = payload.get("lookahead_port")
+        if out_port is None or "dst_set" in payload or self.rc_queues[slot]:
+            return False
+        payload["out_port"] = out_port
+        if self.bypass and not self.packets:
+            out_vc = self._bypass_vc(out_port, event)
+            if out_vc is not None:
+                self._take_output(out_port, out_vc, event)
+                self.st_queues[out_port].append(event)
+                return True
+        if len(self.va_queues[slot]) >= self.buffer_capacity:
+            return False
+        self._set_lookahead(payload, out_port)
+        self.va_queues[slot].append(event)
+        return True
+
+    # ------------------------------------------------------------------
+    def _tick(self):
+        now = self.engine.current_cycle
+        self._tick_cycle = now
+        logger = self.engine.logger
+        if logger and logger.accepts(now, self.name, "ROUTER_TICK"):
+            self._log_stages = []
+        if self.held_outputs:
+            self._release_outputs(now)
+        self._stage_st()
+        self._stage_sa()
+        self._va_blocked = []
+        self._stage_va(self.input_ids)
+        self._stage_rc(now)
+        if self._log_stages is not None:
+            for label in self._log_stages:
+                logger.log_event(now, self.name, label, "ROUTER_TICK")
+            self._log_stages = None
+        if self.packets or self.held_outputs:
+            self._schedule_tick(now + 1)
+
+    def _release_outputs(self, now):
+        """Free the outputs whose multi-flit packet's tail leaves this cycle."""
+        for out_port, (cycle, *hold) in list(self.held_outputs.items()):
+            if cycle <= now:
+                del self.held_outputs[out_port]
+                self._release_output(out_port, *hold)
+
+    def _log(self, port, stage):
+        self._log_stages.append(f"P{port}_{self.STAGE_NAMES[stage]}")
+
+    def _stage_rc(self, now):
+        cap = self.buffer_capacity
+        for slot in self.input_ids:
+            q = self.rc_queues[slot]
+            if not q or q[0][0] >= now:
+                continue
+            event = q[0][1]
+            dst_coords = event.payload.get("dst_coords")
+            if dst_coords is None:
+                raise ValueError(f"[{self.name}] dst_coords missing in payload")
+            if "dst_set" in event.payload:
+                self._route_multicast(slot, event)
+                continue
+            if self.routing is not None:
+                event.payload["out_port"] = self.routing.route(self, event.payload)
+            else:
+                event.payload["out_port"] = xy_route(self, dst_coords)
+            if self.lookahead:
+                self._set_lookahead(event.payload, event.payload["out_port"])
+            if self._log_stages is not None:
+                self._log(slot // self.num_vcs, Router.RC)
+            if len(self.va_queues[slot]) >= cap:
+                continue
+            q.pop(0)
+            self.va_queues[slot].append(event)
+
+    def _route_multicast(self, slot, event):
+        if self._log_stages is not None:
+            self._log(slot // self.num_vcs, Router.RC)
+        if len(self.va_queues[slot]) >= self.buffer_capacity:
+            return
+        self.rc_queues[slot].pop(0)
+        branches = multicast_branches(self, event)
+        self.va_queues[slot].extend(branches)
+        self.packets += len(branches) - 1
+
+    def _stage_va(self, slots, retry=False):
+        nv = self.num_vcs
+        cap = self.buffer_capacity
+        start = 0
+        # Inputs are grouped per port; each port arbitrates its VCs together
+        while start < len(slots):
+            port = slots[start] // nv
+            end = start
+            while end < len(slots) and slots[end] // nv == port:
+                end += 1
+            candidates = {}
+            for slot in slots[start:end]:
+                q = self.va_queues[slot]
+                if not q:
+                    continue
+                pkt = q[0]
+                out_port = pkt.payload["out_port"]
+                allowed = None
+                if self.routing is not None:
+                    allowed = self.routing.allowed_vcs(self, pkt.payload, out_port)
+                if self.traffic_classes is not None:
+                    allowed = self.traffic_classes.allowed_vcs(self, pkt, out_port, allowed)
+                out_vc = self.allocator.select_output_vc(self, out_port, allowed)
+                if out_vc is None and allowed is not None and self.routing.escape_class is not None:
+                    out_port, out_vc = self._take_escape(pkt)
+                if out_vc is None:
+                    self._va_blocked.append(slot)
+                    if retry:
+                        continue
+                    key = (pkt.program, pkt.payload.get("stream_id"), "noc_credit")
+                    self.stall_cycles[key] += 1
+                    if self.noc_stats is not None:
+                        self._record_credit_stall(out_port)
+                    continue
+                candidates.setdefault((out_port, out_vc), []).append(slot)
+            if candidates and self._log_stages is not None:
+                self._log(port, Router.VA)
+            chosen = self.allocator.arbitrate_va(port, candidates)
+            for (out_port, out_vc), slot in chosen.items():
+                if len(self.sa_queues[slot]) >= cap:
+                    continue
+                pkt = self.va_queues[slot].pop(0)
+                self._allocate_vc(out_port, out_vc, pkt)
+                pkt.payload["out_vc"] = out_vc
+                if self.credit_counts[out_port][out_vc] is not None:
+                    self.credit_counts[out_port][out_vc] -= 1
+                self.sa_queues[slot].append(pkt)
+            start = end
+
+    def _stage_sa(self):
+        requests = {}
+        for slot in self.input_ids:
+            q = self.sa_queues[slot]
+            if not q:
+                continue
+            out_port = q[0].payload["out_port"]
+            if self.crossbar_busy[out_port]:
+                continue
+            requests[slot] = out_port
+
+        if self.noc_stats is not None:
+            self._record_sa_conflicts(requests)
+        if self.traffic_classes is not None:
+            winners = self.allocator.allocate(self.traffic_classes.prioritize(self, requests))
+            self.traffic_classes.served(self, winners)
+        else:
+            winners = self.allocator.allocate(requests)
+        for slot in winners:
+            evt = self.sa_queues[slot].pop(0)
+            out_port = evt.payload["out_port"]
+            self.st_queues[out_port].append(evt)
+            self.crossbar_busy[out_port] = True
+            if self._log_stages is not None:
+                self._log(out_port, Router.SA)
+
+    def _sa_head(self, slot):
+        return self.sa_queues[slot][0]
+
+    def _stage_st(self):
+        for out_port in range(self.num_ports):
+            q = self.st_queues[out_port]
+            if not q:
+                continue
+            event = q.pop(0)
+            in_port = multicast_input_port(event.payload)
+            in_vc = event.payload.get("vc", 0)
+            out_vc = event.payload["out_vc"]
+            flits = packet_flits(event.data_size, self.bitwidth)
+            if self.noc_stats is not None:
+                self.noc_stats.record_flit(self.x, self.y, out_port, out_vc, flits)
+            if self._log_stages is not None:
+                self._log(out_port, Router.ST)
+
+            dest, dest_port = self.output_links[out_port]
+            if dest_port is None and self.trace is not None:
+                self.trace.record_delivery(self, out_port, event,
+                                           self.engine.current_cycle + flits)
+            event.payload["input_port"] = dest_port if dest_port is not None else 0
+            event.payload["vc"] = out_vc
+
+            self._forward(event, dest, flits if dest_port is None else 1)
+            self.packets -= 1
+
+            if flits > 1:
+                # Body flits keep the output and its VC until the tail leaves
+                now = self.engine.current_cycle
+                self.held_outputs[out_port] = (now + flits - 1, in_port, in_vc, out_vc)
+            else:
+                # No VA retry for an ejection credit: this tick's VA has not
+                # run yet
+                self._release_output(out_port, in_port, in_vc, out_vc)
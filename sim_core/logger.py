@@ -1,26 +1,124 @@
 """Event logging and interactive timeline generation using Plotly."""
 
+from array import array
 from collections import defaultdict
+from fnmatch import fnmatchcase
+import random
+
 
 class EventLogger:
-    """Collects handled events for plotting."""
-    def __init__(self):
+    """Collects handled events for plotting.
+
+    Filters are declarative and optional:
+
+    ``modules``
+        Glob patterns matched against module names (``"Router_0_*"``).
+    ``event_types``
+        Event types to keep (``"PIPE_STAGE"``, ``"DMA_READ"`` ...).
+    ``stages``
+        Glob patterns matched against the stage label (``"P0_*"``).
+    ``cycle_window``
+        ``(start, end)`` half open cycle range; ``end`` may be ``None``.
+    ``log_credits``
+        Also record router credit returns (stage ``P{port}_CRED``, event
+        type ``RECV_CRED``).  Off by default; routers update credit
+        counters directly and only report them to subscribed loggers.
+
+    Module, event type and cycle filters are checked by :meth:`accepts`, which
+    modules call before formatting any stage label, so filtered-out events
+    cost a couple of dictionary lookups.  Accepted events can be thinned with
+    ``sample_every`` (keep 1 in N) and/or ``reservoir_size`` (uniform random
+    sample of at most K entries).
+    """
+
+    def __init__(self, modules=None, event_types=None, stages=None,
+                 cycle_window=None, sample_every=1, reservoir_size=None, seed=0,
+                 log_credits=False):
         self.entries = []  # list of (cycle, module, stage, event_type)
+        self.log_credits = log_credits
+        self.modules = tuple(modules) if modules else None
+        self.event_types = frozenset(event_types) if event_types else None
+        self.stages = tuple(str(s) for s in stages) if stages else None
+        self.cycle_window = cycle_window
+        if sample_every < 1:
+            raise ValueError("sample_every must be >= 1")
+        self.sample_every = sample_every
+        self.reservoir_size = reservoir_size
+        self._unfiltered = (
+            self.modules is None
+            and self.event_types is None
+            and cycle_window is None
+        )
+        self._module_ok = {}
+        self._stage_ok = {}
+        self._seen = 0      # events that passed every filter
+        self._sampled = 0   # events offered to the reservoir
+        self._rng = random.Random(seed)
+
+    def accepts(self, cycle, module, event_type):
+        """Return True if an event of ``module``/``event_type`` should be logged."""
+        if self._unfiltered:
+            return True
+        if self.cycle_window is not None:
+            start, end = self.cycle_window
+            if cycle < start or (end is not None and cycle >= end):
+                return False
+        if self.event_types is not None and event_type not in self.event_types:
+            return False
+        if self.modules is not None:
+            ok = self._module_ok.get(module)
+            if ok is None:
+                ok = any(fnmatchcase(module, p) for p in self.modules)
+                self._module_ok[module] = ok
+            if not ok:
+                return False
+        return True
+
+    def _stage_accepted(self, stage):
+        ok = self._stage_ok.get(stage)
+        if ok is None:
+            label = str(stage)
+            ok = any(fnmatchcase(label, p) for p in self.stages)
+            self._stage_ok[stage] = ok
+        return ok
 
     def log_event(self, cycle, module, stage, event_type):
-        self.entries.append({
+        """Record an event already accepted by :meth:`accepts`."""
+        if self.stages is not None and not self._stage_accepted(stage):
+            return
+        self._seen += 1
+        if self.sample_every > 1 and (self._seen - 1) % self.sample_every:
+            return
+        self._record(cycle, module, stage, event_type)
+
+    def _record(self, cycle, module, stage, event_type):
+        entry = {
             'cycle': cycle,
             'module': module,
             'stage': stage,
             'event_type': event_type,
-        })
+        }
+        if self.reservoir_size is None:
+            self.entries.append(entry)
+            return
+        # Reservoir sampling (Algorithm R)
+        self._sampled += 1
+        if len(self.entries) < self.reservoir_size:
+            self.entries.append(entry)
+        else:
+            j = self._rng.randrange(self._sampled)
+            if j < self.reservoir_size:
+                self.entries[j] = entry
 
     def get_entries(self):
+        if self.reservoir_size is not None:
+            return sorted(self.entries, key=lambda e: e['cycle'])
         return list(self.entries)
 
     def save_html(self, path='timeline.html'):
         """Create an interactive Gantt chart using Plotly."""
-        if not self.entries:
+        entries = self.get_entries()
+        if not entries:
             print('No events to plot')
             return
         try:
@@ -31,7 +129,7 @@ class EventLogger:
             print('Plotly not available:', e)
             return
 
-        df = pd.DataFrame(self.entries)
+        df = pd.DataFrame(entries)
         df['task'] = df['module'] + '[' + df['stage'].astype(str) + ']'
         segments = []
         for task, group in df.groupby('task'):
@@ -52,7 +150,7 @@ class EventLogger:
         fig.update_yaxes(autorange='reversed')
 
         events_by_cycle = defaultdict(list)
-        for e in self.entries:
+        for e in entries:
             events_by_cycle[e['cycle']].append(f"{e['module']}[{e['stage']}] {e['event_type']}")
         scatter_x = []
         scatter_y = []
@@ -69,3 +167,136 @@ class EventLogger:
         fig.update_layout(title='Simulation Timeline', xaxis_title='Cycle', yaxis_title='Module[Stage]')
         fig.write_html(path, include_plotlyjs=True)
 
+
+class AggregateLogger(EventLogger):
+    """Constant-memory logger for utilization statistics.
+
+    Instead of storing one entry per event it keeps a counter per
+    ``(module, stage, event_type)`` and, per ``(module, stage)``, the number of
+    distinct busy cycles in each of ``num_windows`` fixed windows.  The
+    histograms are preallocated; once the run outgrows them adjacent windows
+    are merged and the window length doubles, so memory never depends on run
+    length.  The same filters as :class:`EventLogger` apply.
+    """
+
+    def __init__(self, window=1000, num_windows=256, modules=None,
+                 event_types=None, stages=None, cycle_window=None, log_credits=False):
+        super().__init__(modules=modules, event_types=event_types,
+                         stages=stages, cycle_window=cycle_window,
+                         log_credits=log_credits)
+        if window < 1 or num_windows < 2 or num_windows % 2:
+            raise ValueError("window must be >= 1 and num_windows even and >= 2")
+        self.window = window
+        self.num_windows = num_windows
+        self.counters = defaultdict(int)
+        self.busy_cycles = defaultdict(int)
+        self.histograms = {}
+        self._last_busy = {}
+        self.last_cycle = None
+
+    def _record(self, cycle, module, stage, event_type):
+        self.counters[(module, stage, event_type)] += 1
+        if self.last_cycle is None or cycle > self.last_cycle:
+            self.last_cycle = cycle
+        key = (module, stage)
+        if self._last_busy.get(key) == cycle:
+            return
+        self._last_busy[key] = cycle
+        self.busy_cycles[key] += 1
+        while cycle >= self.window * self.num_windows:
+            self._coarsen()
+        hist = self.histograms.get(key)
+        if hist is None:
+            hist = array('q', bytes(8 * self.num_windows))
+            self.histograms[key] = hist
+        hist[cycle // self.window] += 1
+
+    def _coarsen(self):
+        """Merge adjacent windows and double the window length."""
+        half = self.num_windows // 2
+        for hist in self.histograms.values():
+            for i in range(half):
+                hist[i] = hist[2 * i] + hist[2 * i + 1]
+            for i in range(half, self.num_windows):
+                hist[i] = 0
+        self.window *= 2
+
+    def get_entries(self):
+        return []
+
+    def get_counters(self):
+        return dict(self.counters)
+
+    def total_cycles(self):
+        if self.last_cycle is None:
+            return 0
+        return self.last_cycle + 1
+
+    def utilization(self):
+        """Return ``{(module, stage): busy_cycles / total_cycles}``."""
+        total = self.total_cycles()
+        if not total:
+            return {}
+        return {key: busy / total for key, busy in self.busy_cycles.items()}
+
+    def utilization_table(self):
+        """Rows sorted by utilization, one per ``(module, stage)``."""
+        events = defaultdict(int)
+        for (module, stage, _), count in self.counters.items():
+            events[(module, stage)] += count
+        util = self.utilization()
+        rows = [
+            {
+                'module': module,
+                'stage': stage,
+                'busy_cycles': self.busy_cycles[(module, stage)],
+                'events': events[(module, stage)],
+                'utilization': util[(module, stage)],
+            }
+            for module, stage in self.busy_cycles
+        ]
+        rows.sort(key=lambda r: (-r['utilization'], r['module'], str(r['stage'])))
+        return rows
+
+    def heatmap(self):
+        """Return ``(labels, window_starts, matrix)`` of per-window utilization."""
+        used = self.total_cycles() // self.window + 1
+        used = min(used, self.num_windows)
+        labels = sorted(self.histograms, key=lambda k: (k[0], str(k[1])))
+        starts = [i * self.window for i in range(used)]
+        matrix = [
+            [self.histograms[key][i] / self.window for i in range(used)]
+            for key in labels
+        ]
+        return [f"{m}[{s}]" for m, s in labels], starts, matrix
+
+    def save_html(self, path='utilization.html'):
+        """Write a utilization heatmap and table using Plotly."""
+        if not self.busy_cycles:
+            print('No events to plot')
+            return
+        try:
+            import plotly.graph_objects as go
+            from plotly.subplots import make_subplots
+        except Exception as e:
+            print('Plotly not available:', e)
+            return
+
+        labels, starts, matrix = self.heatmap()
+        rows = self.utilization_table()
+        fig = make_subplots(rows=2, cols=1, row_heights=[0.6, 0.4],
+                            specs=[[{'type': 'heatmap'}], [{'type': 'table'}]])
+        fig.add_trace(go.Heatmap(z=matrix, x=starts, y=labels, zmin=0, zmax=1,
+                                 colorscale='Viridis'), row=1, col=1)
+        fig.add_trace(go.Table(
+            header=dict(values=['Module', 'Stage', 'Busy cycles', 'Events', 'Utilization']),
+            cells=dict(values=[
+                [r['module'] for r in rows],
+                [str(r['stage']) for r in rows],
+                [r['busy_cycles'] for r in rows],
+                [r['events'] for r in rows],
+                [f"{r['utilization']:.3f}" for r in rows],
+            ]),
+        ), row=2, col=1)
+        fig.update_layout(title='Utilization', xaxis_title='Cycle')
+        fig.write_html(path, include_plotlyjs=True)
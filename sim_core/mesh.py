@@ -1,20 +1,102 @@
 from .router import Router
+from .flat_router import FlatRouter
+from .routing import RoutingTable
+from .allocators import make_allocator
 
-def create_mesh(engine, x_size, y_size, mesh_info, buffer_capacity=4, num_vcs=2, frequency=1000):
+# Router implementations selectable through ``create_mesh(backend=...)``
+ROUTER_BACKENDS = {
+    "router": Router,
+    "flat": FlatRouter,
+}
+# Backends that model the whole mesh in one object (see ``vector_mesh`` and
+# ``analytic_mesh``)
+MESH_BACKENDS = ("vector", "analytic")
+
+
+def build_routers(engine, x_size, y_size, mesh_info, buffer_capacity=4, num_vcs=2,
+                  frequency=1000, backend="router", allocator="random", bitwidth=256,
+                  name="Router", pipeline="full", **router_kwargs):
+    """Create and register an ``x_size`` x ``y_size`` grid of unlinked routers.
+
+    Returns ``(mesh, noc)`` where ``noc`` is the shared model of a mesh
+    backend and ``None`` for per-router backends.  ``allocator`` names a
+    :mod:`~sim_core.allocators` entry, ``bitwidth`` is the link width in
+    bits, ``name`` prefixes the router names, ``pipeline`` is one of
+    :data:`~sim_core.router.PIPELINE_MODES` and ``router_kwargs`` are passed
+    to per-router backends only.
+    """
+    if backend not in ROUTER_BACKENDS and backend not in MESH_BACKENDS:
+        raise ValueError(f"unknown mesh backend {backend!r}")
+    if backend in MESH_BACKENDS and allocator != "random":
+        raise ValueError(f"{backend!r} backend does not support the {allocator!r} allocator")
+    if backend in MESH_BACKENDS and pipeline != "full":
+        raise ValueError(f"{backend!r} backend does not support the {pipeline!r} pipeline")
     mesh = {}
-    for x in range(x_size):
-        for y in range(y_size):
-            name = f"Router_{x}_{y}"
-            router = Router(engine, name, x, y, mesh_info, buffer_capacity=buffer_capacity, num_vcs=num_vcs, frequency=frequency)
-            mesh[(x, y)] = router
+    noc = None
+    if backend == "vector":
+        from .vector_mesh import VectorMesh
+        noc = VectorMesh(engine, x_size, y_size, mesh_info, buffer_capacity=buffer_capacity,
+                         num_vcs=num_vcs, frequency=frequency, bitwidth=bitwidth)
+        for router in noc.routers:
+            mesh[(router.x, router.y)] = router
+            engine.register_module(router)
+    elif backend == "analytic":
+        from .analytic_mesh import AnalyticMesh
+        noc = AnalyticMesh(engine, x_size, y_size, mesh_info, buffer_capacity=buffer_capacity,
+                           num_vcs=num_vcs, frequency=frequency, bitwidth=bitwidth)
+        mesh.update(noc.routers)
+        for router in mesh.values():
             engine.register_module(router)
+    else:
+        router_cls = ROUTER_BACKENDS[backend]
+        for x in range(x_size):
+            for y in range(y_size):
+                router = router_cls(engine, f"{name}_{x}_{y}", x, y, mesh_info, buffer_capacity=buffer_capacity,
+                                    num_vcs=num_vcs, frequency=frequency, bitwidth=bitwidth,
+                                    **router_kwargs)
+                if allocator != "random":
+                    router.allocator = make_allocator(allocator, router)
+                if pipeline != "full":
+                    router.set_pipeline(pipeline)
+                mesh[(x, y)] = router
+                engine.register_module(router)
+    return mesh, noc
+
+
+def connect_grid(mesh, x_size, y_size, wrap_x=False, wrap_y=False):
+    """Link neighbouring routers, closing each dimension into a ring when wrapped."""
     for x in range(x_size):
         for y in range(y_size):
             router = mesh[(x, y)]
             neighbors = {}
             if x > 0: neighbors['W'] = mesh[(x-1, y)]
+            elif wrap_x: neighbors['W'] = mesh[(x_size-1, y)]
             if x < x_size-1: neighbors['E'] = mesh[(x+1, y)]
+            elif wrap_x: neighbors['E'] = mesh[(0, y)]
             if y > 0: neighbors['N'] = mesh[(x, y-1)]
+            elif wrap_y: neighbors['N'] = mesh[(x, y_size-1)]
             if y < y_size-1: neighbors['S'] = mesh[(x, y+1)]
+            elif wrap_y: neighbors['S'] = mesh[(x, 0)]
             router.set_neighbors(neighbors)
+
+
+def install_routing(mesh, noc, table, num_vcs, min_vcs=1):
+    """Install ``table`` on the routers of ``mesh`` (or on ``noc``)."""
+    needed = max(table.num_vc_classes, min_vcs)
+    if needed > num_vcs:
+        raise ValueError(f"{table.algorithm!r} routing needs at least {needed} VCs")
+    if noc is not None:
+        noc.set_routing(table)
+    else:
+        table.attach()
+    return table
+
+
+def create_mesh(engine, x_size, y_size, mesh_info, buffer_capacity=4, num_vcs=2, frequency=1000,
+                backend="router", routing="xy", allocator="random", bitwidth=256,
+                pipeline="full"):
+    mesh, noc = build_routers(engine, x_size, y_size, mesh_info, buffer_capacity, num_vcs,
+                              frequency, backend, allocator, bitwidth, pipeline=pipeline)
+    connect_grid(mesh, x_size, y_size)
+    install_routing(mesh, noc, RoutingTable(mesh, routing), num_vcs)
     return mesh
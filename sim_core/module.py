@@ -1,3 +1,7 @@
+import functools
+import heapq
+
+from .engine import SimulatorEngine
 from .event import Event
 
 
@@ -26,22 +30,27 @@ class HardwareModule:
 
     def _process_event(self, event):
         try:
-            if self.engine.logger:
-                stage = (
-                    event.payload.get("stage_idx", 0)
-                    if isinstance(event.payload, dict)
-                    else 0
-                )
+            logger = self.engine.logger
+            if logger and logger.accepts(
+                self.engine.current_cycle, self.name, event.event_type
+            ):
+                stage = self._log_stage(event)
                 evt_type = event.event_type
                 if isinstance(event.payload, dict) and event.payload.get("op_type"):
                     evt_type = f"{evt_type}-{event.payload['op_type']}"
-                self.engine.logger.log_event(
+                logger.log_event(
                     self.engine.current_cycle, self.name, stage, evt_type
                 )
             self.handle_event(event)
         finally:
             self._release_slot(event)
 
+    def _log_stage(self, event):
+        """Stage label recorded by the logger for ``event``."""
+        if isinstance(event.payload, dict):
+            return event.payload.get("stage_idx", 0)
+        return 0
+
     def handle_event(self, event):
         if event.event_type == "RETRY_SEND":
             retry_evt = event.payload["event"]
@@ -64,30 +73,178 @@ class HardwareModule:
             self.engine.push_event(event)
 
 
+@functools.lru_cache(maxsize=None)
+def _default_stage_funcs(num_stages):
+    """Placeholder stage functions shared by every module with ``num_stages``."""
+    return tuple([lambda m, d: (d, i + 1, False) for i in range(num_stages)])
+
+
 class PipelineModule(HardwareModule):
-    """Base class for modules with event driven pipelined execution."""
+    """Base class for modules with event driven pipelined execution.
+
+    Tokens normally advance one stage per ``PIPE_STAGE`` event.  A module
+    whose stage functions pass every token on unchanged, never stall and
+    have no side effects may set ``fast_path``.  A batch added with
+    :meth:`add_batch` to an idle pipeline then takes a single ``PIPE_BATCH``
+    event per cycle, which hands each token to :meth:`handle_pipeline_output`
+    in the cycle the last stage would have.
+
+    The stage events share the module's buffer with incoming events, so
+    they can be held up by them.  When another event claims a slot while a
+    batch is in flight, the batch is replayed stage by stage up to that
+    moment and continues with ``PIPE_STAGE`` events from the replayed state,
+    giving the same cycles as if it had never taken the fast path.
+    """
 
     def __init__(self, engine, name, mesh_info, num_stages, buffer_capacity=4, frequency=1000):
         super().__init__(engine, name, mesh_info, buffer_capacity, frequency)
         self.num_stages = num_stages
-        self.stage_funcs = [lambda m, d: (d, i + 1, False) for i in range(num_stages)]
+        self.stage_funcs = _default_stage_funcs(num_stages)
         self.stage_queues = [list() for _ in range(num_stages)]
         self.stage_scheduled = [False for _ in range(num_stages)]
+        # One reusable PIPE_STAGE event per stage; at most one is pending
+        self.stage_events = [None for _ in range(num_stages)]
         self.stage_capacity = buffer_capacity
+        self.fast_path = False
+        # Batch in flight on the fast path: its tokens, entry stage, cycles
+        # elapsed and pending PIPE_BATCH event, plus what a replay needs
+        self._batch = None
+        self._batch_stage = 0
+        self._batch_ticks = 0
+        self._batch_event = None
+        self._batch_start = None
+        self._batch_releases = []
 
     def set_stage_funcs(self, funcs):
         if len(funcs) != self.num_stages:
             raise ValueError("stage_funcs length must match num_stages")
         self.stage_funcs = funcs
 
+    def _reserve_slot(self, event=None):
+        if self._batch is not None:
+            self._unbatch()
+        return super()._reserve_slot(event)
+
+    def _release_slot(self, event=None):
+        if event is not None and event.event_type == "PIPE_BATCH":
+            # Never reserved a slot
+            return
+        if self._batch is not None and event is not None:
+            self._batch_releases.append((self.engine.current_time, event.priority))
+        super()._release_slot(event)
+
     def add_data(self, data, stage_idx=0):
         if stage_idx >= self.num_stages:
             raise ValueError("stage_idx out of range")
+        if self._batch is not None:
+            self._unbatch()
         self.stage_queues[stage_idx].append(data)
         self._schedule_stage(stage_idx)
 
-    def _schedule_stage(self, idx):
-        if not self.stage_scheduled[idx]:
+    def add_batch(self, tokens, stage_idx=0):
+        """Add every token of ``tokens`` at ``stage_idx`` in the same cycle.
+
+        Equivalent to calling :meth:`add_data` per token, but takes the fast
+        path when it is enabled, the pipeline is idle and no logger records
+        the individual stages.
+        """
+        if stage_idx >= self.num_stages:
+            raise ValueError("stage_idx out of range")
+        tokens = list(tokens)
+        engine = self.engine
+        if not (self.fast_path and tokens and engine.logger is None
+                and self._batch is None and not any(self.stage_queues)
+                and not any(self.stage_scheduled)):
+            for data in tokens:
+                self.add_data(data, stage_idx)
+            return
+        self._batch = tokens
+        self._batch_stage = stage_idx
+        self._batch_ticks = 0
+        self._batch_start = (
+            engine.module_times.get(self.name, engine.current_time),
+            engine.module_cycles.get(self.name, engine.current_cycle),
+            engine.current_cycle,
+            self.buffer_occupancy,
+        )
+        self._batch_releases = []
+        self._batch_event = Event(
+            src=self,
+            dst=self,
+            cycle=engine.current_cycle + 1,
+            event_type="PIPE_BATCH",
+            # Ordered like the last stage's PIPE_STAGE event
+            priority=-(self.num_stages - 1),
+        )
+        engine.push_event(self._batch_event)
+
+    def _batch_tick(self):
+        tokens = self._batch
+        self._batch_ticks += 1
+        # Token ``i`` leaves the last stage ``num_stages - stage`` cycles
+        # after being added, one token per cycle
+        idx = self._batch_ticks - (self.num_stages - self._batch_stage)
+        if idx + 1 >= len(tokens):
+            self._batch = None
+            self._batch_event = None
+        else:
+            self._batch_event.cycle = self.engine.current_cycle + 1
+            self.engine.push_event(self._batch_event)
+        if idx >= 0:
+            self.handle_pipeline_output(tokens[idx])
+
+    def _unbatch(self):
+        """Replay the batch stage by stage and continue from that state."""
+        tokens = self._batch
+        module_time, module_cycle, cycle, occupancy = self._batch_start
+        self._batch = None
+        self._batch_event = None
+
+        engine = SimulatorEngine()
+        replay = _PipelineReplay(engine, self)
+        engine.register_module(replay)
+        engine.current_time = engine.module_times[self.name] = module_time
+        engine.module_cycles[self.name] = module_cycle
+        engine.current_cycle = cycle
+        replay.buffer_occupancy = occupancy
+        for data in tokens:
+            replay.add_data(data, self._batch_stage)
+        for release_time, priority in self._batch_releases:
+            evt = Event(src=replay, dst=replay, cycle=0, event_type="PIPE_RELEASE",
+                        priority=priority)
+            evt.time = release_time
+            heapq.heappush(engine.event_queue, (release_time, priority, evt))
+        # Everything ordered before the event now being handled has happened
+        current = self.engine.current_event
+        now = (self.engine.current_time, current.priority if current is not None else 0)
+        queue = engine.event_queue
+        while queue and queue[0][:2] < now:
+            engine.tick()
+
+        self.buffer_occupancy = replay.buffer_occupancy
+        self.stage_queues = replay.stage_queues
+        self.stage_scheduled = replay.stage_scheduled
+        events = {}
+        for idx, evt in enumerate(replay.stage_events):
+            if evt is not None:
+                mine = self._stage_event(idx)
+                mine.cycle = evt.cycle
+                events[evt] = mine
+        for event_time, priority, evt in queue:
+            if evt.event_type == "PIPE_STAGE":
+                mine = events[evt]
+            elif evt.event_type == "RETRY_SEND":
+                mine = Event(src=self, dst=self, cycle=evt.cycle, event_type="RETRY_SEND",
+                             payload={"event": events[evt.payload["event"]]})
+            else:
+                continue
+            mine.time = event_time
+            heapq.heappush(self.engine.event_queue, (event_time, priority, mine))
+
+    def _stage_event(self, idx):
+        """Return the PIPE_STAGE event of stage ``idx`` set for next cycle."""
+        evt = self.stage_events[idx]
+        if evt is None:
             evt = Event(
                 src=self,
                 dst=self,
@@ -96,7 +253,14 @@ class PipelineModule(HardwareModule):
                 payload={"stage_idx": idx},
                 priority=-idx,
             )
-            self.send_event(evt)
+            self.stage_events[idx] = evt
+        else:
+            evt.cycle = self.engine.current_cycle + 1
+        return evt
+
+    def _schedule_stage(self, idx):
+        if not self.stage_scheduled[idx]:
+            self.send_event(self._stage_event(idx))
             self.stage_scheduled[idx] = True
 
     def handle_event(self, event):
@@ -105,6 +269,9 @@ class PipelineModule(HardwareModule):
             self.stage_scheduled[idx] = False
             self._on_stage_execute(idx)
             self._execute_stage(idx)
+        elif event.event_type == "PIPE_BATCH":
+            if event is self._batch_event:
+                self._batch_tick()
         else:
             super().handle_event(event)
 
@@ -149,3 +316,11 @@ class PipelineModule(HardwareModule):
         pass
 
 
+class _PipelineReplay(PipelineModule):
+    """Stand-in stepping a fast-path batch of ``module`` on a private engine."""
+
+    def __init__(self, engine, module):
+        super().__init__(engine, module.name, module.mesh_info, module.num_stages,
+                         module.buffer_capacity, module.frequency)
+        self.stage_funcs = module.stage_funcs
+        self.stage_capacity = module.stage_capacity
@@ -0,0 +1,298 @@
+"""Hierarchical multi-chip networks.
+
+:func:`create_multichip` builds one mesh per chip and joins the chips with
+:class:`ChipBridge` modules, slow inter-chip links with their own latency,
+bandwidth and clock.  Each bridge sits on an extra local port of a gateway
+router on either chip, so inside a chip it looks like any other endpoint.
+
+Endpoints are addressed as ``(chip, x, y)``.  The chip-level routes are
+precomputed by :class:`MultiChipNetwork`: a packet for another chip is
+routed to the gateway of the next bridge on the way, crosses it and is
+routed on from the far gateway.  Two-coordinate destinations stay on the
+sending chip.
+
+Each chip is a self-contained partition: its routers and endpoints only
+exchange events with other chips through the bridges
+(:meth:`MultiChipNetwork.partitions`).
+
+Bridges do not reserve VCs across chips.  A chain or tree of chips is
+deadlock free under dimension-order routing; chip graphs with cycles can
+deadlock when every bridge on a cycle is full.
+"""
+
+import heapq
+
+from .event import Event
+from .mesh import ROUTER_BACKENDS, build_routers, connect_grid, install_routing
+from .module import HardwareModule
+from .routing import RoutingTable
+
+
+class ChipBridge(HardwareModule):
+    """Bidirectional link between gateway routers on two chips.
+
+    A packet occupies its direction of the link for
+    ``ceil(data_size * 8 / bandwidth)`` bridge cycles and arrives
+    ``latency`` cycles after its last bit was sent.  Both are counted in
+    the bridge clock (``frequency`` in MHz).  ``buffer_capacity`` packets
+    per direction may be on the link or waiting for the far router to take
+    them; further packets wait in the sending router.
+    """
+
+    def __init__(self, engine, name, mesh_info, latency=20, bandwidth=64,
+                 buffer_capacity=4, frequency=1000):
+        super().__init__(engine, name, mesh_info, buffer_capacity, frequency)
+        self.latency = latency
+        self.bandwidth = bandwidth
+        # near router -> (far router, near chip, far chip)
+        self.ends = {}
+        # Per direction, keyed by the near router
+        self.in_flight = {}
+        self.busy_until = {}
+        # (src chip, dst chip) -> [packets, bytes, busy cycles]
+        self.traffic = {}
+
+    def connect(self, router_a, port_a, chip_a, router_b, port_b, chip_b):
+        """Attach the bridge to ``port_a`` of ``router_a`` and ``port_b`` of ``router_b``."""
+        router_a.attach_module(self, port_a)
+        router_b.attach_module(self, port_b)
+        for near, far, src, dst in ((router_a, router_b, chip_a, chip_b),
+                                    (router_b, router_a, chip_b, chip_a)):
+            self.ends[near] = (far, src, dst)
+            self.in_flight[near] = 0
+            self.busy_until[near] = 0
+            self.traffic[(src, dst)] = [0, 0, 0]
+
+    def serialization_cycles(self, data_size):
+        """Bridge cycles one packet of ``data_size`` bytes occupies the link."""
+        return max(1, -(-(data_size or 0) * 8 // self.bandwidth))
+
+    def _reserve_slot(self, event=None):
+        near = event.src
+        if self.in_flight[near] >= self.buffer_capacity:
+            return False
+        self.in_flight[near] += 1
+        return True
+
+    def _release_slot(self, event=None):
+        # Slots are freed when the far router accepts the packet
+        pass
+
+    def send_event(self, event):
+        # Only delivered packets are sent; ``ends`` is symmetric, so the far
+        # router's far end is the near router whose slot the packet holds
+        if not event.dst._reserve_slot(event):
+            self.engine.push_event(Event(
+                src=self,
+                dst=self,
+                cycle=self.engine.current_cycle + 1,
+                event_type="RETRY_SEND",
+                payload={"event": event},
+            ))
+            return
+        self.in_flight[self.ends[event.dst][0]] -= 1
+        self.engine.push_event(event)
+
+    def handle_event(self, event):
+        if event.event_type == "RETRY_SEND":
+            super().handle_event(event)
+            return
+        if event.event_type == "BRIDGE_DELIVER":
+            near = event.payload["near"]
+            pkt = event.payload["event"]
+            pkt.src = self
+            pkt.dst = self.ends[near][0]
+            pkt.cycle = self.engine.current_cycle
+            pkt.payload["vc"] = 0
+            self.send_event(pkt)
+            return
+
+        near = event.src
+        _, src, dst = self.ends[near]
+        now = self.engine.current_cycle
+        cycles = self.serialization_cycles(event.data_size)
+        start = max(now, self.busy_until[near])
+        self.busy_until[near] = start + cycles
+        stats = self.traffic[(src, dst)]
+        stats[0] += 1
+        stats[1] += event.data_size or 0
+        stats[2] += cycles
+        self.engine.push_event(Event(
+            src=self,
+            dst=self,
+            cycle=start + cycles + self.latency,
+            event_type="BRIDGE_DELIVER",
+            payload={"event": event, "near": near},
+        ))
+
+
+class ChipRoutingTable(RoutingTable):
+    """Routing table of one chip that forwards other chips' packets to a bridge.
+
+    ``(chip, x, y)`` destinations on another chip are routed to the
+    gateway of :meth:`MultiChipNetwork.exit` and leave through the bridge
+    port there.  Destinations on this chip and plain ``(x, y)`` coordinates
+    use the chip's mesh routing.
+    """
+
+    def __init__(self, mesh, chip, network, algorithm="xy"):
+        self.chip = chip
+        self.network = network
+        super().__init__(mesh, algorithm)
+
+    def ports(self, src, dst, route_class=0):
+        if len(dst) == 3:
+            chip, x, y = dst
+            if chip != self.chip:
+                gateway, port = self.network.exit(self.chip, chip)
+                if tuple(src) == gateway:
+                    return (port,)
+                dst = gateway
+            else:
+                dst = (x, y)
+        return super().ports(src, dst, route_class)
+
+
+class MultiChipNetwork:
+    """Chips, bridges and the precomputed chip-to-chip routes."""
+
+    def __init__(self, chips):
+        # chip -> {(x, y): router}
+        self.chips = chips
+        self.bridges = []
+        # chip -> [(neighbour chip, gateway, port, bridge)]
+        self.links = {chip: [] for chip in chips}
+        # (chip, dst chip) -> (gateway, port) of the first bridge
+        self.next_hop = {}
+
+    def add_bridge(self, bridge, chip_a, gateway_a, port_a, chip_b, gateway_b, port_b):
+        self.bridges.append(bridge)
+        self.links[chip_a].append((chip_b, gateway_a, port_a, bridge))
+        self.links[chip_b].append((chip_a, gateway_b, port_b, bridge))
+
+    def compute_routes(self):
+        """Fill ``next_hop`` with shortest routes by bridge latency.
+
+        Latencies are compared in time, so a slower bridge clock counts as
+        a longer link.  Ties go to fewer bridge crossings.
+        """
+        self.next_hop = {}
+        for src in self.chips:
+            best = {src: (0.0, 0)}
+            heap = [(0.0, 0, src, None)]
+            while heap:
+                cost, hops, chip, first = heapq.heappop(heap)
+                if best.get(chip, (cost, hops)) < (cost, hops):
+                    continue
+                if first is not None and (src, chip) not in self.next_hop:
+                    self.next_hop[(src, chip)] = first
+                for nxt, gateway, port, bridge in self.links[chip]:
+                    step = cost + bridge.latency / bridge.frequency
+                    if (step, hops + 1) < best.get(nxt, (float("inf"), 0)):
+                        best[nxt] = (step, hops + 1)
+                        heapq.heappush(heap, (step, hops + 1, nxt,
+                                              first or (gateway, port)))
+        return self.next_hop
+
+    def exit(self, chip, dst_chip):
+        """Gateway router coordinates and bridge port from ``chip`` towards ``dst_chip``."""
+        try:
+            return self.next_hop[(chip, dst_chip)]
+        except KeyError:
+            raise ValueError(f"chip {dst_chip} is not reachable from chip {chip}") from None
+
+    def partitions(self):
+        """``chip -> modules`` owned by each chip: its routers and their endpoints.
+
+        Bridges belong to no chip; every event between partitions crosses one.
+        """
+        parts = {}
+        bridges = set(self.bridges)
+        for chip, mesh in self.chips.items():
+            modules = []
+            for router in mesh.values():
+                modules.append(router)
+                modules.extend(mod for mod, port in router.output_links
+                               if port is None and mod is not None and mod not in bridges)
+            parts[chip] = modules
+        return parts
+
+
+def _default_gateways(chip_a, chip_b, x_size, y_size):
+    """East edge midpoint of the lower chip and west edge midpoint of the higher one."""
+    east = (x_size - 1, y_size // 2)
+    west = (0, y_size // 2)
+    return (east, west) if chip_a < chip_b else (west, east)
+
+
+def create_multichip(engine, num_chips, x_size, y_size, mesh_info, links=None,
+                     bridge_latency=20, bridge_bandwidth=64, bridge_frequency=1000,
+                     bridge_capacity=4, buffer_capacity=4, num_vcs=2, frequency=1000,
+                     backend="router", routing="xy", allocator="random", bitwidth=256):
+    """Build ``num_chips`` meshes of ``x_size`` x ``y_size`` joined by bridges.
+
+    ``links`` lists the bridged chip pairs as ``(a, b)`` or
+    ``(a, b, options)`` and defaults to a chain ``0 - 1 - ... - n-1``.
+    ``options`` may override ``latency``, ``bandwidth``, ``frequency`` and
+    ``capacity`` of that bridge and give its ``gateways`` as a pair of
+    router coordinates on ``a`` and ``b``; by default the bridge joins the
+    facing edge midpoints.  Returns a ``(chip, x, y) -> router``
+    dictionary.  ``mesh_info["chip_network"]`` holds the
+    :class:`MultiChipNetwork`.  Only the per-router backends are supported.
+    """
+    if backend not in ROUTER_BACKENDS:
+        raise ValueError(f"{backend!r} backend does not support multi-chip networks")
+    if links is None:
+        links = [(c, c + 1) for c in range(num_chips - 1)]
+    specs = []
+    ports_used = {}
+    for link in links:
+        a, b = link[0], link[1]
+        options = link[2] if len(link) > 2 else {}
+        if not (0 <= a < num_chips and 0 <= b < num_chips) or a == b:
+            raise ValueError(f"invalid chip link {link!r}")
+        gw_a, gw_b = options.get("gateways") or _default_gateways(a, b, x_size, y_size)
+        for chip, gw in ((a, gw_a), (b, gw_b)):
+            key = (chip, tuple(gw))
+            ports_used[key] = ports_used.get(key, 0) + 1
+        specs.append((a, tuple(gw_a), b, tuple(gw_b), options))
+    num_local_ports = 1 + max(ports_used.values(), default=0)
+
+    chips = {}
+    for chip in range(num_chips):
+        routers, _ = build_routers(engine, x_size, y_size, mesh_info, buffer_capacity,
+                                   num_vcs, frequency, backend, allocator, bitwidth,
+                                   name=f"Chip{chip}_Router", num_local_ports=num_local_ports)
+        connect_grid(routers, x_size, y_size)
+        chips[chip] = routers
+
+    network = MultiChipNetwork(chips)
+    next_port = {}
+    for idx, (a, gw_a, b, gw_b, options) in enumerate(specs):
+        bridge = ChipBridge(engine, f"Bridge{idx}_{a}_{b}", mesh_info,
+                            latency=options.get("latency", bridge_latency),
+                            bandwidth=options.get("bandwidth", bridge_bandwidth),
+                            buffer_capacity=options.get("capacity", bridge_capacity),
+                            frequency=options.get("frequency", bridge_frequency))
+        ends = []
+        for chip, gw in ((a, gw_a), (b, gw_b)):
+            router = chips[chip][gw]
+            # Port 0 stays free for the chip's own endpoint
+            count = next_port.get(router, 0) + 1
+            next_port[router] = count
+            ends.append((router, router.local_ports[count]))
+        bridge.connect(ends[0][0], ends[0][1], a, ends[1][0], ends[1][1], b)
+        engine.register_module(bridge)
+        network.add_bridge(bridge, a, gw_a, ends[0][1], b, gw_b, ends[1][1])
+    network.compute_routes()
+
+    for chip, routers in chips.items():
+        install_routing(routers, None, ChipRoutingTable(routers, chip, network, routing),
+                        num_vcs)
+
+    mesh = {(chip, x, y): router
+            for chip, routers in chips.items() for (x, y), router in routers.items()}
+    mesh_info["mesh_size"] = (x_size, y_size)
+    mesh_info["num_chips"] = num_chips
+    mesh_info["chip_network"] = network
+    return mesh
@@ -0,0 +1,140 @@
+"""Per-link NoC counters, congestion heatmaps and hotspot reports."""
+
+import numpy as np
+
+from .router import DIRS
+
+
+class NocStats:
+    """Mesh-shaped counters filled in by every router of ``mesh``.
+
+    All arrays are indexed ``[x, y, port]`` or ``[x, y, port, vc]``:
+
+    ``flits``
+        Flits forwarded through each output port/VC in switch traversal;
+        a packet counts ``ceil(data_size * 8 / bitwidth)`` flits.
+    ``credit_stalls``
+        Cycles a head packet waited in VA because the output VC had no credit.
+    ``sa_conflicts``
+        Switch allocation requests that lost arbitration for an output port.
+    ``occupancy_sum`` / ``occupancy_samples`` / ``occupancy_max``
+        Input VC buffer occupancy sampled whenever an upstream hop tries to
+        reserve a slot.
+    """
+
+    def __init__(self, mesh):
+        coords = list(mesh)
+        self.x_size = max(x for x, _ in coords) + 1
+        self.y_size = max(y for _, y in coords) + 1
+        routers = list(mesh.values())
+        self.num_ports = max(r.num_ports for r in routers)
+        self.num_vcs = max(max(r.port_num_vcs) for r in routers)
+        shape = (self.x_size, self.y_size, self.num_ports)
+        vshape = shape + (self.num_vcs,)
+        self.flits = np.zeros(vshape, dtype=np.int64)
+        self.credit_stalls = np.zeros(vshape, dtype=np.int64)
+        self.sa_conflicts = np.zeros(shape, dtype=np.int64)
+        self.occupancy_sum = np.zeros(vshape, dtype=np.int64)
+        self.occupancy_samples = np.zeros(vshape, dtype=np.int64)
+        self.occupancy_max = np.zeros(vshape, dtype=np.int64)
+        self.engine = routers[0].engine
+        self.start_cycle = self.engine.current_cycle
+        for r in routers:
+            r.noc_stats = self
+
+    # ------------------------------------------------------------------
+    # hooks called from the router
+    def record_flit(self, x, y, port, vc, count=1):
+        self.flits[x, y, port, vc] += count
+
+    def record_credit_stall(self, x, y, port, vc):
+        self.credit_stalls[x, y, port, vc] += 1
+
+    def record_sa_conflicts(self, x, y, port, losers):
+        self.sa_conflicts[x, y, port] += losers
+
+    def record_occupancy(self, x, y, port, vc, count):
+        self.occupancy_sum[x, y, port, vc] += count
+        self.occupancy_samples[x, y, port, vc] += 1
+        if count > self.occupancy_max[x, y, port, vc]:
+            self.occupancy_max[x, y, port, vc] = count
+
+    # ------------------------------------------------------------------
+    # reports
+    def elapsed_cycles(self):
+        return max(1, self.engine.current_cycle - self.start_cycle)
+
+    def link_utilization(self):
+        """Fraction of cycles each ``[x, y, port]`` output carried a packet."""
+        return self.flits.sum(axis=3) / self.elapsed_cycles()
+
+    def mean_occupancy(self):
+        samples = np.maximum(self.occupancy_samples, 1)
+        return self.occupancy_sum / samples
+
+    def _metric(self, metric):
+        if metric == "flits":
+            return self.flits.sum(axis=3)
+        if metric == "utilization":
+            return self.link_utilization()
+        if metric == "credit_stalls":
+            return self.credit_stalls.sum(axis=3)
+        if metric == "sa_conflicts":
+            return self.sa_conflicts
+        if metric == "occupancy":
+            return self.mean_occupancy().max(axis=3)
+        raise ValueError(f"unknown metric {metric}")
+
+    def heatmap(self, metric="utilization", port=None):
+        """Return a ``(y, x)`` array for plotting.
+
+        ``port`` selects one output direction (index or name from ``DIRS``);
+        by default the maximum over the network ports is shown, which points
+        at the busiest link leaving each router.
+        """
+        data = self._metric(metric)
+        if port is None:
+            grid = data[:, :, 1:].max(axis=2) if data.shape[2] > 1 else data[:, :, 0]
+        else:
+            idx = DIRS.index(port) if isinstance(port, str) else port
+            grid = data[:, :, idx]
+        return grid.T
+
+    def hotspots(self, n=10, metric="utilization"):
+        """Return the ``n`` busiest ``(router, port)`` links for ``metric``."""
+        data = self._metric(metric)
+        flat = data.ravel()
+        n = min(n, flat.size)
+        order = np.argsort(flat, kind="stable")[::-1][:n]
+        out = []
+        for idx in order:
+            x, y, p = np.unravel_index(idx, data.shape)
+            value = flat[idx]
+            if value <= 0:
+                break
+            out.append({
+                "router": (int(x), int(y)),
+                "port": DIRS[p] if p < len(DIRS) else f"P{p}",
+                "value": float(value),
+            })
+        return out
+
+    def save_html(self, path="noc_heatmap.html"):
+        """Write one heatmap per metric using Plotly."""
+        try:
+            import plotly.graph_objects as go
+            from plotly.subplots import make_subplots
+        except Exception as e:
+            print("Plotly not available:", e)
+            return
+        metrics = ["utilization", "credit_stalls", "sa_conflicts", "occupancy"]
+        fig = make_subplots(rows=2, cols=2, subplot_titles=metrics)
+        for i, metric in enumerate(metrics):
+            fig.add_trace(
+                go.Heatmap(z=self.heatmap(metric), showscale=False,
+                           colorscale="Inferno"),
+                row=i // 2 + 1, col=i % 2 + 1,
+            )
+        fig.update_yaxes(autorange="reversed")
+        fig.update_layout(title="NoC congestion")
+        fig.write_html(path, include_plotlyjs=True)
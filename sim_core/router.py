@@ -1,43 +1,137 @@
+import functools
+from collections import defaultdict
+
 from .module import PipelineModule
 from .event import Event
-import random
+from .allocators import RandomAllocator
+# The original allocation helpers lived here; re-exported for existing callers
+from .allocators import arbitrate_sa, arbitrate_va, select_output_vc  # noqa: F401
 
 DIRS = ["LOCAL", "E", "W", "N", "S"]
 DIR_INDEX = {d: i for i, d in enumerate(DIRS)}
 OPPOSITE = {"E": "W", "W": "E", "N": "S", "S": "N", "LOCAL": "LOCAL"}
 
 
-def select_output_vc(router, out_port):
-    """Randomly select an available output VC with credit."""
-    vc_count = router.port_num_vcs[out_port]
-    choices = [
-        vc
-        for vc in range(vc_count)
-        if router.output_vc_allocation[out_port][vc] is None
-        and (
-            router.credit_counts[out_port][vc] is None
-            or router.credit_counts[out_port][vc] > 0
-        )
-    ]
-    if not choices:
+def xy_route(router, dst_coords):
+    """Return the dimension-order (XY) output port towards ``dst_coords``."""
+    if (router.x, router.y) == tuple(dst_coords):
+        direction = "LOCAL"
+    else:
+        dx = dst_coords[0] - router.x
+        dy = dst_coords[1] - router.y
+        if dx != 0:
+            direction = "E" if dx > 0 else "W"
+        elif dy != 0:
+            direction = "S" if dy > 0 else "N"
+        else:
+            direction = "LOCAL"
+    return DIR_INDEX[direction]
+
+
+def multicast_branches(router, event):
+    """Split multicast packet ``event`` at ``router`` in route computation.
+
+    The destinations in ``payload["dst_set"]`` are grouped by output port and
+    permitted VC class, so replication follows the routing function's tree
+    (an XY tree by default).  Returns one packet per branch with
+    ``out_port``, ``dst_set`` and a representative ``dst_coords`` set.  When
+    the packet branches, the copies share a ``mcast_pending`` counter so only
+    the last one to leave returns the upstream credit.
+    """
+    payload = event.payload
+    groups = {}
+    for dst in payload["dst_set"]:
+        payload["dst_coords"] = dst
+        if router.routing is not None:
+            port = router.routing.route(router, payload)
+            vcs = router.routing.allowed_vcs(router, payload, port)
+        else:
+            port = xy_route(router, dst)
+            vcs = None
+        groups.setdefault((port, vcs), []).append(tuple(dst))
+    pending = [len(groups)] if len(groups) > 1 else None
+    branches = []
+    for (port, _), dsts in groups.items():
+        if branches:
+            pkt = Event(
+                src=event.src,
+                dst=event.dst,
+                cycle=event.cycle,
+                data_size=event.data_size,
+                program=event.program,
+                event_type=event.event_type,
+                payload=dict(payload),
+                priority=event.priority,
+            )
+        else:
+            pkt = event
+        pkt.payload["dst_set"] = tuple(dsts)
+        pkt.payload["dst_coords"] = dsts[0]
+        pkt.payload["out_port"] = port
+        if pending is not None:
+            pkt.payload["mcast_pending"] = pending
+        branches.append(pkt)
+    return branches
+
+
+def multicast_input_port(payload):
+    """Input port whose upstream credit the departing packet returns.
+
+    ``None`` while other copies of a branched multicast packet are still
+    buffered.
+    """
+    port = payload.get("input_port", 0)
+    pending = payload.pop("mcast_pending", None)
+    if pending is not None:
+        pending[0] -= 1
+        if pending[0]:
+            return None
+    return port
+
+
+def lookahead_port(router, out_port, payload):
+    """Output port the packet leaving ``router`` by ``out_port`` takes next hop.
+
+    ``None`` when ``out_port`` leads to an endpoint.  The next router's
+    routing function sees the input port the packet will arrive on.
+    """
+    nxt, in_port = router.output_links[out_port]
+    if in_port is None:
         return None
-    return random.choice(choices)
+    if nxt.routing is None:
+        return xy_route(nxt, payload["dst_coords"])
+    current = payload.get("input_port", 0)
+    payload["input_port"] = in_port
+    port = nxt.routing.route(nxt, payload)
+    payload["input_port"] = current
+    return port
+
+
+# Router pipeline organisations selectable through ``create_mesh(pipeline=...)``
+PIPELINE_MODES = ("full", "lookahead", "bypass")
+
+
+def local_port_ids(num_local_ports=1):
+    """Port indices of the endpoint ports of a router.
 
+    Port 0 is always local; further endpoints of a concentrated router use
+    the ports after the four mesh directions.
+    """
+    return (0,) + tuple(range(len(DIRS), len(DIRS) + num_local_ports - 1))
 
-def arbitrate_va(candidates):
-    """Randomly pick one VC for each output (port, vc) pair."""
-    result = {}
-    for pair, vc_list in candidates.items():
-        result[pair] = random.choice(vc_list)
-    return result
 
+def packet_flits(data_size, bitwidth):
+    """Number of ``bitwidth``-bit flits carrying ``data_size`` bytes (at least one)."""
+    return max(1, -(-(data_size or 0) * 8 // bitwidth))
 
-def arbitrate_sa(candidates):
-    """Randomly choose one candidate per output port."""
-    selected = []
-    for out_port, lst in candidates.items():
-        selected.append(random.choice(lst))
-    return selected
+
+@functools.lru_cache(maxsize=None)
+def mask_bits(width):
+    """Lookup table from a ``width``-bit mask to its set bit indices.
+
+    Tables are shared between routers; treat them as read-only.
+    """
+    return [tuple(i for i in range(width) if m >> i & 1) for m in range(1 << width)]
 
 
 class Buffer(PipelineModule):
@@ -51,7 +145,7 @@ class Buffer(PipelineModule):
         super().__init__(router.engine, name, router.mesh_info, 1, capacity, router.frequency)
         self.port = port
         self.vc_idx = vc_idx
-        self.set_stage_funcs([lambda m, d: m._stage_rc(d)])
+        self.set_stage_funcs(self.STAGE_FUNCS)
 
     def recv_packet(self, event):
         self.add_data(event, stage_idx=self.RC)
@@ -65,27 +159,35 @@ class Buffer(PipelineModule):
         dst_coords = event.payload.get("dst_coords")
         if dst_coords is None:
             raise ValueError(f"[{router.name}] dst_coords missing in payload")
-        if (router.x, router.y) == tuple(dst_coords):
-            direction = "LOCAL"
+        if "dst_set" in event.payload:
+            return self._stage_rc_multicast(router, event)
+        if router.routing is not None:
+            out_port = router.routing.route(router, event.payload)
         else:
-            dx = dst_coords[0] - router.x
-            dy = dst_coords[1] - router.y
-            if dx != 0:
-                direction = "E" if dx > 0 else "W"
-            elif dy != 0:
-                direction = "S" if dy > 0 else "N"
-            else:
-                direction = "LOCAL"
-        out_port = DIR_INDEX[direction]
+            out_port = xy_route(router, dst_coords)
         event.payload["out_port"] = out_port
+        if router.lookahead:
+            router._set_lookahead(event.payload, out_port)
 
         q = self.port.va_stage_queues[self.vc_idx]
         if len(q) >= self.port.buffer_capacity:
             return event, self.RC, True
         q.append(event)
+        self.port.va_mask |= 1 << self.vc_idx
         self.port._schedule_va()
         return event, self.RC + 1, False
 
+    def _stage_rc_multicast(self, router, event):
+        q = self.port.va_stage_queues[self.vc_idx]
+        if len(q) >= self.port.buffer_capacity:
+            return event, self.RC, True
+        q.extend(multicast_branches(router, event))
+        self.port.va_mask |= 1 << self.vc_idx
+        self.port._schedule_va()
+        return event, self.RC + 1, False
+
+    STAGE_FUNCS = (lambda m, d: m._stage_rc(d),)
+
 
 class Port(PipelineModule):
     """Input port that arbitrates VA across its virtual channels."""
@@ -101,8 +203,10 @@ class Port(PipelineModule):
         self.buffer_capacity = buffer_capacity
         self.virtual_channels = [Buffer(self, i, buffer_capacity) for i in range(num_vcs)]
         self.va_stage_queues = [[] for _ in range(num_vcs)]
+        # Bit ``vc`` is set while ``va_stage_queues[vc]`` is non-empty
+        self.va_mask = 0
         self.vc_rr = 0
-        self.set_stage_funcs([lambda m, d: m._stage_va(d)])
+        self.set_stage_funcs(self.STAGE_FUNCS)
 
     def recv_packet(self, event):
         vc = event.payload.get("vc", 0)
@@ -118,24 +222,36 @@ class Port(PipelineModule):
 
     def _stage_va(self, _):
         candidates = {}
-        for vc_idx in range(self.num_vcs):
-            if not self.va_stage_queues[vc_idx]:
-                continue
+        for vc_idx in self.router.vc_bits[self.va_mask]:
             pkt = self.va_stage_queues[vc_idx][0]
             out_port = pkt.payload["out_port"]
-            out_vc = select_output_vc(self.router, out_port)
+            allowed = None
+            if self.router.routing is not None:
+                allowed = self.router.routing.allowed_vcs(self.router, pkt.payload, out_port)
+            if self.router.traffic_classes is not None:
+                allowed = self.router.traffic_classes.allowed_vcs(self.router, pkt, out_port, allowed)
+            out_vc = self.router.allocator.select_output_vc(self.router, out_port, allowed)
+            if out_vc is None and allowed is not None and self.router.routing.escape_class is not None:
+                out_port, out_vc = self.router._take_escape(pkt)
             if out_vc is None:
+                key = (pkt.program, pkt.payload.get("stream_id"), "noc_credit")
+                self.router.stall_cycles[key] += 1
+                if self.router.noc_stats is not None:
+                    self.router._record_credit_stall(out_port)
                 continue
             pair = (out_port, out_vc)
             candidates.setdefault(pair, []).append(vc_idx)
 
-        chosen = arbitrate_va(candidates)
+        chosen = self.router.allocator.arbitrate_va(self.port_idx, candidates)
         progress = False
         for (out_port, out_vc), vc_idx in chosen.items():
             if len(self.router.sa_stage_queues[self.port_idx][vc_idx]) >= self.buffer_capacity:
                 continue
-            pkt = self.va_stage_queues[vc_idx].pop(0)
-            self.router.output_vc_allocation[out_port][out_vc] = pkt
+            queue = self.va_stage_queues[vc_idx]
+            pkt = queue.pop(0)
+            if not queue:
+                self.va_mask &= ~(1 << vc_idx)
+            self.router._allocate_vc(out_port, out_vc, pkt)
             pkt.payload["out_vc"] = out_vc
             credit = self.router.credit_counts[out_port][out_vc]
             if credit is not None:
@@ -143,15 +259,19 @@ class Port(PipelineModule):
             self.router._add_sa_candidate(self.port_idx, pkt)
             progress = True
 
-        more = any(self.va_stage_queues[i] for i in range(self.num_vcs))
-        if more:
+        if self.va_mask:
             return None, self.VA, not progress
         return None, self.VA + 1, False
 
+    STAGE_FUNCS = (lambda m, d: m._stage_va(d),)
+
 
 class Router(PipelineModule):
     """Simple high-radix router with virtual-channel based 4-stage pipeline."""
 
+    # Packets with a ``dst_set`` are replicated at branch points
+    multicast = True
+
     RC = 0
     VA = 1
     SA = 2
@@ -160,16 +280,20 @@ class Router(PipelineModule):
 
     def __init__(self, engine, name, mesh_x, mesh_y, mesh_info,
                  bitwidth=256, pipeline_delay=4,
-                 num_ports=5, num_vcs=2, buffer_capacity=4, frequency=1000):
+                 num_ports=5, num_vcs=2, buffer_capacity=4, frequency=1000,
+                 num_local_ports=1):
         super().__init__(engine, name, mesh_info, 4, buffer_capacity, frequency)
         self.x = mesh_x
         self.y = mesh_y
         self.bitwidth = bitwidth
         self.pipeline_delay = pipeline_delay
+        self.local_ports = local_port_ids(num_local_ports)
+        num_ports = max(num_ports, len(DIRS) + num_local_ports - 1)
         self.num_ports = num_ports
         self.num_vcs = num_vcs
-        # Per-port VC counts; local port has single VC
-        self.port_num_vcs = [1] + [num_vcs] * (num_ports - 1)
+        # Per-port VC counts; local ports have a single VC
+        self.port_num_vcs = [1 if i in self.local_ports else num_vcs
+                             for i in range(num_ports)]
 
 
         # output side resources
@@ -178,11 +302,39 @@ class Router(PipelineModule):
                                      for i in range(num_ports)]
         self.vc_rr = [0 for _ in range(num_ports)]
         self.crossbar_busy = [False for _ in range(num_ports)]
+        # Multi-flit packets hold their output until the tail leaves:
+        # out_port -> (in_port, in_vc, out_vc) and a reusable release event
+        self.held_outputs = {}
+        self.release_events = [None for _ in range(num_ports)]
+        # Bitmask of unallocated VCs per output port and set-bit lookups
+        self.vc_free_masks = [(1 << n) - 1 for n in self.port_num_vcs]
+        self.vc_bits = mask_bits(max(self.port_num_vcs))
+        self.port_bits = mask_bits(num_ports)
         self.credit_counts = [[None for _ in range(self.port_num_vcs[i])]
                               for i in range(num_ports)]
 
         self.neighbors = {}
         self.attached_module = None
+        # Modules attached to the extra local ports of a concentrated router
+        self.module_ports = {}
+        # Optional :class:`~sim_core.routing.RoutingTable`; XY when unset
+        self.routing = None
+        self.route_table = None
+        # Cycles head packets waited for an output VC/credit, keyed by
+        # (program, stream_id, reason) for CP stall attribution.
+        self.stall_cycles = defaultdict(int)
+        # Optional :class:`~sim_core.noc_stats.NocStats` collector
+        self.noc_stats = None
+        # Optional :class:`~sim_core.trace.TraceRecorder`
+        self.trace = None
+        # VC and switch allocator, see :mod:`sim_core.allocators`
+        self.allocator = RandomAllocator(self)
+        # Lookahead routing skips RC for packets from other routers; bypass
+        # also skips VA and SA when the router is idle
+        self.lookahead = False
+        self.bypass = False
+        # Optional :class:`~sim_core.traffic_classes.TrafficClasses`
+        self.traffic_classes = None
 
         # Per-port pipelines
         self.ports = [Port(self, i, self.port_num_vcs[i], buffer_capacity)
@@ -190,22 +342,24 @@ class Router(PipelineModule):
         self.sa_stage_queues = [[[] for _ in range(self.port_num_vcs[i])]
                                 for i in range(num_ports)]
         self.st_stage_queues = [[] for _ in range(num_ports)]
+        # Active sets: VCs with SA work per input port, input ports with any
+        # SA work and output ports with a packet waiting for ST.
+        self.sa_vc_masks = [0 for _ in range(num_ports)]
+        self.sa_port_mask = 0
+        self.st_port_mask = 0
 
-        funcs = [
-            lambda m, d: (d, self.SA, False),  # unused RC
-            lambda m, d: (d, self.SA, False),  # unused VA
-            lambda m, d: Router._stage_sa(m, d),
-            lambda m, d: Router._stage_st(m, d),
-        ]
-        self.set_stage_funcs(funcs)
+        self.set_stage_funcs(self.STAGE_FUNCS)
 
-        self.on_stage_funcs = [lambda m: None for _ in range(self.num_stages)]
+        self.on_stage_funcs = [None] * self.num_stages
 
     # ------------------------------------------------------------------
     # basic infrastructure overrides
     def _process_event(self, event):
         """Router delays releasing reserved slot until packet leaves."""
-        if self.engine.logger:
+        logger = self.engine.logger
+        if logger and logger.accepts(
+            self.engine.current_cycle, self.name, event.event_type
+        ):
             if isinstance(event.payload, dict):
                 stage_idx = event.payload.get('stage_idx', 0)
                 if stage_idx == self.RC:
@@ -215,7 +369,7 @@ class Router(PipelineModule):
                 stage_name = f"P{port}_{self.STAGE_NAMES.get(stage_idx, stage_idx)}"
             else:
                 stage_name = '0'
-            self.engine.logger.log_event(
+            logger.log_event(
                 self.engine.current_cycle, self.name, stage_name, event.event_type
             )
         self.handle_event(event)
@@ -225,6 +379,8 @@ class Router(PipelineModule):
         """Check downstream VC buffer capacity before accepting packet."""
         if event is None:
             return True
+        if self.module_ports and event.src in self.module_ports:
+            event.payload["input_port"] = self.module_ports[event.src]
         port = event.payload.get("input_port", 0)
         vc = event.payload.get("vc", 0)
         buf = self.ports[port].virtual_channels[vc]
@@ -233,16 +389,144 @@ class Router(PipelineModule):
             + len(self.ports[port].va_stage_queues[vc])
             + len(self.sa_stage_queues[port][vc])
         )
+        if self.noc_stats is not None:
+            self.noc_stats.record_occupancy(self.x, self.y, port, vc, count)
         return count < self.buffer_capacity
 
     def _release_slot(self, payload):
         """Increment credit count when receiving a credit return."""
         port = payload.get("port")
+        if port is not None:
+            self._return_credit(port, payload.get("vc", 0))
+
+    def _return_credit(self, port, vc):
+        """Return one credit of output ``port``/``vc`` without an event."""
+        credits = self.credit_counts[port]
+        if credits[vc] is not None:
+            credits[vc] += 1
+        logger = self.engine.logger
+        if logger and logger.log_credits and logger.accepts(
+            self.engine.current_cycle, self.name, "RECV_CRED"
+        ):
+            logger.log_event(self.engine.current_cycle, self.name, f"P{port}_CRED", "RECV_CRED")
+
+    def _forward(self, event, dest, delay=1):
+        """Hand packet ``event`` itself to ``dest`` ``delay`` cycles from now."""
+        event.src = self
+        event.dst = dest
+        event.cycle = self.engine.current_cycle + delay
+        self.send_event(event)
+
+    def _release_output(self, out_port, in_port, in_vc, out_vc):
+        """Free ``out_port`` and its VC and return credits once a tail has left.
+
+        ``in_port`` is ``None`` for a multicast copy that leaves the upstream
+        credit to a later copy.
+        """
+        if self.output_links[out_port][1] is None:
+            # Ejection: the endpoint buffer is tracked by send_event
+            Router._return_credit(self, out_port, out_vc)
+        if in_port is not None:
+            upstream, upstream_port = self.output_links[in_port]
+            if upstream_port is not None:
+                upstream._return_credit(upstream_port, in_vc)
+        self._free_vc(out_port, out_vc)
+        self.crossbar_busy[out_port] = False
+
+    def set_pipeline(self, mode):
+        """Select the ``full``, ``lookahead`` or ``bypass`` pipeline."""
+        if mode not in PIPELINE_MODES:
+            raise ValueError(f"unknown router pipeline {mode!r}")
+        self.lookahead = mode != "full"
+        self.bypass = mode == "bypass"
+
+    def _set_lookahead(self, payload, out_port):
+        """Route the packet for the next router while it is still here."""
+        if "dst_set" not in payload:
+            payload["lookahead_port"] = lookahead_port(self, out_port, payload)
+
+    def _bypass_vc(self, out_port, event):
+        """Output VC for a packet taking the bypass, ``None`` if it must queue."""
+        if self.crossbar_busy[out_port]:
+            return None
+        allowed = None
+        if self.routing is not None:
+            allowed = self.routing.allowed_vcs(self, event.payload, out_port)
+        if self.traffic_classes is not None:
+            allowed = self.traffic_classes.allowed_vcs(self, event, out_port, allowed)
+        return self.allocator.select_output_vc(self, out_port, allowed)
+
+    def _take_output(self, out_port, out_vc, event):
+        """VA and SA in one step: claim ``out_vc`` and the crossbar for ``event``."""
+        self._allocate_vc(out_port, out_vc, event)
+        event.payload["out_vc"] = out_vc
+        credits = self.credit_counts[out_port]
+        if credits[out_vc] is not None:
+            credits[out_vc] -= 1
+        self.crossbar_busy[out_port] = True
+        self._set_lookahead(event.payload, out_port)
+
+    def _take_escape(self, event):
+        """Move a packet that found no adaptive VC to the escape route."""
+        out_port, out_vc = self.routing.escape(self, event.payload)
+        if out_vc is not None:
+            event.payload["out_port"] = out_port
+            if self.lookahead:
+                self._set_lookahead(event.payload, out_port)
+        return out_port, out_vc
+
+    def _skip_rc(self, port_idx, event):
+        """Queue a packet routed by the upstream router straight for VA.
+
+        With bypass enabled a packet reaching an idle router goes straight
+        to switch traversal.  Returns ``False`` when the packet has to take
+        the full pipeline.
+        """
+        payload = event.payload
+        out_port = payload.get("lookahead_port")
         vc = payload.get("vc", 0)
-        if port is None:
-            return
-        if self.credit_counts[port][vc] is not None:
-            self.credit_counts[port][vc] += 1
+        port = self.ports[port_idx]
+        if out_port is None or "dst_set" in payload or \
+                port.virtual_channels[vc].stage_queues[Buffer.RC]:
+            return False
+        payload["out_port"] = out_port
+        if self.bypass and not (self.sa_port_mask or self.st_port_mask
+                                or any(p.va_mask for p in self.ports)):
+            out_vc = self._bypass_vc(out_port, event)
+            if out_vc is not None:
+                self._take_output(out_port, out_vc, event)
+                self.st_stage_queues[out_port].append(event)
+                self.st_port_mask |= 1 << out_port
+                if not self.stage_queues[self.ST]:
+                    self.stage_queues[self.ST].append(None)
+                self._schedule_stage(self.ST)
+                return True
+        queue = port.va_stage_queues[vc]
+        if len(queue) >= port.buffer_capacity:
+            return False
+        self._set_lookahead(payload, out_port)
+        queue.append(event)
+        port.va_mask |= 1 << vc
+        port._schedule_va()
+        return True
+
+    def _hold_output(self, out_port, hold, cycles):
+        """Keep ``out_port`` busy for ``cycles`` more cycles of body flits."""
+        self.held_outputs[out_port] = hold
+        evt = self.release_events[out_port]
+        if evt is None:
+            evt = Event(
+                src=self,
+                dst=self,
+                cycle=0,
+                event_type="LINK_RELEASE",
+                payload={"stage_idx": self.ST, "out_port": out_port},
+                # Before this cycle's ST and SA so the output is reusable
+                priority=-self.ST - 1,
+            )
+            self.release_events[out_port] = evt
+        evt.cycle = self.engine.current_cycle + cycles
+        self.engine.push_event(evt)
 
     # ------------------------------------------------------------------
     def set_neighbors(self, neighbor_dict):
@@ -257,15 +541,46 @@ class Router(PipelineModule):
             else:
                 self.credit_counts[out_port] = [n.buffer_capacity for _ in range(vc_count)]
 
-    def attach_module(self, mod):
-        self.attached_module = mod
-        self.output_links[DIR_INDEX["LOCAL"]] = (mod, None)
-        local_vcs = self.port_num_vcs[DIR_INDEX["LOCAL"]]
-        self.credit_counts[DIR_INDEX["LOCAL"]] = [mod.buffer_capacity for _ in range(local_vcs)]
+    def _record_credit_stall(self, out_port):
+        for vc in range(self.port_num_vcs[out_port]):
+            if (
+                self.output_vc_allocation[out_port][vc] is None
+                and self.credit_counts[out_port][vc] == 0
+            ):
+                self.noc_stats.record_credit_stall(self.x, self.y, out_port, vc)
+
+    def _record_sa_conflicts(self, requests):
+        counts = {}
+        for out_port in requests.values():
+            counts[out_port] = counts.get(out_port, 0) + 1
+        for out_port, n in counts.items():
+            if n > 1:
+                self.noc_stats.record_sa_conflicts(self.x, self.y, out_port, n - 1)
+
+    def attach_module(self, mod, port=0):
+        """Attach endpoint ``mod`` to local ``port`` (0 unless concentrated)."""
+        if port not in self.local_ports:
+            raise ValueError(f"[{self.name}] port {port} is not a local port")
+        if port == 0:
+            self.attached_module = mod
+        else:
+            self.module_ports[mod] = port
+        self.output_links[port] = (mod, None)
+        self.credit_counts[port] = [mod.buffer_capacity for _ in range(self.port_num_vcs[port])]
+
+    def _allocate_vc(self, out_port, out_vc, pkt):
+        self.output_vc_allocation[out_port][out_vc] = pkt
+        self.vc_free_masks[out_port] &= ~(1 << out_vc)
+
+    def _free_vc(self, out_port, out_vc):
+        self.output_vc_allocation[out_port][out_vc] = None
+        self.vc_free_masks[out_port] |= 1 << out_vc
 
     def _add_sa_candidate(self, port_idx, event):
         vc = event.payload.get("vc", 0)
         self.sa_stage_queues[port_idx][vc].append(event)
+        self.sa_vc_masks[port_idx] |= 1 << vc
+        self.sa_port_mask |= 1 << port_idx
         if not self.stage_queues[self.SA]:
             self.stage_queues[self.SA].append(None)
         self._schedule_stage(self.SA)
@@ -278,21 +593,24 @@ class Router(PipelineModule):
         if event.event_type in ("RETRY_SEND", "PIPE_STAGE"):
             super().handle_event(event)
             return
+        if event.event_type == "LINK_RELEASE":
+            out_port = event.payload["out_port"]
+            self._release_output(out_port, *self.held_outputs.pop(out_port))
+            return
 
         # incoming packet is queued to the appropriate port
         port_idx = event.payload.get("input_port", 0)
+        if port_idx in self.local_ports:
+            if self.trace is not None:
+                self.trace.record_injection(self, port_idx, event)
+        elif self.lookahead and self._skip_rc(port_idx, event):
+            return
         self.ports[port_idx].recv_packet(event)
 
     # Override to avoid buffer checks for internal stage events
     def _schedule_stage(self, idx):
         if not self.stage_scheduled[idx]:
-            evt = Event(src=self,
-                        dst=self,
-                        cycle=self.engine.current_cycle + 1,
-                        event_type="PIPE_STAGE",
-                        payload={"stage_idx": idx},
-                        priority=-idx)
-            self.engine.push_event(evt)
+            self.engine.push_event(self._stage_event(idx))
             self.stage_scheduled[idx] = True
 
     def _on_stage_execute(self, idx):
@@ -301,23 +619,34 @@ class Router(PipelineModule):
             func(self)
 
     def _stage_sa(self, _):
-        candidates = {}
-        for pidx in range(self.num_ports):
-            for vc_idx in range(self.port_num_vcs[pidx]):
-                if not self.sa_stage_queues[pidx][vc_idx]:
-                    continue
-                evt = self.sa_stage_queues[pidx][vc_idx][0]
-                out_port = evt.payload["out_port"]
+        nv = self.num_vcs
+        requests = {}
+        for pidx in self.port_bits[self.sa_port_mask]:
+            for vc_idx in self.vc_bits[self.sa_vc_masks[pidx]]:
+                out_port = self.sa_stage_queues[pidx][vc_idx][0].payload["out_port"]
                 if self.crossbar_busy[out_port]:
                     continue
-                candidates.setdefault(out_port, []).append((pidx, vc_idx, evt))
+                requests[pidx * nv + vc_idx] = out_port
 
-        winners = arbitrate_sa(candidates)
+        if self.noc_stats is not None:
+            self._record_sa_conflicts(requests)
+        if self.traffic_classes is not None:
+            winners = self.allocator.allocate(self.traffic_classes.prioritize(self, requests))
+            self.traffic_classes.served(self, winners)
+        else:
+            winners = self.allocator.allocate(requests)
         progress = False
-        for pidx, vc_idx, evt in winners:
+        for slot in winners:
+            pidx, vc_idx = divmod(slot, nv)
+            queue = self.sa_stage_queues[pidx][vc_idx]
+            evt = queue.pop(0)
             out_port = evt.payload["out_port"]
-            self.sa_stage_queues[pidx][vc_idx].pop(0)
+            if not queue:
+                self.sa_vc_masks[pidx] &= ~(1 << vc_idx)
+                if not self.sa_vc_masks[pidx]:
+                    self.sa_port_mask &= ~(1 << pidx)
             self.st_stage_queues[out_port].append(evt)
+            self.st_port_mask |= 1 << out_port
             self.crossbar_busy[out_port] = True
             progress = True
 
@@ -326,68 +655,60 @@ class Router(PipelineModule):
                 self.stage_queues[self.ST].append(None)
             self._schedule_stage(self.ST)
 
-        more = any(
-            self.sa_stage_queues[p][v]
-            for p in range(self.num_ports)
-            for v in range(self.port_num_vcs[p])
-        )
-        if more:
+        if self.sa_port_mask:
+            # The current token is popped once this call returns; queue
+            # another so leftover SA work runs next cycle.
+            if len(self.stage_queues[self.SA]) < 2:
+                self.stage_queues[self.SA].append(None)
             self._schedule_stage(self.SA)
         return None, self.SA + 1, False
 
+    def _sa_head(self, slot):
+        """Packet at the head of SA input ``slot``."""
+        pidx, vc_idx = divmod(slot, self.num_vcs)
+        return self.sa_stage_queues[pidx][vc_idx][0]
+
     def _stage_st(self, _):
         progress = False
-        for out_port in range(self.num_ports):
-            if not self.st_stage_queues[out_port]:
-                continue
-            event = self.st_stage_queues[out_port].pop(0)
-            in_port = event.payload.get("input_port", 0)
+        for out_port in self.port_bits[self.st_port_mask]:
+            queue = self.st_stage_queues[out_port]
+            event = queue.pop(0)
+            if not queue:
+                self.st_port_mask &= ~(1 << out_port)
+            in_port = multicast_input_port(event.payload)
             in_vc = event.payload.get("vc", 0)
             out_vc = event.payload["out_vc"]
 
+            flits = packet_flits(event.data_size, self.bitwidth)
+            if self.noc_stats is not None:
+                self.noc_stats.record_flit(self.x, self.y, out_port, out_vc, flits)
+
             dest, dest_port = self.output_links[out_port]
+            if dest_port is None and self.trace is not None:
+                self.trace.record_delivery(self, out_port, event,
+                                           self.engine.current_cycle + flits)
             event.payload["input_port"] = dest_port if dest_port is not None else 0
             event.payload["vc"] = out_vc
+            # The head moves on next cycle; an endpoint waits for the tail
+            self._forward(event, dest, flits if dest_port is None else 1)
 
-            new_event = Event(
-                src=self,
-                dst=dest,
-                cycle=self.engine.current_cycle + 1,
-                data_size=event.data_size,
-                program=event.program,
-                event_type=event.event_type,
-                payload=event.payload,
-            )
-            self.send_event(new_event)
-
-            if not isinstance(dest, Router):
-                cred_evt = Event(
-                    src=self,
-                    dst=self,
-                    cycle=self.engine.current_cycle,
-                    event_type="RECV_CRED",
-                    payload={"port": out_port, "vc": out_vc},
-                )
-                self._process_event(cred_evt)
-
-            upstream, upstream_port = self.output_links[in_port]
-            if isinstance(upstream, Router):
-                cred_evt = Event(
-                    src=self,
-                    dst=upstream,
-                    cycle=self.engine.current_cycle,
-                    event_type="RECV_CRED",
-                    payload={"port": upstream_port, "vc": in_vc},
-                )
-                upstream._process_event(cred_evt)
-
-            self.output_vc_allocation[out_port][out_vc] = None
-            self.crossbar_busy[out_port] = False
+            if flits > 1:
+                self._hold_output(out_port, (in_port, in_vc, out_vc), flits - 1)
+            else:
+                self._release_output(out_port, in_port, in_vc, out_vc)
             progress = True
 
-        if any(self.st_stage_queues[p] for p in range(self.num_ports)):
+        if self.st_port_mask:
             if not self.stage_queues[self.ST]:
                 self.stage_queues[self.ST].append(None)
             self._schedule_stage(self.ST)
 
         return None, self.ST + 1, False
+
+    # Stage functions shared by every router; RC and VA run in the ports
+    STAGE_FUNCS = (
+        lambda m, d: (d, m.SA, False),
+        lambda m, d: (d, m.SA, False),
+        lambda m, d: Router._stage_sa(m, d),
+        lambda m, d: Router._stage_st(m, d),
+    )
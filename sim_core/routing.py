@@ -0,0 +1,294 @@
+"""Routing algorithms compiled into next-hop tables.
+
+:class:`RoutingTable` turns a routing algorithm into a table mapping the
+offset from a router to the destination router to the tuple of permitted
+output ports.  Every supported algorithm depends only on that offset, so
+all routers share one table per route class and its size grows with the
+mesh rather than with its square.  RC then becomes a little arithmetic
+plus an index.  When a table entry holds several ports the algorithm is
+partially adaptive and :meth:`RoutingTable.route` picks the output with the
+most free downstream credit.
+
+Supported algorithms:
+
+``xy`` / ``yx``
+    Dimension-order routing.
+``o1turn``
+    Each packet picks XY or YX at injection.  The two route classes use
+    disjoint VC sets (even/odd VCs) to stay deadlock free.
+``west_first``
+    Go west first, then route adaptively among east/north/south.
+``negative_first``
+    Route adaptively in the negative directions (west/north), then in the
+    positive ones (east/south).
+``adaptive``
+    Fully adaptive minimal routing: any productive direction, on VCs 1 and
+    up.  VC 0 is an escape channel restricted to the XY route.  A packet
+    that finds no VC on its chosen output takes the escape VC of the XY
+    output instead, which keeps the network deadlock free with at least two
+    VCs.
+"""
+
+import random
+from collections.abc import Mapping
+
+from .router import DIR_INDEX
+
+LOCAL = DIR_INDEX["LOCAL"]
+EAST = DIR_INDEX["E"]
+WEST = DIR_INDEX["W"]
+NORTH = DIR_INDEX["N"]
+SOUTH = DIR_INDEX["S"]
+
+
+def _x_port(dx):
+    return EAST if dx > 0 else WEST
+
+
+def _y_port(dy):
+    return SOUTH if dy > 0 else NORTH
+
+
+def xy_ports(dx, dy):
+    if dx:
+        return (_x_port(dx),)
+    if dy:
+        return (_y_port(dy),)
+    return (LOCAL,)
+
+
+def yx_ports(dx, dy):
+    if dy:
+        return (_y_port(dy),)
+    if dx:
+        return (_x_port(dx),)
+    return (LOCAL,)
+
+
+def west_first_ports(dx, dy):
+    if dx < 0:
+        return (WEST,)
+    ports = []
+    if dx > 0:
+        ports.append(EAST)
+    if dy:
+        ports.append(_y_port(dy))
+    return tuple(ports) or (LOCAL,)
+
+
+def negative_first_ports(dx, dy):
+    negative = []
+    if dx < 0:
+        negative.append(WEST)
+    if dy < 0:
+        negative.append(NORTH)
+    if negative:
+        return tuple(negative)
+    positive = []
+    if dx > 0:
+        positive.append(EAST)
+    if dy > 0:
+        positive.append(SOUTH)
+    return tuple(positive) or (LOCAL,)
+
+
+def minimal_ports(dx, dy):
+    ports = []
+    if dx:
+        ports.append(_x_port(dx))
+    if dy:
+        ports.append(_y_port(dy))
+    return tuple(ports) or (LOCAL,)
+
+
+# name -> one port function per route class
+ROUTING_ALGORITHMS = {
+    "xy": (xy_ports,),
+    "yx": (yx_ports,),
+    "o1turn": (xy_ports, yx_ports),
+    "west_first": (west_first_ports,),
+    "negative_first": (negative_first_ports,),
+    "adaptive": (minimal_ports,),
+}
+# Algorithms with an escape VC (VC 0) and the port function of its route
+ESCAPE_ROUTES = {
+    "adaptive": xy_ports,
+}
+
+
+class RoutingTable:
+    """Compiled next-hop tables for every router of ``mesh``.
+
+    ``offset_tables[route_class][offset_id]`` holds the permitted output
+    ports towards a destination router at that offset; ``offset_id`` wraps
+    the x and y offsets into ``spans``.  ``node_ids`` maps endpoint
+    coordinates to destination ids and ``tables`` expands one router's
+    ``[route_class][dst_id]`` view on access.  ``attach()`` installs the
+    shared tables on the routers.
+    """
+
+    def __init__(self, mesh, algorithm="xy"):
+        if algorithm not in ROUTING_ALGORITHMS:
+            raise ValueError(f"unknown routing algorithm {algorithm!r}")
+        self.algorithm = algorithm
+        self.port_funcs = ROUTING_ALGORITHMS[algorithm]
+        self.num_classes = len(self.port_funcs)
+        # The escape route is compiled as an extra table after the classes
+        escape = ESCAPE_ROUTES.get(algorithm)
+        self.escape_class = self.num_classes if escape else None
+        self.num_vc_classes = self.num_classes + (escape is not None)
+        # Destinations are the endpoint coordinates keyed in ``mesh``; the
+        # tables belong to the routers, which may serve several endpoints.
+        self.coords = sorted(mesh)
+        self.node_ids = {c: i for i, c in enumerate(self.coords)}
+        self.routers = {(r.x, r.y): r for r in mesh.values()}
+        x_size = max(x for x, _ in self.routers) + 1
+        y_size = max(y for _, y in self.routers) + 1
+        # Offsets -(n - 1) .. n - 1 wrapped into residues modulo 2n - 1
+        self.spans = (2 * x_size - 1, 2 * y_size - 1)
+        xs, ys = self.spans
+        self.offset_tables = [
+            [self._offset_ports(func, self._unwrap(i // ys, xs), self._unwrap(i % ys, ys))
+             for i in range(xs * ys)]
+            for func in self.port_funcs + ((escape,) if escape else ())
+        ]
+        self.adaptive = any(len(ports) > 1 for cls in self.offset_tables for ports in cls)
+        self.mesh = mesh
+
+    @staticmethod
+    def _unwrap(residue, span):
+        return residue if 2 * residue < span else residue - span
+
+    def _offset_ports(self, func, dx, dy):
+        """Permitted output ports towards a router ``(dx, dy)`` away."""
+        return func(dx, dy)
+
+    @property
+    def deterministic(self):
+        """True when every packet has exactly one route."""
+        return self.num_classes == 1 and not self.adaptive
+
+    @property
+    def tables(self):
+        """Per-router ``[route_class][dst_id]`` port lists, built on access."""
+        return _RouterTables(self)
+
+    def attach(self):
+        for router in self.routers.values():
+            router.routing = self
+            router.route_table = self.offset_tables
+        return self
+
+    def endpoint_port(self, coords):
+        """Local router port serving the endpoint at ``coords``."""
+        return 0
+
+    def ports(self, src, dst, route_class=0):
+        """Permitted output ports at router ``src`` towards endpoint ``dst``."""
+        xs, ys = self.spans
+        return self.offset_tables[route_class][
+            (dst[0] - src[0]) % xs * ys + (dst[1] - src[1]) % ys]
+
+    def next_port(self, src, dst, route_class=0):
+        """Return the first permitted output port from ``src`` to ``dst``."""
+        return self.ports(src, dst, route_class)[0]
+
+    # ------------------------------------------------------------------
+    # hooks called from the router pipeline
+    def route(self, router, payload):
+        """RC: return the output port for the packet carrying ``payload``."""
+        route_class = 0
+        if self.num_classes > 1:
+            route_class = payload.get("route_class")
+            if route_class is None or payload.get("input_port", 0) in router.local_ports:
+                # Choose a class at injection; replies that copy a payload
+                # pick a fresh one at their own source.
+                route_class = random.randrange(self.num_classes)
+                payload["route_class"] = route_class
+        if self.escape_class is not None and "dst_set" in payload:
+            # Multicast branches share one output, so they stay on the XY tree
+            route_class = self.escape_class
+        ports = self.ports((router.x, router.y), payload["dst_coords"], route_class)
+        if len(ports) == 1:
+            return ports[0]
+        # Free credits are the free downstream buffer slots, so the emptiest
+        # downstream queue wins
+        if self.escape_class is None:
+            return max(ports, key=lambda p: self._free_credit(router, p))
+        return max(ports, key=lambda p: self._adaptive_credit(router, payload, p))
+
+    @staticmethod
+    def _free_credit(router, out_port, first_vc=0):
+        credits = router.credit_counts[out_port]
+        alloc = router.output_vc_allocation[out_port]
+        return sum(
+            credits[vc] for vc in range(first_vc, len(credits))
+            if credits[vc] is not None and alloc[vc] is None
+        )
+
+    def _adaptive_credit(self, router, payload, out_port):
+        """Free credit along ``out_port`` for a packet of an escape algorithm.
+
+        Only the XY output may use the escape VC.  The neighbour's free
+        credit further in the same direction is added, so a port leading
+        into a congested row or column loses even while its own link is
+        free.
+        """
+        escape = out_port == self.escape_port(router, payload)
+        credit = self._free_credit(router, out_port, 0 if escape else 1)
+        nxt = router.output_links[out_port][0]
+        if nxt is not None and nxt.routing is self and nxt.output_links[out_port][1] is not None:
+            credit += self._free_credit(nxt, out_port, 1)
+        return credit
+
+    def escape_port(self, router, payload):
+        """Output port of the escape route, ``None`` without escape VCs."""
+        if self.escape_class is None:
+            return None
+        return self.ports((router.x, router.y), payload["dst_coords"], self.escape_class)[0]
+
+    def escape(self, router, payload):
+        """VA fallback: the escape port and a free escape VC on it.
+
+        Returns ``(port, None)`` while the escape VC is busy too.
+        """
+        port = self.escape_port(router, payload)
+        return port, router.allocator.select_output_vc(router, port, 1)
+
+    def allowed_vcs(self, router, payload, out_port):
+        """VA: bitmask of output VCs the packet may use, ``None`` for any."""
+        if out_port in router.local_ports:
+            return None
+        if self.escape_class is not None:
+            mask = (1 << router.port_num_vcs[out_port]) - 2
+            if out_port == self.escape_port(router, payload):
+                mask |= 1
+            return mask
+        if self.num_classes == 1:
+            return None
+        route_class = payload.get("route_class", 0)
+        n = router.port_num_vcs[out_port]
+        mask = 0
+        for vc in range(route_class, n, self.num_classes):
+            mask |= 1 << vc
+        return mask
+
+
+class _RouterTables(Mapping):
+    """Read-only ``coords -> [route_class][dst_id]`` view of a table."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __getitem__(self, src):
+        table = self.table
+        if tuple(src) not in table.routers:
+            raise KeyError(src)
+        return [[table.ports(src, dst, cls) for dst in table.coords]
+                for cls in range(table.num_classes)]
+
+    def __iter__(self):
+        return iter(sorted(self.table.routers))
+
+    def __len__(self):
+        return len(self.table.routers)
@@ -0,0 +1,291 @@
+"""Streaming, mergeable statistics for latency and other per-event samples.
+
+All collectors use O(1) or O(log range) memory and can be merged, so
+results gathered in different partitions or sweep workers combine cheaply.
+"""
+
+import math
+from statistics import NormalDist
+
+
+class RunningStats:
+    """Count, mean, variance, min and max using Welford's algorithm."""
+
+    __slots__ = ("count", "mean", "m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, x):
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        if self.min is None or x < self.min:
+            self.min = x
+        if self.max is None or x > self.max:
+            self.max = x
+
+    def merge(self, other):
+        """Fold ``other`` into this collector (Chan et al. parallel update)."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count = other.count
+            self.mean = other.mean
+            self.m2 = other.m2
+            self.min = other.min
+            self.max = other.max
+            return self
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative error guarantees (DDSketch).
+
+    Non-negative values are mapped to logarithmic buckets of ratio
+    ``gamma = (1 + a) / (1 - a)``; any quantile is then reported within a
+    relative error ``a`` of the exact value.  Sketches with the same accuracy
+    merge by adding bucket counts.
+    """
+
+    def __init__(self, relative_accuracy=0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be in (0, 1)")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, x, count=1):
+        if x < 0:
+            raise ValueError("QuantileSketch only accepts non-negative values")
+        self.count += count
+        if x == 0:
+            self.zero_count += count
+            return
+        idx = math.ceil(math.log(x) / self._log_gamma)
+        self.bins[idx] = self.bins.get(idx, 0) + count
+
+    def merge(self, other):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("cannot merge sketches with different accuracy")
+        for idx, cnt in other.bins.items():
+            self.bins[idx] = self.bins.get(idx, 0) + cnt
+        self.zero_count += other.zero_count
+        self.count += other.count
+        return self
+
+    def quantile(self, q):
+        """Return the approximate ``q`` quantile (``0 <= q <= 1``)."""
+        if not 0 <= q <= 1:
+            raise ValueError("q must be in [0, 1]")
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for idx in sorted(self.bins):
+            seen += self.bins[idx]
+            if rank < seen:
+                return 2 * self.gamma ** idx / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.bins) / (self.gamma + 1)
+
+
+class LatencyStats:
+    """Streaming latency summary with per source/destination aggregates.
+
+    ``overall`` holds count/mean/variance, ``sketch`` answers quantiles and
+    ``pairs`` maps ``(src, dst)`` to a :class:`RunningStats`.  Pair tracking
+    costs one small object per communicating pair and can be disabled.
+    """
+
+    def __init__(self, relative_accuracy=0.01, track_pairs=True):
+        self.overall = RunningStats()
+        self.sketch = QuantileSketch(relative_accuracy)
+        self.track_pairs = track_pairs
+        self.pairs = {}
+
+    def add(self, latency, src=None, dst=None):
+        self.overall.add(latency)
+        self.sketch.add(latency)
+        if self.track_pairs and (src is not None or dst is not None):
+            key = (src, dst)
+            stats = self.pairs.get(key)
+            if stats is None:
+                stats = RunningStats()
+                self.pairs[key] = stats
+            stats.add(latency)
+
+    def merge(self, other):
+        self.overall.merge(other.overall)
+        self.sketch.merge(other.sketch)
+        if not self.track_pairs:
+            return self
+        for key, stats in other.pairs.items():
+            mine = self.pairs.get(key)
+            if mine is None:
+                mine = RunningStats()
+                self.pairs[key] = mine
+            mine.merge(stats)
+        return self
+
+    @classmethod
+    def merged(cls, collectors, relative_accuracy=0.01, track_pairs=None):
+        """Return a new collector combining every collector in ``collectors``.
+
+        Per-pair statistics are merged too.  ``track_pairs`` defaults to
+        whether any of ``collectors`` tracks pairs.
+        """
+        collectors = list(collectors)
+        if track_pairs is None:
+            track_pairs = any(c.track_pairs for c in collectors) if collectors else True
+        out = cls(relative_accuracy, track_pairs)
+        for c in collectors:
+            out.merge(c)
+        return out
+
+    @property
+    def count(self):
+        return self.overall.count
+
+    @property
+    def mean(self):
+        return self.overall.mean
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def summary(self):
+        return {
+            "count": self.overall.count,
+            "mean": self.overall.mean,
+            "stddev": self.overall.stddev,
+            "min": self.overall.min,
+            "max": self.overall.max,
+            "p50": self.sketch.quantile(0.5),
+            "p99": self.sketch.quantile(0.99),
+            "p999": self.sketch.quantile(0.999),
+        }
+
+    def pair_summary(self):
+        """Return ``{(src, dst): (count, mean, stddev)}``."""
+        return {
+            key: (s.count, s.mean, s.stddev) for key, s in self.pairs.items()
+        }
+
+
+def t_quantile(p, df):
+    """Approximate ``p`` quantile of Student's t with ``df`` degrees of freedom.
+
+    Uses the Cornish-Fisher expansion around the normal quantile, which is
+    accurate to about 1% from ``df = 5`` on.
+    """
+    z = NormalDist().inv_cdf(p)
+    z3 = z ** 3
+    return (z + (z3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z3 - 15 * z) / (384 * df ** 3))
+
+
+def mser_truncation(series):
+    """Warm-up length of ``series`` by the MSER rule.
+
+    Returns the ``d`` in the first half of the series minimising the
+    marginal standard error ``sum((x - mean)^2) / (n - d)^2`` of
+    ``series[d:]``.  Returns ``None`` while the minimum lies at the end of
+    that range, i.e. the run is still too short to tell the transient from
+    the steady state.
+    """
+    n = len(series)
+    if n < 4:
+        return None
+    half = n // 2
+    total = sum(series[half:])
+    squares = sum(x * x for x in series[half:])
+    best, best_d = None, None
+    # Grow the suffix from the second half to the whole series
+    for d in range(half, -1, -1):
+        if d < half:
+            x = series[d]
+            total += x
+            squares += x * x
+        m = n - d
+        mse = (squares - total * total / m) / (m * m)
+        if best is None or mse < best:
+            best, best_d = mse, d
+    return best_d if best_d < half else None
+
+
+class BatchMeans:
+    """Means of consecutive batches of ``batch_size`` samples.
+
+    Keeps one float per batch.  :meth:`warmup` applies MSER to the batch
+    means (MSER-5 for the default batch size) and :meth:`interval` gives a
+    batch-means confidence interval over the batches after the warm-up.
+    """
+
+    def __init__(self, batch_size=5):
+        self.batch_size = batch_size
+        self.means = []
+        self._sum = 0.0
+        self._n = 0
+
+    def add(self, x):
+        self._sum += x
+        self._n += 1
+        if self._n == self.batch_size:
+            self.means.append(self._sum / self._n)
+            self._sum = 0.0
+            self._n = 0
+
+    @property
+    def count(self):
+        return len(self.means) * self.batch_size + self._n
+
+    def warmup(self):
+        """Number of leading batches to discard, ``None`` if not yet known."""
+        return mser_truncation(self.means)
+
+    def interval(self, start=0, num_batches=20, confidence=0.95):
+        """Return ``(mean, half_width)`` over the batches from ``start``.
+
+        The batches are regrouped into ``num_batches`` larger batches so
+        their means are close to independent.  ``None`` when there are too
+        few batches.
+        """
+        means = self.means[start:]
+        size = len(means) // num_batches
+        if size == 0 or num_batches < 2:
+            return None
+        means = means[len(means) - size * num_batches:]
+        grouped = [sum(means[i:i + size]) / size for i in range(0, len(means), size)]
+        stats = RunningStats()
+        for m in grouped:
+            stats.add(m)
+        half = t_quantile(0.5 + confidence / 2, num_batches - 1) * stats.stddev
+        return stats.mean, half / math.sqrt(num_batches)
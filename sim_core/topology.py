@@ -0,0 +1,223 @@
+"""Network topologies beyond the plain 2D mesh.
+
+The builders return the same ``coords -> router`` dictionary as
+:func:`~sim_core.mesh.create_mesh`, so ``mesh_info["router_map"]`` and the
+hardware modules keep working unchanged:
+
+:func:`create_torus`
+    2D mesh with wrap-around links.  Dimension-order routing takes the
+    shorter way round each ring and dateline VC classes keep the rings
+    deadlock free, so at least two VCs are required.
+:func:`create_ring`
+    A one dimensional torus of ``n`` routers.
+:func:`create_cmesh`
+    Concentrated mesh: each router serves a block of endpoints on extra
+    local ports.  The dictionary is keyed by endpoint coordinates; attach
+    modules with :func:`attach_endpoint` so each lands on its own port.
+
+Every builder stores the endpoint hop-distance matrix of
+:func:`hop_distances` in ``mesh_info["hop_distances"]``.
+"""
+
+from collections import deque
+
+from .mesh import ROUTER_BACKENDS, build_routers, connect_grid, create_mesh, install_routing
+from .router import local_port_ids
+from .routing import RoutingTable, EAST, WEST, NORTH, SOUTH
+
+# Routing algorithms that stay minimal and deadlock free on wrapped rings
+TORUS_ROUTING = ("xy", "yx")
+
+
+def ring_offset(delta, size):
+    """Shortest signed offset along a wrapped dimension of ``size`` routers.
+
+    Ties go the positive way.  Dimensions of two or fewer routers have no
+    wrap link and keep the plain offset.
+    """
+    if size <= 2:
+        return delta
+    delta %= size
+    if 2 * delta > size:
+        delta -= size
+    return delta
+
+
+class TorusRoutingTable(RoutingTable):
+    """Minimal dimension-order routing on a torus with dateline VC classes.
+
+    A packet whose remaining path in the current dimension still crosses
+    the wrap-around link uses the even VCs; once across, or when it never
+    needs to cross, it uses the odd VCs.  Each ring's channel dependencies
+    therefore end at the dateline.
+    """
+
+    def __init__(self, mesh, x_size, y_size, algorithm="xy"):
+        if algorithm not in TORUS_ROUTING:
+            raise ValueError(f"{algorithm!r} routing is not supported on a torus")
+        self.x_size = x_size
+        self.y_size = y_size
+        self._class_masks = {}
+        super().__init__(mesh, algorithm)
+
+    def _offset_ports(self, func, dx, dy):
+        return func(ring_offset(dx, self.x_size), ring_offset(dy, self.y_size))
+
+    def allowed_vcs(self, router, payload, out_port):
+        if out_port == EAST or out_port == WEST:
+            pos, size, dst = router.x, self.x_size, payload["dst_coords"][0]
+        elif out_port == NORTH or out_port == SOUTH:
+            pos, size, dst = router.y, self.y_size, payload["dst_coords"][1]
+        else:
+            return None
+        if size <= 2:
+            return None
+        if out_port == EAST or out_port == SOUTH:
+            crosses = dst < pos
+        else:
+            crosses = dst > pos
+        n = router.port_num_vcs[out_port]
+        masks = self._class_masks.get(n)
+        if masks is None:
+            masks = tuple(sum(1 << vc for vc in range(cls, n, 2)) for cls in (0, 1))
+            self._class_masks[n] = masks
+        return masks[0 if crosses else 1]
+
+
+class ConcentratedRoutingTable(RoutingTable):
+    """Mesh routing between routers that each serve a block of endpoints.
+
+    Endpoint ``(x, y)`` belongs to router ``(x // cx, y // cy)`` for a
+    ``(cx, cy)`` concentration and is reached through the local port given
+    by :meth:`endpoint_port`.
+    """
+
+    def __init__(self, mesh, concentration, algorithm="xy"):
+        self.cx, self.cy = concentration
+        self.local_ports = local_port_ids(self.cx * self.cy)
+        super().__init__(mesh, algorithm)
+
+    def router_coords(self, coords):
+        return (coords[0] // self.cx, coords[1] // self.cy)
+
+    def endpoint_port(self, coords):
+        return self.local_ports[(coords[0] % self.cx) * self.cy + coords[1] % self.cy]
+
+    def ports(self, src, dst, route_class=0):
+        rx, ry = self.router_coords(dst)
+        if (rx, ry) == tuple(src):
+            return (self.endpoint_port(dst),)
+        return super().ports(src, (rx, ry), route_class)
+
+
+def hop_distances(mesh):
+    """Router-to-router hop counts between all endpoints of ``mesh``.
+
+    Returns an ``N x N`` NumPy array ordered like ``sorted(mesh)`` (the
+    destination ids of :class:`~sim_core.routing.RoutingTable`).  Endpoints
+    sharing a router are zero hops apart.
+    """
+    import numpy as np
+
+    coords = sorted(mesh)
+    routers = {id(r): r for r in mesh.values()}
+    router_hops = {}
+    for rid, router in routers.items():
+        dist = {rid: 0}
+        queue = deque([router])
+        while queue:
+            r = queue.popleft()
+            for n, in_port in r.output_links:
+                if in_port is None or id(n) in dist:
+                    continue
+                dist[id(n)] = dist[id(r)] + 1
+                queue.append(n)
+        router_hops[rid] = dist
+    matrix = np.zeros((len(coords), len(coords)), dtype=np.int64)
+    for i, src in enumerate(coords):
+        dist = router_hops[id(mesh[src])]
+        for j, dst in enumerate(coords):
+            matrix[i, j] = dist[id(mesh[dst])]
+    return matrix
+
+
+def topology_summary(mesh):
+    """Diameter and mean hop count over all endpoint pairs of ``mesh``."""
+    dist = hop_distances(mesh)
+    return {
+        "endpoints": len(dist),
+        "routers": len({id(r) for r in mesh.values()}),
+        "diameter": int(dist.max()),
+        "average_hops": float(dist.mean()),
+    }
+
+
+def attach_endpoint(mesh, coords, mod):
+    """Attach ``mod`` at endpoint ``coords`` on the matching local port."""
+    router = mesh[tuple(coords)]
+    routing = getattr(router, "routing", None)
+    port = routing.endpoint_port(coords) if routing is not None else 0
+    if port:
+        router.attach_module(mod, port)
+    else:
+        router.attach_module(mod)
+    return router
+
+
+def create_torus(engine, x_size, y_size, mesh_info, buffer_capacity=4, num_vcs=2,
+                 frequency=1000, backend="router", routing="xy", allocator="random"):
+    """Build an ``x_size`` x ``y_size`` torus.
+
+    The detailed router backends and ``"analytic"`` are supported; the
+    vector backend has no dateline VC classes.
+    """
+    if backend == "vector":
+        raise ValueError("vector backend only supports the 2D mesh topology")
+    mesh, noc = build_routers(engine, x_size, y_size, mesh_info, buffer_capacity, num_vcs,
+                              frequency, backend, allocator)
+    connect_grid(mesh, x_size, y_size, wrap_x=x_size > 2, wrap_y=y_size > 2)
+    table = TorusRoutingTable(mesh, x_size, y_size, routing)
+    install_routing(mesh, noc, table, num_vcs, min_vcs=2 if max(x_size, y_size) > 2 else 1)
+    mesh_info["hop_distances"] = hop_distances(mesh)
+    return mesh
+
+
+def create_ring(engine, num_routers, mesh_info, buffer_capacity=4, num_vcs=2,
+                frequency=1000, backend="router", allocator="random"):
+    """Build a bidirectional ring of routers ``(0, 0)`` .. ``(num_routers - 1, 0)``."""
+    return create_torus(engine, num_routers, 1, mesh_info, buffer_capacity, num_vcs,
+                        frequency, backend, allocator=allocator)
+
+
+def create_cmesh(engine, x_size, y_size, mesh_info, concentration=2, buffer_capacity=4,
+                 num_vcs=2, frequency=1000, backend="router", routing="xy",
+                 allocator="random"):
+    """Build an ``x_size`` x ``y_size`` mesh of concentrated routers.
+
+    ``concentration`` is a ``(cx, cy)`` block of endpoints per router or an
+    integer ``c`` for a ``(c, 1)`` block.  The returned dictionary and
+    ``mesh_info["mesh_size"]`` cover the ``(x_size * cx, y_size * cy)``
+    endpoint grid.  Only the per-router backends are supported.
+    """
+    if backend not in ROUTER_BACKENDS:
+        raise ValueError(f"{backend!r} backend only supports the 2D mesh topology")
+    if isinstance(concentration, int):
+        concentration = (concentration, 1)
+    cx, cy = concentration
+    routers, _ = build_routers(engine, x_size, y_size, mesh_info, buffer_capacity, num_vcs,
+                               frequency, backend, allocator, num_local_ports=cx * cy)
+    connect_grid(routers, x_size, y_size)
+    mesh = {(x, y): routers[(x // cx, y // cy)]
+            for x in range(x_size * cx) for y in range(y_size * cy)}
+    install_routing(mesh, None, ConcentratedRoutingTable(mesh, concentration, routing), num_vcs)
+    mesh_info["mesh_size"] = (x_size * cx, y_size * cy)
+    mesh_info["hop_distances"] = hop_distances(mesh)
+    return mesh
+
+
+# name -> builder taking the router grid size, used by the traffic drivers
+TOPOLOGIES = {
+    "mesh": create_mesh,
+    "torus": create_torus,
+    "cmesh": create_cmesh,
+}
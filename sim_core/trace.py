@@ -0,0 +1,314 @@
+"""Recording and replaying the packets injected into a NoC.
+
+:class:`TraceRecorder` attaches to the routers of a per-router mesh and
+writes one record for every packet a module injects at a local port: the
+cycle it reached the router, the source router and port, the destinations,
+the size and the event type.  A packet also records the last packet
+delivered to the same endpoint before it was injected and the gap between
+the two.  That is the dependency replay keeps.
+
+:func:`replay_trace` feeds a trace into a bare mesh of any backend.
+Packets without a dependency are injected at their recorded cycle.  A
+dependent packet is injected ``gap`` cycles after its dependency reaches
+the endpoint in the replay, so request/response chains stretch and shrink
+with the network under study.
+
+Traces are a stream of little-endian binary records after an
+``MSTRACE1`` header holding the mesh size.  Event type names are written
+once, the first time they occur, and referred to by index afterwards.
+Both sides stream: the recorder writes as it goes and the replayer reads a
+bounded window of records ahead of the simulation.
+"""
+
+import struct
+from collections import namedtuple
+
+from .event import Event
+from .mesh import ROUTER_BACKENDS, create_mesh
+from .module import HardwareModule
+from .stats import LatencyStats
+
+MAGIC = b"MSTRACE1"
+_HEADER = struct.Struct("<8sHH")
+_KIND = struct.Struct("<B")
+_TYPE = struct.Struct("<HH")
+_PACKET = struct.Struct("<QIiIHHBHIH")
+_COORD = struct.Struct("<HH")
+TYPE_RECORD = 0
+PACKET_RECORD = 1
+
+TraceRecord = namedtuple(
+    "TraceRecord",
+    "cycle packet_id dep_id gap src port event_type data_size dsts",
+)
+TraceRecord.__doc__ = """One injected packet.
+
+``dep_id`` is ``-1`` for a packet without a dependency.  ``src`` is the
+source router coordinates and ``port`` its local port.  ``dsts`` is a
+tuple of destination coordinates, one entry for a unicast packet.
+"""
+
+
+class TraceWriter:
+    """Append :class:`TraceRecord` entries to a binary trace file."""
+
+    def __init__(self, path, mesh_size):
+        self.file = open(path, "wb")
+        self.file.write(_HEADER.pack(MAGIC, *mesh_size))
+        self.type_ids = {}
+        self.count = 0
+
+    def write(self, record):
+        type_id = self.type_ids.get(record.event_type)
+        if type_id is None:
+            type_id = len(self.type_ids)
+            self.type_ids[record.event_type] = type_id
+            name = str(record.event_type).encode()
+            self.file.write(_KIND.pack(TYPE_RECORD) + _TYPE.pack(type_id, len(name)) + name)
+        self.file.write(_KIND.pack(PACKET_RECORD) + _PACKET.pack(
+            record.cycle, record.packet_id, record.dep_id, record.gap,
+            record.src[0], record.src[1], record.port, type_id,
+            record.data_size or 0, len(record.dsts),
+        ))
+        for dst in record.dsts:
+            self.file.write(_COORD.pack(*dst))
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+
+def read_header(path):
+    """Return the ``(x, y)`` mesh size stored in trace ``path``."""
+    with open(path, "rb") as f:
+        magic, x, y = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a MockSim trace")
+    return x, y
+
+
+def read_trace(path):
+    """Yield the :class:`TraceRecord` entries of ``path`` in injection order."""
+    read_header(path)
+    types = {}
+    with open(path, "rb") as f:
+        f.seek(_HEADER.size)
+        while True:
+            kind = f.read(1)
+            if not kind:
+                return
+            if kind[0] == TYPE_RECORD:
+                type_id, length = _TYPE.unpack(f.read(_TYPE.size))
+                types[type_id] = f.read(length).decode()
+                continue
+            (cycle, packet_id, dep_id, gap, sx, sy, port, type_id, size,
+             ndst) = _PACKET.unpack(f.read(_PACKET.size))
+            dsts = tuple(_COORD.unpack(f.read(_COORD.size)) for _ in range(ndst))
+            yield TraceRecord(cycle, packet_id, dep_id, gap, (sx, sy), port,
+                              types[type_id], size, dsts)
+
+
+class TraceRecorder:
+    """Record every packet injected into ``mesh`` to the trace at ``path``.
+
+    Works with the per-router backends.  Call :meth:`close` (or use the
+    recorder as a context manager) to flush the file.
+    """
+
+    def __init__(self, mesh, path):
+        routers = set(mesh.values())
+        if not all(isinstance(r, tuple(ROUTER_BACKENDS.values())) for r in routers):
+            raise ValueError("trace recording needs a per-router backend")
+        mesh_size = (max(r.x for r in routers) + 1, max(r.y for r in routers) + 1)
+        self.writer = TraceWriter(path, mesh_size)
+        # (router, local port) -> (packet id, delivery cycle)
+        self.last_delivery = {}
+        self.next_id = 0
+        for r in routers:
+            r.trace = self
+
+    # ------------------------------------------------------------------
+    # hooks called from the router
+    def record_injection(self, router, port, event):
+        now = router.engine.current_cycle
+        payload = event.payload
+        packet_id = self.next_id
+        self.next_id += 1
+        payload["trace_id"] = packet_id
+        dep_id, gap = -1, 0
+        last = self.last_delivery.get((router, port))
+        if last is not None and last[1] <= now:
+            dep_id, gap = last[0], now - last[1]
+        dsts = payload.get("dst_set") or (payload["dst_coords"],)
+        self.writer.write(TraceRecord(
+            now, packet_id, dep_id, gap, (router.x, router.y), port,
+            event.event_type, event.data_size, tuple(tuple(d) for d in dsts),
+        ))
+
+    def record_delivery(self, router, port, event, cycle):
+        packet_id = event.payload.get("trace_id")
+        if packet_id is not None:
+            self.last_delivery[(router, port)] = (packet_id, cycle)
+
+    # ------------------------------------------------------------------
+    @property
+    def count(self):
+        return self.writer.count
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TraceEndpoint(HardwareModule):
+    """Endpoint injecting trace packets at one local router port."""
+
+    def __init__(self, engine, name, mesh_info, replayer, router, port, buffer_capacity=4):
+        super().__init__(engine, name, mesh_info, buffer_capacity)
+        self.replayer = replayer
+        self.router = router
+        self.port = port
+
+    def handle_event(self, event):
+        if event.event_type == "TRACE_INJECT":
+            rec = event.payload["record"]
+            payload = {
+                "dst_coords": rec.dsts[0],
+                "start_cycle": self.engine.current_cycle,
+                "input_port": self.port,
+                "vc": 0,
+                "trace_id": rec.packet_id,
+            }
+            if len(rec.dsts) > 1:
+                payload["dst_set"] = rec.dsts
+            self.send_event(Event(src=self, dst=self.router, cycle=self.engine.current_cycle,
+                                  data_size=rec.data_size, event_type=rec.event_type,
+                                  payload=payload))
+            self.replayer.injected_one()
+        elif event.event_type == "RETRY_SEND":
+            super().handle_event(event)
+        else:
+            self.replayer.delivered(self, event)
+
+
+class TraceReplayer:
+    """Inject the packets of a trace into ``mesh`` while streaming the file.
+
+    At most ``window`` records are read ahead of the simulation.  A record
+    whose dependency is more than ``4 * window`` packets older is injected
+    at its recorded cycle, since that delivery is no longer tracked.
+    """
+
+    def __init__(self, engine, mesh, mesh_info, path, window=4096):
+        self.engine = engine
+        self.mesh = mesh
+        self.mesh_info = mesh_info
+        self.records = read_trace(path)
+        self.window = window
+        self.pending = 0
+        self.exhausted = False
+        self.endpoints = {}
+        # (packet id, endpoint) -> delivery cycle, and packets waiting on it
+        self.deliveries = {}
+        self.waiting = {}
+        self.oldest_id = 0
+        self.last_id = -1
+        self.injected = 0
+        self.received = 0
+        self.latency_stats = LatencyStats(track_pairs=False)
+
+    def endpoint(self, coords, port):
+        key = (tuple(coords), port)
+        ep = self.endpoints.get(key)
+        if ep is None:
+            router = self.mesh[key[0]]
+            ep = TraceEndpoint(self.engine, f"TRACE_{coords[0]}_{coords[1]}_P{port}",
+                               self.mesh_info, self, router, port)
+            if port:
+                router.attach_module(ep, port)
+            else:
+                router.attach_module(ep)
+            self.engine.register_module(ep)
+            self.endpoints[key] = ep
+        return ep
+
+    def start(self):
+        """Create an endpoint at every router and read the first window."""
+        for coords in self.mesh:
+            self.endpoint(coords, 0)
+        self._fill()
+
+    def _fill(self):
+        while not self.exhausted and self.pending < self.window:
+            rec = next(self.records, None)
+            if rec is None:
+                self.exhausted = True
+                break
+            self.pending += 1
+            self.last_id = rec.packet_id
+            ep = self.endpoint(rec.src, rec.port)
+            if rec.dep_id < self.oldest_id:
+                self._inject(ep, rec, rec.cycle)
+                continue
+            key = (rec.dep_id, ep)
+            done = self.deliveries.get(key)
+            if done is not None:
+                self._inject(ep, rec, done + rec.gap)
+            else:
+                self.waiting.setdefault(key, []).append(rec)
+
+    def _inject(self, ep, rec, cycle):
+        ep.engine.push_event(Event(
+            src=None,
+            dst=ep,
+            cycle=max(cycle, self.engine.current_cycle),
+            event_type="TRACE_INJECT",
+            payload={"record": rec},
+        ))
+
+    def delivered(self, ep, event):
+        """Called by an endpoint when a packet arrives."""
+        now = self.engine.current_cycle
+        self.received += 1
+        self.latency_stats.add(now - event.payload.get("start_cycle", now))
+        packet_id = event.payload.get("trace_id")
+        key = (packet_id, ep)
+        self.deliveries[key] = now
+        for rec in self.waiting.pop(key, ()):
+            self._inject(ep, rec, now + rec.gap)
+        # Forget deliveries no future record can still depend on
+        oldest = self.last_id - 4 * self.window
+        if oldest > self.oldest_id + self.window:
+            self.oldest_id = oldest
+            self.deliveries = {k: v for k, v in self.deliveries.items() if k[0] >= oldest}
+
+    def injected_one(self):
+        self.injected += 1
+        self.pending -= 1
+        self._fill()
+
+
+def replay_trace(path, backend="router", mesh_size=None, window=4096, max_tick=None,
+                 **mesh_kwargs):
+    """Replay trace ``path`` on a bare :func:`~sim_core.mesh.create_mesh`.
+
+    ``mesh_size`` defaults to the size stored in the trace; ``mesh_kwargs``
+    go to ``create_mesh``.  Returns the replayer and the engine after the
+    run.
+    """
+    from .engine import SimulatorEngine
+
+    x, y = mesh_size or read_header(path)
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (x, y), "router_map": None}
+    mesh = create_mesh(engine, x, y, mesh_info, backend=backend, **mesh_kwargs)
+    mesh_info["router_map"] = mesh
+    replayer = TraceReplayer(engine, mesh, mesh_info, path, window)
+    replayer.start()
+    engine.run_until_idle(max_tick=max_tick)
+    return replayer, engine
@@ -0,0 +1,112 @@
+"""Traffic classes: reserved virtual channels and priority switch allocation.
+
+Control messages are a few bytes but share the VCs of a per-router mesh
+with bulk DMA traffic, so by default a command waits behind every DMA
+packet queued on its path.  :class:`TrafficClasses` maps packets to classes
+by event type.  Each class but the last is ranked by priority and has one
+VC of every router-to-router port to itself, counted down from the top VC.
+The last class, ``bulk``, takes every other packet and the remaining VCs.
+Local ports keep their single VC.
+
+Switch allocation serves the highest-priority class requesting an output
+first.  An input VC that has lost ``starvation_limit`` allocations this way
+goes ahead of every class until it wins, so bulk traffic keeps moving
+under a steady stream of control packets.
+"""
+
+# Commands the CP sends and the completions the NPUs return
+CONTROL_EVENTS = (
+    "NPU_CMD",
+    "NPU_DMA_IN_DONE",
+    "NPU_CMD_DONE",
+    "NPU_DMA_OUT_DONE",
+)
+
+
+class TrafficClasses:
+    """Attach traffic classes to every router of ``mesh``.
+
+    ``classes`` is a sequence of ``(name, event_types)`` pairs, highest
+    priority first; event types not listed fall into the ``bulk`` class.
+    The mesh needs one VC more than there are listed classes and a routing
+    algorithm with a single VC class.
+    """
+
+    def __init__(self, mesh, classes=(("control", CONTROL_EVENTS),), starvation_limit=16):
+        if starvation_limit < 1:
+            raise ValueError("starvation_limit must be at least 1")
+        self.names = [name for name, _ in classes] + ["bulk"]
+        self.class_index = {}
+        for idx, (_, event_types) in enumerate(classes):
+            for event_type in event_types:
+                self.class_index.setdefault(event_type, idx)
+        self.bulk = len(classes)
+        self.starvation_limit = starvation_limit
+        self._masks = {}
+        routers = list(mesh.values())
+        for router in routers:
+            if not hasattr(router, "traffic_classes"):
+                raise ValueError(f"{type(router).__name__} does not support traffic classes")
+            if router.num_vcs <= self.bulk:
+                raise ValueError(f"{len(self.names)} traffic classes need at least "
+                                 f"{len(self.names)} VCs")
+            if router.routing is not None and router.routing.num_vc_classes > 1:
+                raise ValueError(f"{router.routing.algorithm!r} routing already "
+                                 "partitions the VCs")
+        for router in routers:
+            router.traffic_classes = self
+            # Allocations each input slot lost to a higher class
+            router.sa_waits = {}
+
+    def class_of(self, event):
+        """Index of the class of ``event``, 0 being the highest priority."""
+        return self.class_index.get(event.event_type, self.bulk)
+
+    def vc_masks(self, num_vcs):
+        """Per-class bitmasks of the VCs of a port with ``num_vcs`` VCs."""
+        masks = self._masks.get(num_vcs)
+        if masks is None:
+            masks = [1 << (num_vcs - 1 - idx) for idx in range(self.bulk)]
+            masks.append((1 << (num_vcs - self.bulk)) - 1)
+            self._masks[num_vcs] = masks
+        return masks
+
+    def allowed_vcs(self, router, event, out_port, allowed=None):
+        """VA: narrow the routing's ``allowed`` VCs to the class of ``event``."""
+        if out_port in router.local_ports:
+            return allowed
+        mask = self.vc_masks(router.port_num_vcs[out_port])[self.class_of(event)]
+        return mask if allowed is None else allowed & mask
+
+    def prioritize(self, router, requests):
+        """SA: keep the requests of the best class competing for each output.
+
+        ``requests`` maps input slots to output ports as passed to the
+        allocator.  Requests held back count towards the starvation limit.
+        """
+        waits = router.sa_waits
+        limit = self.starvation_limit
+        ranks = {}
+        best = {}
+        for slot, out_port in requests.items():
+            if waits.get(slot, 0) >= limit:
+                rank = -1
+            else:
+                rank = self.class_of(router._sa_head(slot))
+            ranks[slot] = rank
+            if rank < best.get(out_port, self.bulk + 1):
+                best[out_port] = rank
+        kept = {}
+        for slot, out_port in requests.items():
+            if ranks[slot] == best[out_port]:
+                kept[slot] = out_port
+            else:
+                waits[slot] = waits.get(slot, 0) + 1
+        return kept
+
+    def served(self, router, winners):
+        """Reset the starvation counters of the slots that won SA."""
+        waits = router.sa_waits
+        if waits:
+            for slot in winners:
+                waits.pop(slot, None)
@@ -0,0 +1,483 @@
+"""Cycle-stepped mesh NoC with all router state in mesh-wide NumPy arrays.
+
+For large, busy meshes nearly every router works every cycle and per-router
+events are pure overhead.  :class:`VectorMesh` instead advances ST, SA, VA
+and RC for every router with array operations once per cycle while packets
+are in flight.  Endpoints still talk to per-router :class:`VectorRouter`
+views with ordinary events, so NPUs, IODs and CPs attach unchanged.
+
+Timing follows :class:`~sim_core.flat_router.FlatRouter`: a packet arriving
+at cycle ``t`` is routed at ``t+1``, allocated a VC at ``t+2``, wins the
+switch at ``t+3`` and traverses it at ``t+4``.  Allocation conflicts are
+resolved with a seeded NumPy generator rather than ``random``, so results
+are reproducible but not draw-for-draw identical to the event backends.
+A packet of several ``bitwidth``-bit flits keeps its output and VC for one
+cycle per flit, as in :class:`~sim_core.router.Router`.
+"""
+
+import random
+
+import numpy as np
+
+from .module import HardwareModule
+from .event import Event
+from .router import DIRS, DIR_INDEX, OPPOSITE, Router, packet_flits
+from .routing import RoutingTable
+
+# Input port on the neighbour reached through each output port
+_OPPOSITE_PORT = np.array([DIR_INDEX[OPPOSITE[d]] for d in DIRS])
+
+
+class VectorRouter(HardwareModule):
+    """Per-router facade over :class:`VectorMesh` state.
+
+    ``credit_counts``, ``output_vc_allocation`` and ``crossbar_busy`` are
+    NumPy views into the mesh arrays; VC allocations hold packet ids with
+    ``-1`` marking a free VC.
+    """
+
+    STAGE_NAMES = Router.STAGE_NAMES
+
+    def __init__(self, mesh, index, mesh_x, mesh_y):
+        super().__init__(mesh.engine, f"Router_{mesh_x}_{mesh_y}", mesh.mesh_info,
+                         mesh.buffer_capacity, mesh.frequency)
+        self.mesh = mesh
+        self.index = index
+        self.x = mesh_x
+        self.y = mesh_y
+        self.num_ports = mesh.num_ports
+        self.num_vcs = mesh.num_vcs
+        self.port_num_vcs = [1] + [mesh.num_vcs] * (mesh.num_ports - 1)
+        self.output_links = [(None, None) for _ in range(self.num_ports)]
+        self.neighbors = {}
+        self.attached_module = None
+        self.stall_cycles = {}
+        self.noc_stats = None
+
+    @property
+    def credit_counts(self):
+        return self.mesh.credits[self.index]
+
+    @property
+    def output_vc_allocation(self):
+        return self.mesh.alloc[self.index]
+
+    @property
+    def crossbar_busy(self):
+        return self.mesh.busy[self.index]
+
+    # ------------------------------------------------------------------
+    def set_neighbors(self, neighbor_dict):
+        self.neighbors = neighbor_dict
+        for d, n in neighbor_dict.items():
+            out_port = DIR_INDEX[d]
+            self.output_links[out_port] = (n, DIR_INDEX[OPPOSITE[d]])
+            self.mesh.connect(self.index, out_port, n.index)
+
+    def attach_module(self, mod):
+        self.attached_module = mod
+        self.output_links[DIR_INDEX["LOCAL"]] = (mod, None)
+        self.mesh.credits[self.index, DIR_INDEX["LOCAL"], 0] = mod.buffer_capacity
+
+    def _reserve_slot(self, event=None):
+        """Check input VC capacity, counting packets still on the wire."""
+        if event is None:
+            return True
+        port = event.payload.get("input_port", 0)
+        vc = event.payload.get("vc", 0)
+        return self.mesh.reserve(self.index, port, vc)
+
+    def _release_slot(self, payload):
+        pass
+
+    def _process_event(self, event):
+        logger = self.engine.logger
+        if logger and logger.accepts(self.engine.current_cycle, self.name, event.event_type):
+            port = event.payload.get("input_port", 0)
+            logger.log_event(self.engine.current_cycle, self.name, f"P{port}_IN",
+                             event.event_type)
+        self.handle_event(event)
+
+    def handle_event(self, event):
+        if event.event_type == "RETRY_SEND":
+            super().handle_event(event)
+            return
+        if event.event_type == "RECV_CRED":
+            return
+        self.mesh.inject(self.index, event)
+
+
+class VectorMesh(HardwareModule):
+    """Mesh-wide router state advanced by one ``NOC_TICK`` per busy cycle.
+
+    Each input VC is a ring buffer of ``buffer_capacity`` packet ids split
+    into three consecutive regions: packets waiting for SA (VC allocated),
+    for VA (routed) and for RC.  ``heads`` points at the oldest packet and
+    ``n_sa``/``n_va``/``n_rc`` hold the region sizes.
+    """
+
+    def __init__(self, engine, x_size, y_size, mesh_info, buffer_capacity=4,
+                 num_vcs=2, frequency=1000, num_ports=5, seed=None, bitwidth=256):
+        super().__init__(engine, "NoC", mesh_info, buffer_capacity, frequency)
+        self.bitwidth = bitwidth
+        self.x_size = x_size
+        self.y_size = y_size
+        self.num_ports = num_ports
+        self.num_vcs = num_vcs
+        if seed is None:
+            seed = random.getrandbits(32)
+        self.rng = np.random.default_rng(seed)
+
+        n = x_size * y_size
+        shape = (n, num_ports, num_vcs)
+        self.router_x = np.repeat(np.arange(x_size), y_size)
+        self.router_y = np.tile(np.arange(y_size), x_size)
+        self.neighbor = np.full((n, num_ports), -1, dtype=np.int64)
+        self.valid_vc = np.zeros((num_ports, num_vcs), dtype=bool)
+        self.valid_vc[0, 0] = True
+        self.valid_vc[1:, :] = True
+
+        self.credits = np.zeros(shape, dtype=np.int64)
+        self.alloc = np.full(shape, -1, dtype=np.int64)
+        self.busy = np.zeros((n, num_ports), dtype=bool)
+        self.st_pid = np.full((n, num_ports), -1, dtype=np.int64)
+        # Outputs held by the body flits of a multi-flit packet: release
+        # cycle (-1 when free) and the input VC and output VC to free then
+        self.hold_until = np.full((n, num_ports), -1, dtype=np.int64)
+        self.hold_in_port = np.zeros((n, num_ports), dtype=np.int64)
+        self.hold_in_vc = np.zeros((n, num_ports), dtype=np.int64)
+        self.hold_out_vc = np.zeros((n, num_ports), dtype=np.int64)
+        self.held = 0
+
+        cap = buffer_capacity
+        self.buf = np.full(shape + (cap,), -1, dtype=np.int64)
+        self.heads = np.zeros(shape, dtype=np.int64)
+        self.n_sa = np.zeros(shape, dtype=np.int64)
+        self.n_va = np.zeros(shape, dtype=np.int64)
+        self.n_rc = np.zeros(shape, dtype=np.int64)
+        self.pending = np.zeros(shape, dtype=np.int64)
+
+        # packet table; every packet sits in a buffer slot or an ST register
+        max_packets = n * num_ports * num_vcs * cap + n * num_ports
+        self.pkt_event = [None] * max_packets
+        self.pkt_dst_x = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_dst_y = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_out = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_out_vc = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_in_port = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_in_vc = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_ready = np.zeros(max_packets, dtype=np.int64)
+        self.pkt_flits = np.ones(max_packets, dtype=np.int64)
+        self._free_ids = list(range(max_packets - 1, -1, -1))
+        self.packets = 0
+        self._next_tick = -1
+
+        self.routers = [VectorRouter(self, x * y_size + y, x, y)
+                        for x in range(x_size) for y in range(y_size)]
+        self.set_routing(RoutingTable({(r.x, r.y): r for r in self.routers}, "xy"))
+        engine.register_module(self)
+
+    def set_routing(self, routing):
+        """Use the deterministic :class:`~sim_core.routing.RoutingTable` ``routing``."""
+        if not routing.deterministic:
+            raise ValueError(
+                f"vector mesh only supports deterministic routing, not {routing.algorithm!r}")
+        self.routing = routing
+        # route_table[offset_id] -> output port, see RoutingTable.offset_tables
+        self.route_spans = routing.spans
+        self.route_table = np.array([ports[0] for ports in routing.offset_tables[0]],
+                                    dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # edge interface used by VectorRouter
+    def connect(self, index, out_port, neighbor_index):
+        self.neighbor[index, out_port] = neighbor_index
+        self.credits[index, out_port, :] = self.buffer_capacity
+
+    def _occupancy(self, index, port, vc):
+        return (self.n_sa[index, port, vc] + self.n_va[index, port, vc]
+                + self.n_rc[index, port, vc])
+
+    def reserve(self, index, port, vc):
+        count = self._occupancy(index, port, vc) + self.pending[index, port, vc]
+        stats = self.noc_stats
+        if stats is not None:
+            stats.record_occupancy(self.router_x[index], self.router_y[index], port, vc, count)
+        if count >= self.buffer_capacity:
+            return False
+        self.pending[index, port, vc] += 1
+        return True
+
+    def inject(self, index, event):
+        now = self.engine.current_cycle
+        port = event.payload.get("input_port", 0)
+        vc = event.payload.get("vc", 0)
+        dst = event.payload.get("dst_coords")
+        if dst is None:
+            raise ValueError(f"[{self.routers[index].name}] dst_coords missing in payload")
+        if len(event.payload.get("dst_set", ())) > 1:
+            raise ValueError(f"[{self.routers[index].name}] vector mesh has no multicast")
+        if self.pending[index, port, vc] > 0:
+            self.pending[index, port, vc] -= 1
+        if self._occupancy(index, port, vc) >= self.buffer_capacity:
+            raise RuntimeError(f"[{self.routers[index].name}] input P{port} VC{vc} overflow")
+        pid = self._free_ids.pop()
+        self.pkt_event[pid] = event
+        self.pkt_dst_x[pid] = dst[0]
+        self.pkt_dst_y[pid] = dst[1]
+        self.pkt_in_port[pid] = port
+        self.pkt_in_vc[pid] = vc
+        self.pkt_ready[pid] = now + 1
+        self.pkt_flits[pid] = packet_flits(event.data_size, self.bitwidth)
+        tail = (self.heads[index, port, vc] + self._occupancy(index, port, vc)) % self.buffer_capacity
+        self.buf[index, port, vc, tail] = pid
+        self.n_rc[index, port, vc] += 1
+        self.packets += 1
+        self._schedule_tick(now + 1)
+
+    @property
+    def noc_stats(self):
+        return self.routers[0].noc_stats
+
+    # ------------------------------------------------------------------
+    def _schedule_tick(self, cycle):
+        if cycle <= self._next_tick:
+            return
+        self._next_tick = cycle
+        evt = Event(src=self, dst=self, cycle=cycle, event_type="NOC_TICK", priority=-3)
+        self.engine.push_event(evt)
+
+    def _process_event(self, event):
+        self.handle_event(event)
+
+    def handle_event(self, event):
+        if event.event_type == "NOC_TICK":
+            if event.cycle >= self._next_tick:
+                # The tick may run a cycle before its label (float event
+                # times); forget it so the follow-up tick is not dropped
+                self._next_tick = -1
+            self.step(self.engine.current_cycle)
+            if self.packets or self.held:
+                self._schedule_tick(self.engine.current_cycle + 1)
+        else:
+            super().handle_event(event)
+
+    def step(self, now):
+        """Advance every router by one cycle (ST, SA, VA then RC)."""
+        logger = self.engine.logger
+        log = [] if logger else None
+        if self.held:
+            self._release_holds(now)
+        self._stage_st(now, log)
+        self._stage_sa(log)
+        self._stage_va(log)
+        self._stage_rc(now, log)
+        if log:
+            for index, port, stage in log:
+                name = self.routers[index].name
+                if logger.accepts(now, name, "NOC_TICK"):
+                    logger.log_event(now, name, f"P{port}_{Router.STAGE_NAMES[stage]}",
+                                     "NOC_TICK")
+
+    def _region_heads(self, offset):
+        """Packet id at ``heads + offset`` of every input VC."""
+        pos = (self.heads + offset) % self.buffer_capacity
+        return np.take_along_axis(self.buf, pos[..., None], axis=3)[..., 0]
+
+    @staticmethod
+    def _log_stage(log, rows, ports, stage):
+        if log is not None:
+            log.extend(zip(rows.tolist(), ports.tolist(), [stage] * len(rows)))
+
+    # ------------------------------------------------------------------
+    def _stage_st(self, now, log):
+        rows, outs = np.nonzero(self.st_pid >= 0)
+        if not len(rows):
+            return
+        pids = self.st_pid[rows, outs]
+        out_vcs = self.pkt_out_vc[pids]
+        in_ports = self.pkt_in_port[pids]
+        in_vcs = self.pkt_in_vc[pids]
+        flits = self.pkt_flits[pids]
+        self.st_pid[rows, outs] = -1
+        stats = self.noc_stats
+        if stats is not None:
+            np.add.at(stats.flits, (self.router_x[rows], self.router_y[rows], outs, out_vcs), flits)
+        self._log_stage(log, rows, outs, Router.ST)
+
+        # body flits keep the output busy until the tail leaves
+        long = flits > 1
+        if long.any():
+            r, o = rows[long], outs[long]
+            self.hold_until[r, o] = now + flits[long] - 1
+            self.hold_in_port[r, o] = in_ports[long]
+            self.hold_in_vc[r, o] = in_vcs[long]
+            self.hold_out_vc[r, o] = out_vcs[long]
+            self.held += len(r)
+        short = ~long
+        self._release(rows[short], outs[short], in_ports[short], in_vcs[short], out_vcs[short])
+
+        # router to router hops land directly in the neighbour's RC region
+        hop = outs > 0
+        if hop.any():
+            h_pids = pids[hop]
+            dst = self.neighbor[rows[hop], outs[hop]]
+            dport = _OPPOSITE_PORT[outs[hop]]
+            dvc = out_vcs[hop]
+            occ = self.n_sa[dst, dport, dvc] + self.n_va[dst, dport, dvc] + self.n_rc[dst, dport, dvc]
+            if stats is not None:
+                for d, p, v, c in zip(dst.tolist(), dport.tolist(), dvc.tolist(), occ.tolist()):
+                    stats.record_occupancy(self.router_x[d], self.router_y[d], p, v, c)
+            tail = (self.heads[dst, dport, dvc] + occ) % self.buffer_capacity
+            self.buf[dst, dport, dvc, tail] = h_pids
+            self.n_rc[dst, dport, dvc] += 1
+            self.pkt_in_port[h_pids] = dport
+            self.pkt_in_vc[h_pids] = dvc
+            self.pkt_ready[h_pids] = now + 2
+
+        # ejection to the attached endpoint
+        eject = ~hop
+        if eject.any():
+            e_rows = rows[eject]
+            e_vcs = out_vcs[eject]
+            e_flits = flits[eject]
+            for index, pid, vc, delay in zip(e_rows.tolist(), pids[eject].tolist(),
+                                             e_vcs.tolist(), e_flits.tolist()):
+                event = self.pkt_event[pid]
+                self.pkt_event[pid] = None
+                self._free_ids.append(pid)
+                self.packets -= 1
+                router = self.routers[index]
+                event.payload["out_port"] = 0
+                event.payload["out_vc"] = vc
+                event.payload["input_port"] = 0
+                event.payload["vc"] = vc
+                router.send_event(Event(
+                    src=router,
+                    dst=router.attached_module,
+                    cycle=now + delay,
+                    data_size=event.data_size,
+                    program=event.program,
+                    event_type=event.event_type,
+                    payload=event.payload,
+                ))
+
+    def _release(self, rows, outs, in_ports, in_vcs, out_vcs):
+        """Free outputs and VCs and return credits for departed tails."""
+        self.busy[rows, outs] = False
+        self.alloc[rows, outs, out_vcs] = -1
+        # credit back to the upstream router of each input VC
+        upstream = in_ports > 0
+        up_rows = self.neighbor[rows[upstream], in_ports[upstream]]
+        np.add.at(self.credits, (up_rows, _OPPOSITE_PORT[in_ports[upstream]], in_vcs[upstream]), 1)
+        # ejection credits; the endpoint buffer is tracked by send_event
+        eject = outs == 0
+        self.credits[rows[eject], 0, out_vcs[eject]] += 1
+
+    def _release_holds(self, now):
+        rows, outs = np.nonzero(self.hold_until == now)
+        if not len(rows):
+            return
+        self.hold_until[rows, outs] = -1
+        self.held -= len(rows)
+        self._release(rows, outs, self.hold_in_port[rows, outs],
+                      self.hold_in_vc[rows, outs], self.hold_out_vc[rows, outs])
+
+    def _stage_sa(self, log):
+        n, num_ports, num_vcs = self.n_sa.shape
+        has = self.n_sa > 0
+        if not has.any():
+            return
+        pids = self._region_heads(0)
+        out = np.where(has, self.pkt_out[np.where(has, pids, 0)], -1).reshape(n, -1)
+        keys = self.rng.random(out.shape)
+        stats = self.noc_stats
+        for o in range(num_ports):
+            mask = (out == o) & ~self.busy[:, o, None]
+            requests = mask.sum(axis=1)
+            rows = np.nonzero(requests)[0]
+            if not len(rows):
+                continue
+            if stats is not None:
+                lost = requests[rows] - 1
+                np.add.at(stats.sa_conflicts, (self.router_x[rows], self.router_y[rows], o), lost)
+            win = np.argmax(np.where(mask[rows], keys[rows], -1.0), axis=1)
+            ports, vcs = np.divmod(win, num_vcs)
+            self.st_pid[rows, o] = pids[rows, ports, vcs]
+            self.busy[rows, o] = True
+            self.heads[rows, ports, vcs] = (self.heads[rows, ports, vcs] + 1) % self.buffer_capacity
+            self.n_sa[rows, ports, vcs] -= 1
+            self._log_stage(log, rows, np.full(len(rows), o), Router.SA)
+
+    def _stage_va(self, log):
+        rows, ports, vcs = np.nonzero(self.n_va > 0)
+        if not len(rows):
+            return
+        pids = self._region_heads(self.n_sa)[rows, ports, vcs]
+        outs = self.pkt_out[pids]
+        free = (
+            (self.alloc[rows, outs] < 0)
+            & (self.credits[rows, outs] > 0)
+            & self.valid_vc[outs]
+        )
+        keys = np.where(free, self.rng.random(free.shape), -1.0)
+        out_vcs = np.argmax(keys, axis=1)
+        ok = free.any(axis=1)
+
+        stalled = np.nonzero(~ok)[0]
+        if len(stalled):
+            self._record_stalls(rows[stalled], outs[stalled], pids[stalled])
+
+        # one winner per requested output VC; a full SA region holds the head
+        ok &= self.n_sa[rows, ports, vcs] < self.buffer_capacity
+        req = np.nonzero(ok)[0]
+        if not len(req):
+            return
+        order = req[self.rng.permutation(len(req))]
+        key = (rows[order] * self.num_ports + outs[order]) * self.num_vcs + out_vcs[order]
+        _, first = np.unique(key, return_index=True)
+        win = order[first]
+        r, p, v = rows[win], ports[win], vcs[win]
+        o, ov, pid = outs[win], out_vcs[win], pids[win]
+        self.alloc[r, o, ov] = pid
+        self.credits[r, o, ov] -= 1
+        self.pkt_out_vc[pid] = ov
+        self.n_va[r, p, v] -= 1
+        self.n_sa[r, p, v] += 1
+        self._log_stage(log, r, p, Router.VA)
+
+    def _record_stalls(self, rows, outs, pids):
+        for index, pid in zip(rows.tolist(), pids.tolist()):
+            event = self.pkt_event[pid]
+            key = (event.program, event.payload.get("stream_id"), "noc_credit")
+            stalls = self.routers[index].stall_cycles
+            stalls[key] = stalls.get(key, 0) + 1
+        stats = self.noc_stats
+        if stats is not None:
+            starved = (
+                (self.alloc[rows, outs] < 0)
+                & (self.credits[rows, outs] == 0)
+                & self.valid_vc[outs]
+            )
+            s_idx, s_vc = np.nonzero(starved)
+            np.add.at(stats.credit_stalls,
+                      (self.router_x[rows[s_idx]], self.router_y[rows[s_idx]],
+                       outs[s_idx], s_vc), 1)
+
+    def _stage_rc(self, now, log):
+        rows, ports, vcs = np.nonzero(self.n_rc > 0)
+        if not len(rows):
+            return
+        offset = self.n_sa + self.n_va
+        pids = self._region_heads(offset)[rows, ports, vcs]
+        ok = (self.pkt_ready[pids] <= now) & (self.n_va[rows, ports, vcs] < self.buffer_capacity)
+        if not ok.any():
+            return
+        rows, ports, vcs, pids = rows[ok], ports[ok], vcs[ok], pids[ok]
+        xs, ys = self.route_spans
+        offset = ((self.pkt_dst_x[pids] - self.router_x[rows]) % xs * ys
+                  + (self.pkt_dst_y[pids] - self.router_y[rows]) % ys)
+        self.pkt_out[pids] = self.route_table[offset]
+        self.n_rc[rows, ports, vcs] -= 1
+        self.n_va[rows, ports, vcs] += 1
+        self._log_stage(log, rows, ports, Router.RC)
@@ -3,9 +3,13 @@ from sim_core.event import Event
 
 
 class ControlProcessor(HardwareModule):
-    def __init__(self, engine, name, mesh_info, npus=None, buffer_capacity=4, frequency=1000):
+    def __init__(self, engine, name, mesh_info, npus=None, buffer_capacity=4, frequency=1000,
+                 multicast=True):
         super().__init__(engine, name, mesh_info, buffer_capacity, frequency)
         self.npus = npus or []
+        # Broadcast NPU instructions as one multicast packet when the router
+        # supports it, otherwise as one unicast packet per NPU
+        self.multicast = multicast
         # Control programs manage only NPUs.
         self.active_npu_programs = {}
         # Track synchronization state of NPU commands so external modules can
@@ -48,6 +52,7 @@ class ControlProcessor(HardwareModule):
                 and entry["status"] == "issued"
             ):
                 entry["status"] = "done"
+                entry["complete_cycle"] = self.engine.current_cycle
                 break
         # Advance commit pointer
         while (
@@ -84,6 +89,20 @@ class ControlProcessor(HardwareModule):
         done_dict[program] = True
         return True
 
+    def _scoreboard_mark_dispatched(self, program, event_type, stream_id):
+        board = self.program_scoreboards.get(program)
+        if not board:
+            return
+        for entry in board["entries"]:
+            if (
+                entry["event_type"] == event_type
+                and entry.get("payload", {}).get("stream_id") == stream_id
+                and entry["status"] == "issued"
+                and entry["dispatch_cycle"] is None
+            ):
+                entry["dispatch_cycle"] = self.engine.current_cycle
+                break
+
     def _has_stream_dependency(self, board, entry):
         """Return True if an earlier instruction with the same stream is not done."""
         sid = entry.get("payload", {}).get("stream_id")
@@ -94,12 +113,16 @@ class ControlProcessor(HardwareModule):
                 return True
         return False
 
-    def _can_issue(self, program, entry, board):
+    def _issue_blocker(self, program, entry, board):
+        """Return the reason ``entry`` cannot issue now, or None."""
         if self._has_stream_dependency(board, entry):
-            return False
+            return "stream_dependency"
         if entry["op_type"] in ("read", "write") and self.dma_busy:
-            return False
-        return True
+            return "dma_busy"
+        return None
+
+    def _can_issue(self, program, entry, board):
+        return self._issue_blocker(program, entry, board) is None
 
     def _issue_instruction(self, program, entry):
         """Mark scoreboard and dispatch the instruction event."""
@@ -107,6 +130,7 @@ class ControlProcessor(HardwareModule):
         etype = entry["event_type"]
 
         entry["status"] = "issued"
+        entry["issue_cycle"] = self.engine.current_cycle
         state["pc"] = entry["id"] + 1
 
         if etype == "NPU_DMA_IN":
@@ -201,9 +225,18 @@ class ControlProcessor(HardwareModule):
                 "op_type": op_type,
                 "status": "pending",
                 "deps": set(),
+                # Timing trace used by :mod:`sim_hw.cp_analysis`
+                "issue_cycle": None,
+                "dispatch_cycle": None,
+                "complete_cycle": None,
+                "blocked": [],  # (cycle, reason) each time issue was skipped
             }
             sb_entries.append(entry)
-        self.program_scoreboards[name] = {"entries": sb_entries, "commit": 0}
+        self.program_scoreboards[name] = {
+            "entries": sb_entries,
+            "commit": 0,
+            "start_cycle": None,
+        }
 
 
     def register_handler(self, evt_type, fn):
@@ -228,6 +261,8 @@ class ControlProcessor(HardwareModule):
         board = self.program_scoreboards.get(event.program)
         if not prog or not state or not board:
             return
+        if board["start_cycle"] is None:
+            board["start_cycle"] = self.engine.current_cycle
 
         # If all instructions completed, retire program
         if all(e["status"] == "done" for e in board["entries"]):
@@ -244,7 +279,9 @@ class ControlProcessor(HardwareModule):
         for entry in board["entries"]:
             if entry["status"] != "pending":
                 continue
-            if not self._can_issue(event.program, entry, board):
+            reason = self._issue_blocker(event.program, entry, board)
+            if reason is not None:
+                entry["blocked"].append((self.engine.current_cycle, reason))
                 continue
             self._issue_instruction(event.program, entry)
             issued = True
@@ -253,92 +290,84 @@ class ControlProcessor(HardwareModule):
         if issued:
             self._schedule_run(event.program)
 
+    def _send_to_npus(self, program, event_type, data_size, payload):
+        """Send ``payload`` to every NPU through the CP's router.
+
+        One multicast packet carries the whole ``dst_set`` when enabled and
+        supported by the router; otherwise each NPU gets its own packet.
+        """
+        router = self.get_my_router()
+        coords = [self.mesh_info["npu_coords"][npu.name] for npu in self.npus]
+        if self.multicast and len(coords) > 1 and getattr(router, "multicast", False):
+            targets = [{"dst_coords": coords[0], "dst_set": tuple(coords)}]
+        else:
+            targets = [{"dst_coords": c} for c in coords]
+        for target in targets:
+            evt = Event(
+                src=self,
+                dst=router,
+                cycle=self.engine.current_cycle,
+                data_size=data_size,
+                program=program,
+                event_type=event_type,
+                payload={**target, **payload, "input_port": 0, "vc": 0},
+            )
+            self.send_event(evt)
+
     def _handle_npu_dma_in(self, event):
         prog_state = self.active_npu_programs.get(event.program)
         if not prog_state:
             raise KeyError(f"Unknown NPU program {event.program}")
         sid = event.payload.get("stream_id")
+        self._scoreboard_mark_dispatched(event.program, "NPU_DMA_IN", sid)
         prog_state.setdefault("waiting_dma_in", {})[sid] = set(n.name for n in self.npus)
         self.npu_dma_in_opcode_done[event.program] = False
-        for npu in self.npus:
-            dma_evt = Event(
-                src=self,
-                dst=self.get_my_router(),
-                cycle=self.engine.current_cycle,
-                data_size=prog_state["in_size"],
-                program=event.program,
-                event_type="NPU_DMA_IN",
-                payload={
-                    "dst_coords": self.mesh_info["npu_coords"][npu.name],
-                    "data_size": prog_state["in_size"],
-                    "src_name": self.name,
-                    "need_reply": True,
-                    "opcode_cycles": prog_state["dma_in_opcode_cycles"],
-                    "stream_id": sid,
-                    "eaddr": event.payload.get("eaddr"),
-                    "iaddr": event.payload.get("iaddr"),
-                    "input_port": 0,
-                    "vc": 0,
-                },
-            )
-            self.send_event(dma_evt)
+        self._send_to_npus(event.program, "NPU_DMA_IN", prog_state["in_size"], {
+            "data_size": prog_state["in_size"],
+            "src_name": self.name,
+            "need_reply": True,
+            "opcode_cycles": prog_state["dma_in_opcode_cycles"],
+            "stream_id": sid,
+            "eaddr": event.payload.get("eaddr"),
+            "iaddr": event.payload.get("iaddr"),
+        })
 
     def _handle_npu_cmd(self, event):
         program = self.active_npu_programs.get(event.program)
         if not program:
             raise KeyError(f"Unknown NPU program {event.program}")
         sid = event.payload.get("stream_id")
+        self._scoreboard_mark_dispatched(event.program, "NPU_CMD", sid)
         program.setdefault("waiting_op", {})[sid] = set(n.name for n in self.npus)
         self.npu_cmd_opcode_done[event.program] = False
-        for npu in self.npus:
-            cmd_evt = Event(
-                src=self,
-                dst=self.get_my_router(),
-                cycle=self.engine.current_cycle,
-                data_size=4,
-                program=event.program,
-                event_type="NPU_CMD",
-                payload={
-                    "dst_coords": self.mesh_info["npu_coords"][npu.name],
-                    "opcode_cycles": program["cmd_opcode_cycles"],
-                    "src_name": self.name,
-                    "need_reply": True,
-                    "stream_id": sid,
-                    "input_port": 0,
-                    "vc": 0,
-                },
-            )
-            self.send_event(cmd_evt)
+        payload = {
+            "opcode_cycles": program["cmd_opcode_cycles"],
+            "src_name": self.name,
+            "need_reply": True,
+            "stream_id": sid,
+        }
+        if event.payload.get("gemm"):
+            # The NPUs time the command from its shape
+            payload["gemm"] = event.payload["gemm"]
+        self._send_to_npus(event.program, "NPU_CMD", 4, payload)
 
     def _handle_npu_dma_out(self, event):
         program = self.active_npu_programs.get(event.program)
         if not program:
             raise KeyError(f"Unknown NPU program {event.program}")
         sid = event.payload.get("stream_id")
+        self._scoreboard_mark_dispatched(event.program, "NPU_DMA_OUT", sid)
         program.setdefault("waiting_dma_out", {})[sid] = set(n.name for n in self.npus)
         self.npu_dma_out_opcode_done[event.program] = False
-        for npu in self.npus:
-            out_evt = Event(
-                src=self,
-                dst=self.get_my_router(),
-                cycle=self.engine.current_cycle,
-                data_size=program["out_size"],
-                program=event.program,
-                event_type="NPU_DMA_OUT",
-                payload={
-                    "dst_coords": self.mesh_info["npu_coords"][npu.name],
-                    "data_size": program["out_size"],
-                    "src_name": self.name,
-                    "need_reply": True,
-                    "opcode_cycles": program["dma_out_opcode_cycles"],
-                    "stream_id": sid,
-                    "eaddr": event.payload.get("eaddr"),
-                    "iaddr": event.payload.get("iaddr"),
-                    "input_port": 0,
-                    "vc": 0,
-                },
-            )
-            self.send_event(out_evt)
+        self._send_to_npus(event.program, "NPU_DMA_OUT", program["out_size"], {
+            "data_size": program["out_size"],
+            "src_name": self.name,
+            "need_reply": True,
+            "opcode_cycles": program["dma_out_opcode_cycles"],
+            "stream_id": sid,
+            "eaddr": event.payload.get("eaddr"),
+            "iaddr": event.payload.get("iaddr"),
+        })
 
     def _handle_npu_dma_in_done(self, event):
         sid = event.payload.get("stream_id")
@@ -0,0 +1,139 @@
+"""Critical-path and stall attribution for CP programs.
+
+The :class:`~sim_hw.cp.ControlProcessor` scoreboard records, per instruction,
+when it was issued, dispatched and completed plus the reason it was skipped
+on every ``RUN_PROGRAM`` pass.  NPUs, IODs and routers keep ``stall_cycles``
+counters keyed by ``(program, stream_id, reason)``.  The helpers here turn
+those traces into a critical path and a per-resource stall breakdown.
+"""
+
+from collections import defaultdict
+
+DMA_OPS = ("read", "write")
+
+
+def program_trace(cp, program):
+    """Return one timing record per scoreboard entry of ``program``."""
+    board = cp.program_scoreboards[program]
+    return [
+        {
+            "id": e["id"],
+            "event_type": e["event_type"],
+            "op_type": e["op_type"],
+            "stream_id": e.get("payload", {}).get("stream_id"),
+            "issue": e["issue_cycle"],
+            "dispatch": e["dispatch_cycle"],
+            "complete": e["complete_cycle"],
+            "blocked": list(e["blocked"]),
+        }
+        for e in board["entries"]
+    ]
+
+
+def _binding_predecessor(trace, rec):
+    """Return ``(pred, reason)`` for the constraint that released ``rec`` last."""
+    best = None
+    reason = None
+    for p in trace:
+        if p is rec or p["complete"] is None or p["complete"] > rec["issue"]:
+            continue
+        if p["id"] < rec["id"] and p["stream_id"] == rec["stream_id"]:
+            why = "stream_dependency"
+        elif rec["op_type"] in DMA_OPS and p["op_type"] in DMA_OPS:
+            # DMA issue is serialized regardless of program order
+            why = "dma_busy"
+        else:
+            continue
+        if best is None or p["complete"] >= best["complete"]:
+            best, reason = p, why
+    return best, reason
+
+
+def critical_path(cp, program):
+    """Return the chain of instructions that bounds ``program``'s runtime.
+
+    The result is a list of segments ordered in time.  ``execute`` segments
+    cover an instruction from issue to completion; ``wait`` segments cover the
+    gap between a predecessor's completion and the next issue and carry the
+    reason the successor was held (``stream_dependency``, ``dma_busy``) or
+    ``cp_issue`` when no dependency was outstanding.
+    """
+    trace = program_trace(cp, program)
+    done = [r for r in trace if r["complete"] is not None]
+    if not done:
+        return []
+    start = cp.program_scoreboards[program]["start_cycle"]
+    rec = max(done, key=lambda r: (r["complete"], r["id"]))
+    segments = []
+    while rec is not None:
+        segments.append({
+            "kind": "execute",
+            "id": rec["id"],
+            "event_type": rec["event_type"],
+            "stream_id": rec["stream_id"],
+            "start": rec["issue"],
+            "end": rec["complete"],
+        })
+        pred, reason = _binding_predecessor(trace, rec)
+        released = pred["complete"] if pred is not None else start
+        if rec["issue"] > released:
+            segments.append({
+                "kind": "wait",
+                "id": rec["id"],
+                "reason": reason or "cp_issue",
+                "start": released,
+                "end": rec["issue"],
+            })
+        rec = pred
+    segments.reverse()
+    return segments
+
+
+def _blocked_cycles(rec):
+    """Attribute the cycles between skip observations to the observed reason."""
+    out = defaultdict(int)
+    obs = rec["blocked"]
+    for i, (cycle, reason) in enumerate(obs):
+        end = obs[i + 1][0] if i + 1 < len(obs) else rec["issue"]
+        if end is None:
+            continue
+        out[reason] += max(0, end - cycle)
+    return out
+
+
+def stall_breakdown(cp, program, modules=()):
+    """Return ``{reason: cycles}`` for ``program``.
+
+    Cycles are summed over instructions, so overlapping stalls of different
+    streams add up.  CP issue stalls (``stream_dependency``, ``dma_busy``)
+    come from the scoreboard.  Execution stalls are summed from the
+    ``stall_cycles`` counters of ``modules`` (NPUs, IODs and routers):
+    ``npu_pipeline``, ``iod_queue``, ``iod_bank_conflict`` and
+    ``noc_credit``.
+    """
+    totals = defaultdict(int)
+    for rec in program_trace(cp, program):
+        for reason, cycles in _blocked_cycles(rec).items():
+            totals[reason] += cycles
+    for mod in modules:
+        for (prog, _, reason), cycles in getattr(mod, "stall_cycles", {}).items():
+            if prog == program:
+                totals[reason] += cycles
+    return dict(totals)
+
+
+def summarize(cp, program, modules=()):
+    """Return runtime, critical path and stall breakdown for ``program``."""
+    trace = program_trace(cp, program)
+    ends = [r["complete"] for r in trace if r["complete"] is not None]
+    start = cp.program_scoreboards[program]["start_cycle"]
+    busy = defaultdict(int)
+    for r in trace:
+        if r["complete"] is not None:
+            busy[r["op_type"]] += r["complete"] - r["issue"]
+    return {
+        "runtime": (max(ends) - start) if ends else 0,
+        "critical_path": critical_path(cp, program),
+        "stalls": stall_breakdown(cp, program, modules),
+        "busy": dict(busy),
+    }
@@ -1,3 +1,5 @@
+from collections import defaultdict
+
 from sim_core.module import PipelineModule
 from sim_core.event import Event
 
@@ -76,6 +78,9 @@ class IOD(PipelineModule):
         self.mc_sched = [
             [False for _ in range(channels_per_stack)] for _ in range(num_stacks)
         ]
+        self.tCL = tCL
+        # Queueing and row-miss cycles keyed by (program, stream_id, reason)
+        self.stall_cycles = defaultdict(int)
         self.set_stage_funcs([self._stage_func])
         self.event_handlers = {}
         self._register_default_handlers()
@@ -101,6 +106,13 @@ class IOD(PipelineModule):
             self.send_event(evt)
             self.mc_sched[st][ch] = True
 
+    def _log_stage(self, event):
+        # Report memory controller activity per HBM channel so utilization
+        # can be broken down by channel.
+        if event.event_type == "IOD_MC":
+            return f"S{event.payload['stack']}_CH{event.payload['channel']}"
+        return super()._log_stage(event)
+
     def register_handler(self, evt_type, fn):
         self.event_handlers[evt_type] = fn
 
@@ -135,6 +147,7 @@ class IOD(PipelineModule):
                 "channel": ch,
                 "addr": addr,
                 "data_size": chunk,
+                "enqueue_cycle": self.engine.current_cycle,
             }
             self.mc_queues[st][ch].append(op)
             self._schedule_mc(st, ch)
@@ -159,6 +172,13 @@ class IOD(PipelineModule):
                 bursts,
             )
             op["remaining"] = self.pipeline_latency + delay
+            key = (op["program"], op.get("stream_id"))
+            queued = self.engine.current_cycle - op["enqueue_cycle"] - 1
+            if queued > 0:
+                self.stall_cycles[key + ("iod_queue",)] += queued
+            penalty = delay - (self.tCL + bursts)
+            if penalty > 0:
+                self.stall_cycles[key + ("iod_bank_conflict",)] += penalty
         op["remaining"] -= 1
         if op["remaining"] > 0:
             self._schedule_mc(st, ch)
@@ -1,8 +1,12 @@
+from collections import defaultdict
+
 from sim_core.module import PipelineModule
 from sim_core.event import Event
+from sim_hw.systolic import SystolicArray
 
 class NPU(PipelineModule):
-    def __init__(self, engine, name, mesh_info, pipeline_stages=5, buffer_capacity=4, txn_bytes=128, frequency=1000):
+    def __init__(self, engine, name, mesh_info, pipeline_stages=5, buffer_capacity=4, txn_bytes=128, frequency=1000,
+                 systolic=None):
         super().__init__(engine, name, mesh_info, pipeline_stages, buffer_capacity, frequency)
         # Track per-task DMA activity
         self.expected_dma_reads = {}
@@ -21,6 +25,9 @@ class NPU(PipelineModule):
         self.requester_name_by_prog = {}
         funcs = [self._make_stage_func(i) for i in range(pipeline_stages)]
         self.set_stage_funcs(funcs)
+        # The stages only pass command tokens on, so whole commands can
+        # skip the per-stage events
+        self.fast_path = True
 
         # Event handler dispatch table. This mirrors the CP style so new
         # operations can be added without editing ``handle_event``.
@@ -28,6 +35,11 @@ class NPU(PipelineModule):
         self._register_default_handlers()
         # Maximum size of each memory transaction sent to the IOD.
         self.txn_bytes = txn_bytes
+        # Cycles commands spent queued behind the busy pipeline, keyed by
+        # (program, stream_id, reason) for CP stall attribution.
+        self.stall_cycles = defaultdict(int)
+        # Timing model for commands that carry a GEMM descriptor
+        self.systolic = systolic if systolic is not None else SystolicArray()
 
     def _make_stage_func(self, idx):
         def func(mod, data):
@@ -44,9 +56,11 @@ class NPU(PipelineModule):
             return
 
         info = self.cmd_queue.pop(0)
+        wait = self.engine.current_cycle - info["enqueue_cycle"]
+        if wait > 0:
+            self.stall_cycles[(info["program"], info["stream_id"], "npu_pipeline")] += wait
         self.current_cmd = {"info": info, "remaining": info["cycles"]}
-        for _ in range(info["cycles"]):
-            self.add_data({}, stage_idx=0)
+        self.add_batch([{} for _ in range(info["cycles"])], stage_idx=0)
 
     def register_handler(self, evt_type, fn):
         """Register an event handler function for ``evt_type``."""
@@ -167,11 +181,17 @@ class NPU(PipelineModule):
             del self.received_dma_reads[key]
 
     def _handle_npu_cmd(self, event):
+        gemm = event.payload.get("gemm")
+        if gemm:
+            cycles = self.systolic.command_cycles(gemm)
+        else:
+            cycles = event.payload["opcode_cycles"]
         cmd = {
             "program": event.program,
             "stream_id": event.payload.get("stream_id"),
-            "cycles": event.payload["opcode_cycles"],
+            "cycles": cycles,
             "dst_name": event.payload["src_name"],
+            "enqueue_cycle": self.engine.current_cycle,
         }
         self.cmd_queue.append(cmd)
         self.requester_name_by_prog[(event.program, cmd["stream_id"])] = cmd["dst_name"]
@@ -0,0 +1,93 @@
+"""Systolic-array timing model for GEMM commands.
+
+``C[M, N] = A[M, K] @ B[K, N]`` is split into folds that fit the
+``rows x cols`` processing elements.  Two dimensions are mapped onto the
+array and the third is streamed through it:
+
+``ws`` (weight stationary)
+    ``B`` is preloaded, ``K`` along the rows and ``N`` along the columns,
+    and the ``M`` rows of ``A`` stream through.
+``os`` (output stationary)
+    Each PE accumulates one output, ``M`` along the rows and ``N`` along
+    the columns, while ``K`` streams through.
+
+A fold takes ``rows`` cycles to preload weights or drain outputs,
+``rows + cols - 2`` cycles of operand skew to fill and empty the array, and
+one cycle per streamed element, times the passes the data type needs.
+Folds over ragged edges pay the full array latency for fewer active PEs,
+which shows up as lower :meth:`SystolicArray.utilization`.
+"""
+
+import functools
+
+DATAFLOWS = ("ws", "os")
+
+# Passes through the array per MAC; fp32 runs on the fp16 multipliers
+DTYPE_PASSES = {"int8": 1, "fp16": 1, "bf16": 1, "fp32": 4}
+
+
+class SystolicArray:
+    """A ``rows x cols`` systolic array running ``dataflow`` by default."""
+
+    def __init__(self, rows=128, cols=128, dataflow="ws", dtype_passes=None):
+        if rows < 1 or cols < 1:
+            raise ValueError("array dimensions must be positive")
+        if dataflow not in DATAFLOWS:
+            raise ValueError(f"Unknown dataflow {dataflow!r}")
+        self.rows = rows
+        self.cols = cols
+        self.dataflow = dataflow
+        self.dtype_passes = dict(DTYPE_PASSES if dtype_passes is None else dtype_passes)
+
+    def config(self):
+        """Hashable description of the array, part of the latency cache key."""
+        return (self.rows, self.cols, tuple(sorted(self.dtype_passes.items())))
+
+    def _key(self, m, n, k, dtype, dataflow):
+        dataflow = dataflow or self.dataflow
+        if dataflow not in DATAFLOWS:
+            raise ValueError(f"Unknown dataflow {dataflow!r}")
+        if dtype not in self.dtype_passes:
+            raise ValueError(f"Unsupported dtype {dtype!r}")
+        if min(m, n, k) < 1:
+            raise ValueError("GEMM dimensions must be positive")
+        return (m, n, k, dtype, dataflow), self.config()
+
+    def gemm_cycles(self, m, n, k, dtype="fp16", dataflow=None):
+        """Cycles to compute an ``m x n x k`` GEMM, memoized per shape and config."""
+        return _gemm_cycles(*self._key(m, n, k, dtype, dataflow))
+
+    def utilization(self, m, n, k, dtype="fp16", dataflow=None):
+        """Fraction of PE cycles doing useful MACs."""
+        shape, config = self._key(m, n, k, dtype, dataflow)
+        passes = self.dtype_passes[dtype]
+        return m * n * k * passes / (_gemm_cycles(shape, config) * self.rows * self.cols)
+
+    def command_cycles(self, gemm):
+        """Cycles of an ``NPU_CMD`` GEMM descriptor.
+
+        ``gemm`` is a dict with ``m``, ``n`` and ``k`` and optionally
+        ``dtype`` and ``dataflow``.
+        """
+        return self.gemm_cycles(gemm["m"], gemm["n"], gemm["k"],
+                                gemm.get("dtype", "fp16"), gemm.get("dataflow"))
+
+
+@functools.lru_cache(maxsize=None)
+def _gemm_cycles(shape, config):
+    m, n, k, dtype, dataflow = shape
+    rows, cols, dtype_passes = config
+    passes = dict(dtype_passes)[dtype]
+    if dataflow == "ws":
+        spatial_rows, streamed = k, m
+    else:
+        spatial_rows, streamed = m, k
+    folds = -(-spatial_rows // rows) * -(-n // cols)
+    # Preload or drain, fill and empty the skewed array, then stream
+    per_fold = rows + (rows + cols - 2) + streamed * passes
+    return folds * per_fold
+
+
+def cache_info():
+    """Hit and miss counts of the shared latency cache."""
+    return _gemm_cycles.cache_info()
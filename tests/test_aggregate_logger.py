@@ -0,0 +1,39 @@
+import unittest
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sim_core.logger import AggregateLogger
+from tests.test_logger_filter import run_with_logger
+
+
+class AggregateLoggerTest(unittest.TestCase):
+    def test_counters_and_utilization(self):
+        logger = AggregateLogger(window=4, num_windows=4)
+        self.assertEqual(run_with_logger(logger), [])
+        counters = logger.get_counters()
+        self.assertEqual(counters[("DST", 0, "PACKET")], 3)
+        util = logger.utilization()
+        self.assertTrue(all(0 < u <= 1 for u in util.values()))
+        rows = logger.utilization_table()
+        self.assertEqual(len(rows), len(util))
+        # The run is longer than 4 windows of 4 cycles, so windows coarsen
+        self.assertGreater(logger.window, 4)
+        labels, starts, matrix = logger.heatmap()
+        self.assertEqual(len(labels), len(matrix))
+        self.assertLessEqual(len(starts), 4)
+        busy = {key: sum(h) for key, h in logger.histograms.items()}
+        self.assertEqual(busy, dict(logger.busy_cycles))
+
+    def test_direct_records(self):
+        logger = AggregateLogger(window=10, num_windows=2)
+        for cycle in (0, 0, 1, 5, 15):
+            logger.log_event(cycle, "M", 0, "X")
+        self.assertEqual(logger.counters[("M", 0, "X")], 5)
+        self.assertEqual(logger.busy_cycles[("M", 0)], 4)
+        self.assertEqual(list(logger.histograms[("M", 0)]), [3, 1])
+        self.assertEqual(logger.utilization()[("M", 0)], 4 / 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
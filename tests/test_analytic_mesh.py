@@ -0,0 +1,76 @@
+import unittest
+
+from sim_core.analytic_mesh import AnalyticRouter, md1_wait
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.mesh import create_mesh
+from tests.test_cp_serialization import setup_env
+from tests.test_flat_router import run_line
+from tests.test_traffic.validate_analytic import run_pattern, validate
+
+
+class AnalyticMeshTest(unittest.TestCase):
+    def test_md1_wait(self):
+        self.assertEqual(md1_wait(0.0), 0.0)
+        self.assertAlmostEqual(md1_wait(0.5), 0.5)
+        self.assertAlmostEqual(md1_wait(0.5, service=2.0), 1.0)
+
+    def test_backend_selection(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend="analytic")
+        self.assertTrue(all(isinstance(r, AnalyticRouter) for r in mesh.values()))
+        noc = mesh[(0, 0)].mesh
+        self.assertEqual(len(noc.path((0, 0), (1, 1))), 2)
+
+    def test_zero_load_latency(self):
+        ref, _ = run_line("flat", num_packets=1)
+        fast, _ = run_line("analytic", num_packets=1)
+        # Hop-by-hop events may gain a cycle from the engine's float to
+        # cycle conversion; the analytical delivery is a single event.
+        self.assertEqual(fast.arrivals, [21])
+        self.assertLessEqual(abs(fast.arrivals[0] - ref.arrivals[0]), 1)
+
+    def test_uniform_latency_close_to_detailed(self):
+        kwargs = dict(pattern="uniform", x=4, y=4, packets_per_node=40, injection_rate=0.1)
+        ref = run_pattern("flat", **kwargs)
+        fast = run_pattern("analytic", **kwargs)
+        self.assertEqual(fast["received"], ref["received"])
+        self.assertEqual(fast["saturated"], [])
+        self.assertLess(abs(fast["stats"].mean - ref["stats"].mean) / ref["stats"].mean, 0.1)
+        self.assertGreater(ref["noc_events"], 4 * fast["noc_events"])
+
+    def test_hotspot_range(self):
+        # The (2, 2) ejection port takes a packet every two cycles, so it is
+        # oversubscribed past 16 * rate * (0.2 + 0.8 / 16) = 0.5
+        low, high = validate("flat", patterns=("hotspot",), rates=(0.1, 0.3), x=4, y=4,
+                             packets_per_node=40)
+        self.assertTrue(low["ok"])
+        self.assertEqual(low["saturated"], [])
+        # Tree saturation is not modelled: flagged instead of trusted
+        self.assertFalse(high["ok"])
+        self.assertEqual(high["saturated"], [(2, 2)])
+
+    def test_endpoints_exchange_events(self):
+        engine, cp = setup_env(backend="analytic")
+        cfg = {
+            "program_cycles": 3,
+            "in_size": 16,
+            "out_size": 16,
+            "dma_in_opcode_cycles": 2,
+            "dma_out_opcode_cycles": 2,
+            "cmd_opcode_cycles": 3,
+        }
+        instrs = [
+            {"event_type": "NPU_DMA_IN", "payload": dict(cfg, stream_id=0, eaddr=0, iaddr=0)},
+            {"event_type": "NPU_CMD", "payload": dict(cfg, stream_id=0)},
+            {"event_type": "NPU_DMA_OUT", "payload": dict(cfg, stream_id=0, eaddr=64, iaddr=0)},
+        ]
+        cp.load_program("p", instrs)
+        cp.send_event(Event(src=None, dst=cp, cycle=1, program="p", event_type="RUN_PROGRAM"))
+        engine.run_until_idle(max_tick=5000)
+        entries = cp.program_scoreboards["p"]["entries"]
+        self.assertTrue(all(e["complete_cycle"] is not None for e in entries))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+from sim_core.event import Event
+from sim_hw import cp_analysis
+from tests.test_cp_serialization import setup_env
+
+
+class CPAnalysisTest(unittest.TestCase):
+    def test_critical_path_and_stalls(self):
+        engine, cp = setup_env()
+        cfg = {
+            "program_cycles": 3,
+            "in_size": 32,
+            "out_size": 16,
+            "dma_in_opcode_cycles": 2,
+            "dma_out_opcode_cycles": 2,
+            "cmd_opcode_cycles": 20,
+        }
+        instrs = []
+        for t in range(3):
+            sid = f"T{t}"
+            instrs.append({"event_type": "NPU_DMA_IN", "payload": dict(cfg, stream_id=sid, eaddr=t << 27, iaddr=0)})
+            instrs.append({"event_type": "NPU_CMD", "payload": dict(cfg, stream_id=sid)})
+            instrs.append({"event_type": "NPU_DMA_OUT", "payload": dict(cfg, stream_id=sid, eaddr=(t << 27) + 4096, iaddr=0)})
+        cp.load_program("p", instrs)
+        cp.send_event(Event(src=None, dst=cp, cycle=1, program="p", event_type="RUN_PROGRAM"))
+        engine.run_until_idle(max_tick=5000)
+
+        trace = cp_analysis.program_trace(cp, "p")
+        for rec in trace:
+            self.assertLessEqual(rec["issue"], rec["dispatch"])
+            self.assertLess(rec["dispatch"], rec["complete"])
+        self.assertTrue(trace[1]["blocked"])
+
+        path = cp_analysis.critical_path(cp, "p")
+        self.assertEqual(path[0]["start"], cp.program_scoreboards["p"]["start_cycle"])
+        self.assertEqual(path[-1]["end"], max(r["complete"] for r in trace))
+        for a, b in zip(path, path[1:]):
+            self.assertEqual(a["end"], b["start"])
+
+        summary = cp_analysis.summarize(cp, "p", cp.npus)
+        self.assertIn("dma_busy", summary["stalls"])
+        self.assertIn("stream_dependency", summary["stalls"])
+        self.assertEqual(summary["runtime"], path[-1]["end"] - path[0]["start"])
+
+
+if __name__ == "__main__":
+    unittest.main()
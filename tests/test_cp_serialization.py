@@ -9,7 +9,7 @@ from sim_hw.npu import NPU
 from sim_hw.iod import IOD
 
 
-def setup_env():
+def setup_env(backend="router"):
     engine = SimulatorEngine()
     mesh_info = {
         "mesh_size": (3, 1),
@@ -18,7 +18,7 @@ def setup_env():
         "cp_coords": {},
         "iod_coords": {},
     }
-    mesh = create_mesh(engine, 3, 1, mesh_info, buffer_capacity=1)
+    mesh = create_mesh(engine, 3, 1, mesh_info, buffer_capacity=1, backend=backend)
     mesh_info["router_map"] = mesh
     npu = NPU(engine, "NPU_0", mesh_info, buffer_capacity=1)
     mesh_info["npu_coords"]["NPU_0"] = (0, 0)
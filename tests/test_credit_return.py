@@ -1,8 +1,55 @@
 import unittest
 import random
+from unittest import mock
 from tests.test_traffic.uniform_traffic import run_uniform_traffic_with_mesh
+from tests.test_timeline import PacketSource, PacketSink
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.logger import EventLogger
+from sim_core.mesh import create_mesh
 from sim_core.router import Router
 
+
+class KeepingSink(PacketSink):
+    def handle_event(self, event):
+        if event.event_type == "PACKET":
+            self.last = event
+        super().handle_event(event)
+
+
+def send_line(backend, length, rounds=1, logger=None):
+    """Send one packet along a ``length`` router line ``rounds`` times.
+
+    Returns the sink and, per round, the event types constructed.
+    """
+    engine = SimulatorEngine()
+    if logger:
+        engine.set_logger(logger)
+    mesh_info = {"mesh_size": (length, 1), "router_map": None}
+    mesh = create_mesh(engine, length, 1, mesh_info, num_vcs=1, backend=backend)
+    mesh_info["router_map"] = mesh
+    src = PacketSource(engine, "SRC", mesh_info, (0, 0), (length - 1, 0), num_packets=1)
+    dst = KeepingSink(engine, "DST", mesh_info, (length - 1, 0))
+    mesh[(0, 0)].attach_module(src)
+    mesh[(length - 1, 0)].attach_module(dst)
+    engine.register_module(src)
+    engine.register_module(dst)
+    created = []
+    init = Event.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created[-1].append(kwargs.get("event_type"))
+        init(self, *args, **kwargs)
+
+    with mock.patch.object(Event, "__init__", counting_init):
+        for _ in range(rounds):
+            created.append([])
+            src.sent = 0
+            src.start()
+            engine.run_until_idle(max_tick=10000)
+    return dst, created
+
+
 class CreditReturnTest(unittest.TestCase):
     def test_credits_restored(self):
         random.seed(1)
@@ -18,5 +65,26 @@ class CreditReturnTest(unittest.TestCase):
                     credit = router.credit_counts[out_port][vc]
                     self.assertEqual(credit, expected, f"{router.name} p{out_port} vc{vc}")
 
+    def test_forwarding_allocates_no_events(self):
+        for backend in ("router", "flat"):
+            dst, created = send_line(backend, 17, rounds=2)
+            self.assertEqual(dst.received, 2)
+            self.assertNotIn("RECV_CRED", created[0])
+            # Once the routers' stage events exist, a packet crossing 16
+            # hops constructs only its own GENERATE and PACKET events.
+            self.assertEqual(created[1], ["GENERATE", "PACKET"], backend)
+
+    def test_credit_logging_is_opt_in(self):
+        for log_credits in (False, True):
+            logger = EventLogger(log_credits=log_credits)
+            send_line("router", 3, logger=logger)
+            credits = [e for e in logger.get_entries() if e["event_type"] == "RECV_CRED"]
+            if log_credits:
+                # Two upstream returns and the ejection credit
+                self.assertEqual(sorted(e["stage"] for e in credits),
+                                 ["P0_CRED", "P1_CRED", "P1_CRED"])
+            else:
+                self.assertEqual(credits, [])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.flat_router import FlatRouter
+from sim_core.logger import EventLogger
+from tests.test_timeline import PacketSource, PacketSink
+from tests.test_traffic.sweep import run_load_point
+from tests.test_traffic.uniform_traffic import run_uniform_traffic_with_mesh
+
+
+class RecordingSink(PacketSink):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.arrivals = []
+
+    def handle_event(self, event):
+        if event.event_type == "PACKET":
+            self.arrivals.append(self.engine.current_cycle)
+        super().handle_event(event)
+
+
+def run_line(backend, num_packets=3, length=4, logger=None):
+    random.seed(0)
+    engine = SimulatorEngine()
+    if logger:
+        engine.set_logger(logger)
+    mesh_info = {"mesh_size": (length, 1), "router_map": None}
+    mesh = create_mesh(engine, length, 1, mesh_info, buffer_capacity=1, backend=backend)
+    mesh_info["router_map"] = mesh
+    src = PacketSource(engine, "SRC", mesh_info, (0, 0), (length - 1, 0),
+                       num_packets=num_packets, buffer_capacity=1)
+    dst = RecordingSink(engine, "DST", mesh_info, (length - 1, 0), buffer_capacity=1)
+    mesh[(0, 0)].attach_module(src)
+    mesh[(length - 1, 0)].attach_module(dst)
+    engine.register_module(src)
+    engine.register_module(dst)
+    src.start()
+    ticks = 0
+    while engine.event_queue:
+        engine.tick()
+        ticks += 1
+    return dst, ticks
+
+
+class FlatRouterTest(unittest.TestCase):
+    def test_backend_selection(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend="flat")
+        self.assertTrue(all(isinstance(r, FlatRouter) for r in mesh.values()))
+        with self.assertRaises(ValueError):
+            create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend="bogus")
+
+    def test_matches_reference_timing(self):
+        ref, ref_ticks = run_line("router", num_packets=6)
+        flat, flat_ticks = run_line("flat", num_packets=6)
+        self.assertEqual(flat.arrivals, ref.arrivals)
+        self.assertLess(flat_ticks, ref_ticks)
+
+    def test_stage_logging(self):
+        logger = EventLogger()
+        run_line("flat", num_packets=1, logger=logger)
+        stages = [e["stage"] for e in logger.get_entries() if e["module"] == "Router_1_0"]
+        self.assertEqual(stages, ["P2_IN", "P2_RC", "P2_VA", "P1_SA", "P1_ST"])
+
+    def test_credits_restored(self):
+        random.seed(1)
+        _, engine, mesh = run_uniform_traffic_with_mesh(
+            x=4, y=4, packets_per_node=20, max_tick=20000, backend="flat")
+        self.assertFalse(engine.event_queue)
+        for router in mesh.values():
+            self.assertEqual(router.packets, 0)
+            for out_port in range(router.num_ports):
+                dest, _ = router.output_links[out_port]
+                if dest is None:
+                    continue
+                for vc in range(router.port_num_vcs[out_port]):
+                    self.assertEqual(router.credit_counts[out_port][vc], dest.buffer_capacity)
+        received = sum(r.attached_module.received for r in mesh.values())
+        self.assertEqual(received, 4 * 4 * 20)
+
+    def test_early_tick_reschedules(self):
+        engine = SimulatorEngine()
+        router = create_mesh(engine, 2, 1, {"mesh_size": (2, 1)}, backend="flat")[(0, 0)]
+        router._schedule_tick(5)
+        _, _, tick = engine.event_queue.pop()
+        # The tick labelled 5 runs in cycle 4 and asks for cycle 5
+        engine.current_cycle = 4
+        router.handle_event(tick)
+        router._schedule_tick(5)
+        self.assertEqual(len(engine.event_queue), 1)
+
+    def test_saturated_mesh_drains(self):
+        # Past saturation, late in the run, float event times let a tick run
+        # a cycle before its label; its follow-up tick must not be dropped
+        point = run_load_point(0.6, pattern="transpose", x=4, y=4, cycles=300, warmup=50,
+                               backend="flat")
+        self.assertTrue(point["delivered"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+import os
+import random
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(__file__)))
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.logger import EventLogger
+from tests.test_timeline import PacketSource, PacketSink
+
+
+def run_with_logger(logger):
+    random.seed(0)
+    engine = SimulatorEngine()
+    engine.set_logger(logger)
+    mesh_info = {"mesh_size": (4, 1), "router_map": None}
+    mesh = create_mesh(engine, 4, 1, mesh_info, buffer_capacity=1)
+    mesh_info["router_map"] = mesh
+    src = PacketSource(engine, "SRC", mesh_info, (0, 0), (3, 0), num_packets=3, buffer_capacity=1)
+    dst = PacketSink(engine, "DST", mesh_info, (3, 0), buffer_capacity=1)
+    mesh[(0, 0)].attach_module(src)
+    mesh[(3, 0)].attach_module(dst)
+    engine.register_module(src)
+    engine.register_module(dst)
+    src.start()
+    engine.run_until_idle(max_tick=200)
+    return logger.get_entries()
+
+
+class LoggerFilterTest(unittest.TestCase):
+    def test_module_and_type_filter(self):
+        entries = run_with_logger(EventLogger(modules=["Router_1_*", "DST"],
+                                              event_types=["PACKET"]))
+        self.assertTrue(entries)
+        for e in entries:
+            self.assertTrue(e["module"] == "DST" or e["module"].startswith("Router_1_"))
+            self.assertEqual(e["event_type"], "PACKET")
+
+    def test_cycle_window_and_stage(self):
+        entries = run_with_logger(EventLogger(cycle_window=(5, 12), stages=["P*_SA"]))
+        self.assertTrue(entries)
+        for e in entries:
+            self.assertTrue(5 <= e["cycle"] < 12)
+            self.assertTrue(e["stage"].endswith("_SA"))
+
+    def test_sampling(self):
+        full = run_with_logger(EventLogger())
+        thinned = run_with_logger(EventLogger(sample_every=4))
+        self.assertEqual(len(thinned), (len(full) + 3) // 4)
+        reservoir = run_with_logger(EventLogger(reservoir_size=10))
+        self.assertEqual(len(reservoir), 10)
+        cycles = [e["cycle"] for e in reservoir]
+        self.assertEqual(cycles, sorted(cycles))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import random
+import unittest
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from tests.test_flat_router import RecordingSink
+from tests.test_multicast import run_cp
+from tests.test_timeline import PacketSource
+from tests.test_traffic.uniform_traffic import run_uniform_traffic_with_mesh
+
+
+def first_arrival(backend, pipeline, length):
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (length, 1), "router_map": None}
+    mesh = create_mesh(engine, length, 1, mesh_info, backend=backend, pipeline=pipeline)
+    mesh_info["router_map"] = mesh
+    src = PacketSource(engine, "SRC", mesh_info, (0, 0), (length - 1, 0), num_packets=2)
+    dst = RecordingSink(engine, "DST", mesh_info, (length - 1, 0))
+    mesh[(0, 0)].attach_module(src)
+    mesh[(length - 1, 0)].attach_module(dst)
+    engine.register_module(src)
+    engine.register_module(dst)
+    src.start()
+    engine.run_until_idle()
+    return dst.arrivals[0]
+
+
+class LatencyProbe:
+    """Router trace hook measuring the network latency per event type."""
+
+    def __init__(self):
+        self.latency = {}
+
+    def record_injection(self, router, port, event):
+        event.payload["probe_cycle"] = router.engine.current_cycle
+
+    def record_delivery(self, router, port, event, cycle):
+        start = event.payload.get("probe_cycle")
+        if start is not None:
+            self.latency.setdefault(event.event_type, []).append(cycle - start)
+
+    def mean(self, event_type):
+        values = self.latency[event_type]
+        return sum(values) / len(values)
+
+
+class LookaheadTest(unittest.TestCase):
+    def test_hop_latency(self):
+        for backend in ("router", "flat"):
+            hops = {}
+            for pipeline in ("full", "lookahead", "bypass"):
+                hops[pipeline] = (first_arrival(backend, pipeline, 6)
+                                  - first_arrival(backend, pipeline, 3)) / 3
+            # The reference router's float event times can round a stage
+            # up by a cycle, so only approximately there
+            for pipeline, cycles in (("full", 5), ("lookahead", 4), ("bypass", 2)):
+                self.assertAlmostEqual(hops[pipeline], cycles, delta=0.5, msg=backend)
+
+    def test_loaded_mesh_drains(self):
+        for backend in ("router", "flat"):
+            latency = {}
+            for pipeline in ("full", "bypass"):
+                random.seed(3)
+                latency[pipeline], engine, _ = run_uniform_traffic_with_mesh(
+                    4, 4, 10, backend=backend, routing="o1turn", pipeline=pipeline)
+                self.assertFalse(engine.event_queue)
+            self.assertLess(latency["bypass"], latency["full"], backend)
+
+    def test_cp_control_latency(self):
+        cmd, finish = {}, {}
+        for pipeline in ("full", "lookahead", "bypass"):
+            probe = LatencyProbe()
+
+            def setup(mesh):
+                for router in set(mesh.values()):
+                    router.trace = probe
+
+            cp, _, engine = run_cp(6, False, setup=setup, pipeline=pipeline)
+            self.assertEqual(len(probe.latency["NPU_CMD_DONE"]), 6)
+            cmd[pipeline] = probe.mean("NPU_CMD")
+            finish[pipeline] = engine.current_cycle
+        self.assertLess(cmd["lookahead"], cmd["full"])
+        self.assertLess(cmd["bypass"], cmd["lookahead"])
+        self.assertLess(finish["bypass"], 0.8 * finish["full"])
+
+    def test_option_checks(self):
+        engine = SimulatorEngine()
+        for backend in ("vector", "analytic"):
+            with self.assertRaises(ValueError):
+                create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend=backend,
+                            pipeline="lookahead")
+        with self.assertRaises(ValueError):
+            create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, pipeline="speculative")
+
+
+if __name__ == "__main__":
+    unittest.main()
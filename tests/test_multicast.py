@@ -0,0 +1,168 @@
+import unittest
+
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.mesh import create_mesh
+from sim_core.router import DIR_INDEX, multicast_branches
+from sim_hw.cp import ControlProcessor
+from sim_hw.iod import IOD
+from sim_hw.npu import NPU
+from tests.test_flat_router import RecordingSink
+from tests.test_timeline import PacketSource
+from tests.test_topology import assert_drained
+
+
+class MulticastSource(PacketSource):
+    """Packet source sending one packet to every coordinate in ``dst_set``."""
+
+    def __init__(self, *args, dst_set=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dst_set = tuple(dst_set)
+
+    def send_event(self, event):
+        if event.event_type == "PACKET":
+            event.payload["dst_set"] = self.dst_set
+            event.payload["dst_coords"] = self.dst_set[0]
+        super().send_event(event)
+
+
+def broadcast(backend, multicast=True, size=4):
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (size, size), "router_map": None}
+    mesh = create_mesh(engine, size, size, mesh_info, backend=backend)
+    mesh_info["router_map"] = mesh
+    stats = None
+    if backend in ("router", "flat"):
+        from sim_core.noc_stats import NocStats
+        stats = NocStats(mesh)
+    dsts = [c for c in sorted(mesh) if c != (0, 0)]
+    sinks = {}
+    for coords in dsts:
+        sink = RecordingSink(engine, f"DST_{coords[0]}_{coords[1]}", mesh_info, coords)
+        mesh[coords].attach_module(sink)
+        engine.register_module(sink)
+        sinks[coords] = sink
+    if multicast:
+        sources = [MulticastSource(engine, "SRC", mesh_info, (0, 0), dsts[0],
+                                   num_packets=1, dst_set=dsts)]
+    else:
+        sources = [PacketSource(engine, f"SRC_{i}", mesh_info, (0, 0), d, num_packets=1)
+                   for i, d in enumerate(dsts)]
+    for src in sources:
+        engine.register_module(src)
+        src.start()
+    mesh[(0, 0)].attach_module(sources[0])
+    engine.run_until_idle(max_tick=20000)
+    return mesh, sinks, stats
+
+
+class MulticastTest(unittest.TestCase):
+    def test_branches_follow_xy_tree(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 4, 4, {})
+        router = mesh[(1, 1)]
+        event = Event(src=None, dst=router, cycle=0, event_type="PACKET", payload={
+            "dst_set": ((3, 1), (1, 1), (2, 3), (1, 0), (2, 1)),
+            "dst_coords": (3, 1),
+        })
+        branches = multicast_branches(router, event)
+        self.assertIs(branches[0], event)
+        by_port = {b.payload["out_port"]: b.payload["dst_set"] for b in branches}
+        self.assertEqual(by_port, {
+            DIR_INDEX["E"]: ((3, 1), (2, 3), (2, 1)),
+            DIR_INDEX["LOCAL"]: ((1, 1),),
+            DIR_INDEX["N"]: ((1, 0),),
+        })
+        # Copies share one counter so only the last returns the credit
+        pending = {id(b.payload["mcast_pending"]) for b in branches}
+        self.assertEqual(len(pending), 1)
+        self.assertEqual(branches[0].payload["mcast_pending"], [3])
+
+    def test_every_destination_receives_one_copy(self):
+        for backend in ("router", "flat", "analytic"):
+            mesh, sinks, stats = broadcast(backend)
+            self.assertEqual({c: s.received for c, s in sinks.items()},
+                             {c: 1 for c in sinks}, backend)
+            if backend != "analytic":
+                assert_drained(self, mesh)
+
+    def test_tree_uses_fewer_links_than_unicast(self):
+        for backend in ("router", "flat"):
+            _, _, tree = broadcast(backend)
+            _, _, unicast = broadcast(backend, multicast=False)
+            # One traversal per tree edge and ejection instead of one per hop
+            self.assertEqual(int(tree.flits.sum()), 30, backend)
+            self.assertEqual(int(unicast.flits.sum()), 63, backend)
+
+    def test_vector_mesh_rejects_multicast(self):
+        try:
+            import numpy  # noqa: F401
+        except ImportError:
+            self.skipTest("NumPy not installed")
+        with self.assertRaises(ValueError):
+            broadcast("vector")
+
+
+def run_cp(num_npus, multicast, backend="router", setup=None, pipeline="full"):
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (4, 2), "router_map": None,
+                 "npu_coords": {}, "cp_coords": {}, "iod_coords": {}}
+    mesh = create_mesh(engine, 4, 2, mesh_info, backend=backend, pipeline=pipeline)
+    mesh_info["router_map"] = mesh
+    free = [c for c in sorted(mesh) if c not in ((0, 0), (3, 1))]
+    npus = []
+    for i in range(num_npus):
+        npu = NPU(engine, f"NPU_{i}", mesh_info)
+        mesh_info["npu_coords"][npu.name] = free[i]
+        mesh[free[i]].attach_module(npu)
+        engine.register_module(npu)
+        npus.append(npu)
+    iod = IOD(engine, "IOD", mesh_info, pipeline_latency=2, channels_per_stack=16)
+    mesh_info["iod_coords"]["IOD"] = (3, 1)
+    mesh[(3, 1)].attach_module(iod)
+    engine.register_module(iod)
+    cp = ControlProcessor(engine, "CP", mesh_info, npus=npus, multicast=multicast)
+    mesh_info["cp_coords"]["CP"] = (0, 0)
+    mesh[(0, 0)].attach_module(cp)
+    engine.register_module(cp)
+    cfg = {"program_cycles": 3, "in_size": 16, "out_size": 16, "dma_in_opcode_cycles": 2,
+           "dma_out_opcode_cycles": 2, "cmd_opcode_cycles": 3, "stream_id": "A",
+           "eaddr": 0, "iaddr": 0}
+    cp.load_program("prog", [
+        {"event_type": "NPU_DMA_IN", "payload": cfg},
+        {"event_type": "NPU_CMD", "payload": cfg},
+        {"event_type": "NPU_DMA_OUT", "payload": cfg},
+    ])
+    sent = []
+    send = cp.send_event
+
+    def counting_send(event):
+        if event.dst is mesh[(0, 0)]:
+            sent.append(event.event_type)
+        send(event)
+
+    cp.send_event = counting_send
+    if setup is not None:
+        setup(mesh)
+    cp.send_event(Event(src=None, dst=cp, cycle=1, program="prog", event_type="RUN_PROGRAM"))
+    engine.run_until_idle(max_tick=20000)
+    return cp, sent, engine
+
+
+class CPBroadcastTest(unittest.TestCase):
+    def test_cp_broadcasts_one_packet_per_instruction(self):
+        for backend in ("router", "flat"):
+            cp, sent, engine = run_cp(6, multicast=True, backend=backend)
+            self.assertEqual(sent, ["NPU_DMA_IN", "NPU_CMD", "NPU_DMA_OUT"], backend)
+            self.assertNotIn("prog", cp.active_npu_programs, backend)
+            self.assertFalse(engine.event_queue)
+            board = cp.program_scoreboards["prog"]
+            self.assertTrue(all(e["status"] == "done" for e in board["entries"]))
+
+            cp, sent, _ = run_cp(6, multicast=False, backend=backend)
+            self.assertEqual(len(sent), 18, backend)
+            self.assertNotIn("prog", cp.active_npu_programs, backend)
+
+
+if __name__ == '__main__':
+    unittest.main()
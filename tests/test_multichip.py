@@ -0,0 +1,138 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.multichip import create_multichip
+from tests.test_flat_router import RecordingSink
+from tests.test_serialization import SizedSource
+from tests.test_topology import assert_drained
+from tests.test_traffic.traffic_gen import TrafficGenerator
+
+
+def send_across(backend="router", data_size=1, num_chips=2, num_packets=1, setup=None,
+                **kwargs):
+    """Send packets from chip 0 to the far corner of the last chip."""
+    engine = SimulatorEngine()
+    mesh_info = {}
+    mesh = create_multichip(engine, num_chips, 3, 3, mesh_info, backend=backend, **kwargs)
+    mesh_info["router_map"] = mesh
+    dst_coords = (num_chips - 1, 2, 2)
+    src = SizedSource(engine, "SRC", mesh_info, (0, 0, 0), dst_coords,
+                      num_packets=num_packets, data_size=data_size)
+    dst = RecordingSink(engine, "DST", mesh_info, dst_coords)
+    mesh[(0, 0, 0)].attach_module(src)
+    mesh[dst_coords].attach_module(dst)
+    engine.register_module(src)
+    engine.register_module(dst)
+    if setup is not None:
+        setup(mesh, mesh_info)
+    src.start()
+    engine.run_until_idle(max_tick=10000)
+    return dst, mesh, mesh_info
+
+
+class MultiChipTest(unittest.TestCase):
+    def test_routes_through_gateways(self):
+        mesh_info = {}
+        mesh = create_multichip(SimulatorEngine(), 3, 4, 4, mesh_info)
+        network = mesh_info["chip_network"]
+        self.assertEqual(len(mesh), 48)
+        self.assertEqual(network.exit(0, 2), ((3, 2), 5))
+        self.assertEqual(network.exit(2, 0), ((0, 2), 5))
+        table = mesh[(1, 0, 0)].routing
+        # Chip 1 reaches chip 0 through its west gateway and chip 2 through its east one
+        self.assertEqual(table.next_port((0, 2), (0, 3, 3)), 5)
+        self.assertEqual(table.next_port((3, 2), (2, 0, 0)), 5)
+        self.assertEqual(table.next_port((0, 0), (2, 0, 0)), 1)
+        self.assertEqual(table.next_port((0, 0), (1, 0, 1)), 4)
+        self.assertIsNot(mesh[(0, 0, 0)], mesh[(1, 0, 0)])
+        with self.assertRaises(ValueError):
+            create_multichip(SimulatorEngine(), 2, 2, 2, {}, backend="vector")
+
+    def test_routes_prefer_fast_bridges(self):
+        mesh_info = {}
+        links = [(0, 1), (1, 2), (0, 2, {"latency": 100, "gateways": ((1, 0), (1, 0))})]
+        create_multichip(SimulatorEngine(), 3, 2, 2, mesh_info, links=links)
+        network = mesh_info["chip_network"]
+        self.assertEqual(network.exit(0, 2)[0], (1, 1))
+        links[2][2]["latency"] = 10
+        create_multichip(SimulatorEngine(), 3, 2, 2, mesh_info, links=links)
+        self.assertEqual(mesh_info["chip_network"].exit(0, 2), ((1, 0), 5))
+
+    def test_bridge_latency_bandwidth_and_clock(self):
+        for backend in ("router", "flat"):
+            base = send_across(backend)[0].arrivals[0]
+            slow = send_across(backend, bridge_latency=50)[0].arrivals[0]
+            self.assertEqual(slow - base, 30, backend)
+            # 64 bytes take 8 cycles on a 64-bit bridge instead of one
+            big = send_across(backend, data_size=64, bitwidth=512)[0].arrivals[0]
+            self.assertEqual(big - base, 7, backend)
+            # A 500 MHz bridge doubles its cycles in router time
+            half = send_across(backend, bridge_frequency=500)[0].arrivals[0]
+            self.assertEqual(half - base, 21, backend)
+            dst, mesh, mesh_info = send_across(backend, num_chips=3)
+            self.assertEqual(len(dst.arrivals), 1)
+            bridges = mesh_info["chip_network"].bridges
+            self.assertEqual([b.traffic[(i, i + 1)][0] for i, b in enumerate(bridges)], [1, 1])
+
+    def test_bridge_holds_packets_until_far_router_accepts(self):
+        for backend in ("router", "flat"):
+            # Packets the bridge took while the far gateway was full
+            held = []
+
+            def setup(mesh, mesh_info):
+                bridge = mesh_info["chip_network"].bridges[0]
+                far = mesh[(1, 0, 1)]
+                reserve = far._reserve_slot
+                engine = far.engine
+
+                def refuse_until(event=None):
+                    # The far gateway is full for the first 100 cycles
+                    if event is not None and event.src is bridge and engine.current_cycle < 100:
+                        held.append(bridge.traffic[(0, 1)][0])
+                        return False
+                    return reserve(event)
+
+                far._reserve_slot = refuse_until
+
+            dst, mesh, mesh_info = send_across(backend, num_packets=4, bridge_capacity=2,
+                                               setup=setup)
+            self.assertEqual(len(dst.arrivals), 4, backend)
+            # Packets waiting for the far router keep their bridge slot
+            self.assertEqual(max(held), 2, backend)
+            self.assertGreater(dst.arrivals[2], 100, backend)
+            bridge = mesh_info["chip_network"].bridges[0]
+            self.assertEqual(set(bridge.in_flight.values()), {0}, backend)
+
+    def test_uniform_traffic_drains(self):
+        for backend in ("router", "flat"):
+            random.seed(5)
+            engine = SimulatorEngine()
+            mesh_info = {}
+            mesh = create_multichip(engine, 3, 3, 3, mesh_info, backend=backend,
+                                    bridge_capacity=2)
+            mesh_info["router_map"] = mesh
+            gens = []
+            for coords in sorted(mesh):
+                tg = TrafficGenerator(engine, f"TG_{coords}", mesh_info, coords, 10,
+                                      injection_rate=0.5)
+                tg.pick_destination = lambda: tuple(random.randrange(n) for n in (3, 3, 3))
+                mesh[coords].attach_module(tg)
+                engine.register_module(tg)
+                tg.start()
+                gens.append(tg)
+            engine.run_until_idle(max_tick=500000)
+            self.assertFalse(engine.event_queue, backend)
+            self.assertEqual(sum(g.received for g in gens), 270, backend)
+            assert_drained(self, mesh)
+            network = mesh_info["chip_network"]
+            parts = network.partitions()
+            self.assertEqual(sorted(len(p) for p in parts.values()), [18, 18, 18])
+            self.assertEqual(set(parts[1]), set(mesh[(1, x, y)] for x in range(3)
+                                                for y in range(3)) | set(gens[9:18]))
+            for bridge in network.bridges:
+                self.assertEqual(set(bridge.in_flight.values()), {0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.noc_stats import NocStats
+from tests.test_traffic.traffic_gen import TrafficGenerator
+
+
+class NocStatsTest(unittest.TestCase):
+    def test_counters_and_hotspots(self):
+        random.seed(2)
+        engine = SimulatorEngine()
+        mesh_info = {"mesh_size": (4, 4), "router_map": None}
+        mesh = create_mesh(engine, 4, 4, mesh_info, buffer_capacity=2)
+        mesh_info["router_map"] = mesh
+        stats = NocStats(mesh)
+        gens = []
+        for x in range(4):
+            for y in range(4):
+                tg = TrafficGenerator(engine, f"TG_{x}_{y}", mesh_info, (x, y), 20)
+                mesh[(x, y)].attach_module(tg)
+                engine.register_module(tg)
+                tg.start()
+                gens.append(tg)
+        engine.run_until_idle(max_tick=50000)
+
+        received = sum(g.received for g in gens)
+        self.assertEqual(received, 320)
+        # Every packet is ejected through exactly one LOCAL output port
+        self.assertEqual(int(stats.flits[:, :, 0, :].sum()), received)
+        self.assertEqual(stats.flits.shape, (4, 4, 5, 2))
+        # West edge routers never forward west
+        self.assertEqual(int(stats.flits[0, :, 2, :].sum()), 0)
+        self.assertGreater(int(stats.sa_conflicts.sum()), 0)
+        self.assertGreater(int(stats.occupancy_samples.sum()), 0)
+        self.assertTrue((stats.occupancy_max[:, :, 1:] <= 2).all())
+
+        util = stats.link_utilization()
+        self.assertTrue(((util >= 0) & (util <= 1)).all())
+        self.assertEqual(stats.heatmap("utilization").shape, (4, 4))
+        hot = stats.hotspots(5)
+        self.assertEqual(len(hot), 5)
+        values = [h["value"] for h in hot]
+        self.assertEqual(values, sorted(values, reverse=True))
+        self.assertAlmostEqual(values[0], float(util.max()))
+
+
+if __name__ == "__main__":
+    unittest.main()
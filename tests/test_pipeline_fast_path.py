@@ -0,0 +1,115 @@
+import random
+import unittest
+
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.logger import EventLogger
+from sim_core.module import HardwareModule, PipelineModule
+from tests.test_multicast import run_cp
+
+
+class PassThrough(PipelineModule):
+    """Pipeline passing tokens on unchanged, recording their output cycles."""
+
+    def __init__(self, engine, num_stages, buffer_capacity=4, fast_path=True):
+        super().__init__(engine, "PIPE", {}, num_stages, buffer_capacity)
+        self.fast_path = fast_path
+        self.set_stage_funcs([self._make_stage_func(i) for i in range(num_stages)])
+        self.outputs = []
+        self.followup = None
+
+    def _make_stage_func(self, idx):
+        return lambda module, data: (data, idx + 1, False)
+
+    def handle_pipeline_output(self, data):
+        self.outputs.append((self.engine.current_cycle, data))
+        if self.followup is not None and data == self.followup[0]:
+            batch, self.followup = self.followup[1], None
+            self.add_batch(batch)
+
+
+class Blocker(HardwareModule):
+    """Sends ``NOP`` events that hold a slot of the pipeline's buffer."""
+
+    def __init__(self, engine, pipe, hold):
+        super().__init__(engine, "BLOCK", {})
+        self.pipe = pipe
+        self.hold = hold
+
+    def handle_event(self, event):
+        if event.event_type == "GO":
+            self.send_event(Event(src=self, dst=self.pipe, cycle=self.engine.current_cycle + self.hold,
+                                  event_type="NOP"))
+
+
+def run_batch(fast_path, num_stages, stage_idx, count, buffer_capacity=4, block=None):
+    engine = SimulatorEngine()
+    pipe = PassThrough(engine, num_stages, buffer_capacity, fast_path)
+    engine.register_module(pipe)
+    if block is not None:
+        start, hold = block
+        blocker = Blocker(engine, pipe, hold)
+        engine.register_module(blocker)
+        for k in range(6):
+            engine.push_event(Event(src=blocker, dst=blocker, cycle=start + k, event_type="GO"))
+    # A second batch starts from the output handler of the first
+    pipe.followup = (count - 1, ["x", "y", "z"])
+    pipe.add_batch(range(count), stage_idx)
+    ticks = 0
+    while engine.event_queue:
+        engine.tick()
+        ticks += 1
+    return pipe.outputs, ticks
+
+
+class PipelineFastPathTest(unittest.TestCase):
+    def test_matches_stepping(self):
+        for num_stages in (1, 2, 5):
+            for stage_idx in range(num_stages):
+                for count in (1, 3, 12):
+                    stepped, _ = run_batch(False, num_stages, stage_idx, count)
+                    fast, _ = run_batch(True, num_stages, stage_idx, count)
+                    self.assertEqual(fast, stepped, (num_stages, stage_idx, count))
+        _, stepped_events = run_batch(False, 5, 0, 40)
+        _, fast_events = run_batch(True, 5, 0, 40)
+        self.assertLess(fast_events, stepped_events / 4)
+
+    def test_backpressure_falls_back(self):
+        for num_stages, capacity, block in ((5, 4, (3, 3)), (5, 2, (6, 1)),
+                                            (3, 1, (2, 4)), (5, 4, (10, 2))):
+            stepped, _ = run_batch(False, num_stages, 0, 15, capacity, block)
+            fast, _ = run_batch(True, num_stages, 0, 15, capacity, block)
+            self.assertEqual(fast, stepped, (num_stages, capacity, block))
+
+    def test_logger_disables_fast_path(self):
+        engine = SimulatorEngine()
+        engine.logger = EventLogger()
+        pipe = PassThrough(engine, 3)
+        engine.register_module(pipe)
+        pipe.add_batch(range(4))
+        self.assertTrue(any(pipe.stage_queues))
+        engine.run_until_idle()
+        self.assertEqual(pipe.outputs, [(3, 0), (4, 1), (5, 2), (6, 3)])
+
+    def test_npu_commands(self):
+        # The flat router's integer cycles keep simultaneous events in a
+        # fixed order; the reference router's float times leave ties to the
+        # heap, which the batch events reshuffle
+        finish = {}
+        for fast_path in (False, True):
+            # The default allocator draws from the global generator
+            random.seed(5)
+
+            def setup(mesh):
+                for router in mesh.values():
+                    if isinstance(router.attached_module, PipelineModule):
+                        router.attached_module.fast_path = fast_path
+
+            _, _, engine = run_cp(6, False, backend="flat", setup=setup)
+            self.assertFalse(engine.event_queue)
+            finish[fast_path] = engine.current_cycle
+        self.assertEqual(finish[True], finish[False])
+
+
+if __name__ == "__main__":
+    unittest.main()
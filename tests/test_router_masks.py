@@ -0,0 +1,67 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.router import mask_bits, select_output_vc
+from tests.test_traffic.traffic_gen import TrafficGenerator
+
+
+def mask_of(queues):
+    return sum(1 << i for i, q in enumerate(queues) if q)
+
+
+class RouterMaskTest(unittest.TestCase):
+    def assert_consistent(self, router):
+        for pidx, port in enumerate(router.ports):
+            self.assertEqual(port.va_mask, mask_of(port.va_stage_queues))
+            self.assertEqual(router.sa_vc_masks[pidx], mask_of(router.sa_stage_queues[pidx]))
+        self.assertEqual(router.sa_port_mask, mask_of(router.sa_vc_masks))
+        self.assertEqual(router.st_port_mask, mask_of(router.st_stage_queues))
+        for out_port, alloc in enumerate(router.output_vc_allocation):
+            free = sum(1 << vc for vc, pkt in enumerate(alloc) if pkt is None)
+            self.assertEqual(router.vc_free_masks[out_port], free)
+
+    def test_mask_bits(self):
+        bits = mask_bits(3)
+        self.assertEqual(bits[0], ())
+        self.assertEqual(bits[0b101], (0, 2))
+        self.assertEqual(len(bits), 8)
+
+    def test_masks_track_queues(self):
+        random.seed(4)
+        engine = SimulatorEngine()
+        mesh_info = {"mesh_size": (3, 3), "router_map": None}
+        mesh = create_mesh(engine, 3, 3, mesh_info, buffer_capacity=2)
+        mesh_info["router_map"] = mesh
+        for (x, y), router in mesh.items():
+            tg = TrafficGenerator(engine, f"TG_{x}_{y}", mesh_info, (x, y), 15)
+            router.attach_module(tg)
+            engine.register_module(tg)
+            tg.start()
+        ticks = 0
+        while engine.event_queue and ticks < 20000:
+            engine.tick()
+            ticks += 1
+            if ticks % 7 == 0:
+                for router in mesh.values():
+                    self.assert_consistent(router)
+        for router in mesh.values():
+            self.assert_consistent(router)
+            self.assertEqual(router.sa_port_mask, 0)
+            self.assertEqual(router.st_port_mask, 0)
+
+    def test_select_output_vc_skips_allocated(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 2, 1, {"mesh_size": (2, 1)})
+        router = mesh[(0, 0)]
+        router._allocate_vc(1, 0, object())
+        self.assertEqual(select_output_vc(router, 1), 1)
+        router.credit_counts[1][1] = 0
+        self.assertIsNone(select_output_vc(router, 1))
+        router._free_vc(1, 0)
+        self.assertEqual(select_output_vc(router, 1), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
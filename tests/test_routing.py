@@ -0,0 +1,143 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.router import DIR_INDEX
+from sim_core.routing import ROUTING_ALGORITHMS, RoutingTable
+from tests.test_traffic.sweep import is_saturated, run_load_point
+from tests.test_traffic.uniform_traffic import run_uniform_traffic_with_mesh
+
+STEP = {DIR_INDEX["E"]: (1, 0), DIR_INDEX["W"]: (-1, 0),
+        DIR_INDEX["S"]: (0, 1), DIR_INDEX["N"]: (0, -1)}
+
+
+def build(algorithm, x=4, y=4, **kwargs):
+    engine = SimulatorEngine()
+    return create_mesh(engine, x, y, {"mesh_size": (x, y)}, routing=algorithm, **kwargs)
+
+
+class RoutingTableTest(unittest.TestCase):
+    def walk_all(self, table, src, dst, route_class):
+        """Follow every permitted port and return the set of path lengths."""
+        if src == dst:
+            return {0}
+        lengths = set()
+        ports = table.tables[src][route_class][table.node_ids[dst]]
+        for port in ports:
+            self.assertNotEqual(port, DIR_INDEX["LOCAL"])
+            dx, dy = STEP[port]
+            nxt = (src[0] + dx, src[1] + dy)
+            lengths |= {n + 1 for n in self.walk_all(table, nxt, dst, route_class)}
+        return lengths
+
+    def test_all_routes_are_minimal(self):
+        mesh = build("xy")
+        for algorithm in ROUTING_ALGORITHMS:
+            table = RoutingTable(mesh, algorithm)
+            for src in mesh:
+                for dst in mesh:
+                    minimal = abs(dst[0] - src[0]) + abs(dst[1] - src[1])
+                    for cls in range(table.num_classes):
+                        self.assertEqual(self.walk_all(table, src, dst, cls), {minimal},
+                                         (algorithm, src, dst))
+
+    def test_yx_moves_in_y_first(self):
+        table = RoutingTable(build("yx"), "yx")
+        self.assertEqual(table.next_port((0, 0), (2, 3)), DIR_INDEX["S"])
+        self.assertEqual(table.next_port((0, 3), (2, 3)), DIR_INDEX["E"])
+
+    def test_turn_model_restrictions(self):
+        mesh = build("xy")
+        west = RoutingTable(mesh, "west_first")
+        neg = RoutingTable(mesh, "negative_first")
+        self.assertFalse(west.deterministic)
+        self.assertEqual(west.next_port((3, 3), (0, 0)), DIR_INDEX["W"])
+        self.assertEqual(len(west.tables[(0, 0)][0][west.node_ids[(3, 3)]]), 2)
+        # Negative directions only while any remain
+        ports = neg.tables[(3, 0)][0][neg.node_ids[(0, 3)]]
+        self.assertEqual(ports, (DIR_INDEX["W"],))
+
+    def test_tables_are_shared_by_offset(self):
+        for backend in ("router", "flat"):
+            mesh = build("xy", 32, 32, backend=backend)
+            table = mesh[(0, 0)].routing
+            # One entry per (dx, dy) offset rather than per router pair
+            self.assertEqual(len(table.offset_tables[0]), 63 * 63)
+            self.assertTrue(all(r.route_table is table.offset_tables for r in mesh.values()))
+            self.assertEqual(table.next_port((31, 0), (0, 31)), DIR_INDEX["W"])
+            self.assertEqual(table.next_port((5, 0), (5, 31)), DIR_INDEX["S"])
+            self.assertEqual(table.next_port((7, 7), (7, 7)), DIR_INDEX["LOCAL"])
+
+    def test_routers_use_compiled_table(self):
+        mesh = build("yx")
+        router = mesh[(1, 1)]
+        self.assertEqual(router.routing.algorithm, "yx")
+        port = router.routing.route(router, {"dst_coords": (3, 0), "input_port": 1})
+        self.assertEqual(port, DIR_INDEX["N"])
+
+    def test_o1turn_needs_two_vcs(self):
+        with self.assertRaises(ValueError):
+            build("o1turn", num_vcs=1)
+        with self.assertRaises(ValueError):
+            build("bogus")
+
+    def test_o1turn_vc_classes(self):
+        mesh = build("o1turn")
+        router = mesh[(0, 0)]
+        table = router.routing
+        self.assertEqual(table.allowed_vcs(router, {"route_class": 0}, DIR_INDEX["E"]), 0b01)
+        self.assertEqual(table.allowed_vcs(router, {"route_class": 1}, DIR_INDEX["E"]), 0b10)
+        self.assertIsNone(table.allowed_vcs(router, {"route_class": 1}, DIR_INDEX["LOCAL"]))
+
+    def test_adaptive_escape_vc(self):
+        with self.assertRaises(ValueError):
+            build("adaptive", num_vcs=1)
+        mesh = build("adaptive")
+        router = mesh[(0, 0)]
+        table = router.routing
+        east, south = DIR_INDEX["E"], DIR_INDEX["S"]
+        payload = {"dst_coords": (2, 2), "input_port": 0}
+        # Only the XY output may use the escape VC
+        self.assertEqual(table.allowed_vcs(router, payload, east), 0b11)
+        self.assertEqual(table.allowed_vcs(router, payload, south), 0b10)
+        self.assertEqual(table.escape(router, payload), (east, 0))
+        # The XY output also counts its escape VC credit
+        self.assertEqual(table.route(router, payload), east)
+        router.credit_counts[east][:] = [0, 0]
+        self.assertEqual(table.route(router, payload), south)
+        self.assertEqual(table.escape(router, payload), (east, None))
+        # A congested column one hop ahead counts against the south port
+        mesh[(0, 1)].credit_counts[south][1] = 0
+        self.assertEqual(table.route(router, payload), east)
+
+    def test_mesh_backends_reject_adaptive(self):
+        with self.assertRaises(ValueError):
+            build("west_first", backend="vector")
+        build("yx", backend="vector")
+        build("yx", backend="analytic")
+
+
+class RoutingTrafficTest(unittest.TestCase):
+    def test_algorithms_deliver_all_packets(self):
+        for backend in ("router", "flat"):
+            for algorithm in ROUTING_ALGORITHMS:
+                random.seed(3)
+                _, engine, mesh = run_uniform_traffic_with_mesh(
+                    x=4, y=4, packets_per_node=15, max_tick=50000,
+                    backend=backend, routing=algorithm)
+                received = sum(r.attached_module.received for r in mesh.values())
+                self.assertEqual(received, 240, (backend, algorithm))
+                self.assertFalse(engine.event_queue)
+
+    def test_adaptive_raises_transpose_throughput(self):
+        for backend in ("router", "flat"):
+            point = dict(pattern="transpose", x=4, y=4, cycles=300, warmup=75, backend=backend)
+            for routing, saturated in (("xy", True), ("adaptive", False)):
+                zero_load = run_load_point(0.01, routing=routing, **point)["latency"]
+                loaded = run_load_point(0.4, routing=routing, **point)
+                self.assertEqual(is_saturated(loaded, zero_load), saturated, (backend, routing))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+from unittest import mock
+
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.mesh import create_mesh
+from sim_core.router import packet_flits
+from tests.test_flat_router import RecordingSink
+from tests.test_timeline import PacketSource
+from tests.test_topology import assert_drained
+
+try:
+    import numpy  # noqa: F401
+    BACKENDS = ("router", "flat", "vector", "analytic")
+except ImportError:
+    BACKENDS = ("router", "flat", "analytic")
+
+
+class SizedSource(PacketSource):
+    """Packet source sending ``data_size`` byte packets."""
+
+    def __init__(self, *args, data_size=1, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.data_size = data_size
+
+    def send_event(self, event):
+        if event.event_type == "PACKET":
+            event.data_size = self.data_size
+        super().send_event(event)
+
+
+def send_line(backend, data_size, num_packets=1, length=4, rounds=1):
+    """Send packets along a ``length`` router line.
+
+    Returns the sink, the mesh and, per round, the event types constructed.
+    """
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (length, 1), "router_map": None}
+    mesh = create_mesh(engine, length, 1, mesh_info, backend=backend)
+    mesh_info["router_map"] = mesh
+    src = SizedSource(engine, "SRC", mesh_info, (0, 0), (length - 1, 0),
+                      num_packets=num_packets, data_size=data_size)
+    dst = RecordingSink(engine, "DST", mesh_info, (length - 1, 0))
+    mesh[(0, 0)].attach_module(src)
+    mesh[(length - 1, 0)].attach_module(dst)
+    engine.register_module(src)
+    engine.register_module(dst)
+    created = []
+    init = Event.__init__
+
+    def counting_init(self, *args, **kwargs):
+        created[-1].append(kwargs.get("event_type"))
+        init(self, *args, **kwargs)
+
+    with mock.patch.object(Event, "__init__", counting_init):
+        for _ in range(rounds):
+            created.append([])
+            src.sent = 0
+            src.start()
+            engine.run_until_idle(max_tick=10000)
+    return dst, mesh, created
+
+
+class SerializationTest(unittest.TestCase):
+    def test_packet_flits(self):
+        self.assertEqual(packet_flits(4, 256), 1)
+        self.assertEqual(packet_flits(32, 256), 1)
+        self.assertEqual(packet_flits(33, 256), 2)
+        self.assertEqual(packet_flits(128, 256), 4)
+        self.assertEqual(packet_flits(0, 256), 1)
+        self.assertEqual(packet_flits(None, 256), 1)
+
+    def test_tail_arrives_after_body_flits(self):
+        for backend in BACKENDS:
+            small, _, _ = send_line(backend, 4)
+            large, mesh, _ = send_line(backend, 128)
+            delay = large.arrivals[0] - small.arrivals[0]
+            if backend == "router":
+                # The reference model's hop timing shifts with extra events
+                self.assertGreaterEqual(delay, 3)
+            else:
+                # Wormhole timing: the 4-flit packet pays serialization once
+                self.assertEqual(delay, 3, backend)
+            if backend in ("router", "flat"):
+                assert_drained(self, mesh)
+
+    def test_link_bandwidth_matches_bitwidth(self):
+        for backend in BACKENDS:
+            dst, mesh, _ = send_line(backend, 128, num_packets=6)
+            self.assertEqual(dst.received, 6, backend)
+            gaps = [b - a for a, b in zip(dst.arrivals, dst.arrivals[1:])]
+            # Each packet holds the links for four cycles
+            self.assertGreaterEqual(min(gaps), 4, backend)
+            if backend in ("router", "flat"):
+                assert_drained(self, mesh)
+
+    def test_events_per_packet_do_not_grow_with_size(self):
+        for backend in ("router", "flat"):
+            # Stage and release events are reused once every router has
+            # allocated them
+            _, _, created = send_line(backend, 128, length=6, rounds=4)
+            self.assertEqual(created[-1], ["GENERATE", "PACKET"], backend)
+
+    def test_noc_stats_count_flits(self):
+        from sim_core.noc_stats import NocStats
+        for backend in ("router", "flat", "vector"):
+            if backend not in BACKENDS:
+                continue
+            engine = SimulatorEngine()
+            mesh_info = {"mesh_size": (3, 1), "router_map": None}
+            mesh = create_mesh(engine, 3, 1, mesh_info, backend=backend, bitwidth=128)
+            mesh_info["router_map"] = mesh
+            stats = NocStats(mesh)
+            src = SizedSource(engine, "SRC", mesh_info, (0, 0), (2, 0),
+                              num_packets=1, data_size=64)
+            dst = RecordingSink(engine, "DST", mesh_info, (2, 0))
+            mesh[(0, 0)].attach_module(src)
+            mesh[(2, 0)].attach_module(dst)
+            engine.register_module(src)
+            engine.register_module(dst)
+            src.start()
+            engine.run_until_idle(max_tick=1000)
+            # Three routers forward four 128-bit flits each
+            self.assertEqual(int(stats.flits.sum()), 12, backend)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import math
+import pickle
+import random
+import statistics
+
+from sim_core.stats import (
+    BatchMeans, LatencyStats, QuantileSketch, RunningStats, mser_truncation, t_quantile,
+)
+
+
+class StreamingStatsTest(unittest.TestCase):
+    def test_running_stats_merge(self):
+        rng = random.Random(3)
+        data = [rng.expovariate(0.1) for _ in range(1000)]
+        a, b, full = RunningStats(), RunningStats(), RunningStats()
+        for x in data[:300]:
+            a.add(x)
+        for x in data[300:]:
+            b.add(x)
+        for x in data:
+            full.add(x)
+        a.merge(b)
+        self.assertEqual(a.count, 1000)
+        self.assertAlmostEqual(a.mean, statistics.mean(data))
+        self.assertAlmostEqual(a.variance, statistics.variance(data))
+        self.assertAlmostEqual(a.variance, full.variance)
+        self.assertEqual(a.max, max(data))
+
+    def test_quantile_sketch_accuracy(self):
+        rng = random.Random(5)
+        data = [rng.randint(1, 5000) for _ in range(20000)]
+        sketches = [QuantileSketch(0.01) for _ in range(4)]
+        for i, x in enumerate(data):
+            sketches[i % 4].add(x)
+        merged = sketches[0]
+        for s in sketches[1:]:
+            merged.merge(s)
+        data.sort()
+        for q in (0.5, 0.99, 0.999):
+            exact = data[math.floor(q * (len(data) - 1))]
+            self.assertLessEqual(abs(merged.quantile(q) - exact), 0.01 * exact + 1e-9)
+
+    def test_latency_pairs(self):
+        stats = LatencyStats()
+        stats.add(10, (0, 0), (1, 0))
+        stats.add(20, (0, 0), (1, 0))
+        other = LatencyStats()
+        other.add(0, (1, 0), (0, 0))
+        stats = pickle.loads(pickle.dumps(stats)).merge(other)
+        self.assertEqual(stats.count, 3)
+        self.assertEqual(stats.pair_summary()[((0, 0), (1, 0))][:2], (2, 15.0))
+        self.assertEqual(stats.quantile(0.0), 0.0)
+        self.assertEqual(stats.summary()["max"], 20)
+
+    def test_merged_keeps_pairs(self):
+        a = LatencyStats()
+        a.add(10, (0, 0), (1, 0))
+        b = LatencyStats()
+        b.add(30, (0, 0), (1, 0))
+        b.add(5, (1, 0), (0, 0))
+        merged = LatencyStats.merged(iter([a, b]))
+        self.assertTrue(merged.track_pairs)
+        self.assertEqual(merged.pair_summary()[((0, 0), (1, 0))][:2], (2, 20.0))
+        self.assertEqual(merged.pair_summary()[((1, 0), (0, 0))][:2], (1, 5.0))
+        untracked = [LatencyStats(track_pairs=False), LatencyStats(track_pairs=False)]
+        untracked[0].add(7, (0, 0), (1, 0))
+        merged = LatencyStats.merged(untracked)
+        self.assertFalse(merged.track_pairs)
+        self.assertEqual(merged.count, 1)
+        self.assertEqual(merged.pairs, {})
+
+    def test_t_quantile(self):
+        self.assertAlmostEqual(t_quantile(0.975, 19), 2.093, places=2)
+        self.assertAlmostEqual(t_quantile(0.975, 5), 2.571, places=2)
+        self.assertAlmostEqual(t_quantile(0.95, 1e9), 1.645, places=3)
+
+    def test_mser_finds_transient(self):
+        rng = random.Random(1)
+        transient = [50 - 0.5 * i for i in range(80)]
+        steady = [10 + rng.gauss(0, 2) for _ in range(400)]
+        d = mser_truncation(transient + steady)
+        self.assertTrue(60 <= d <= 85, d)
+        # Still inside the transient: the warm-up is not over yet
+        self.assertIsNone(mser_truncation(transient + steady[:20]))
+
+    def test_batch_means_interval(self):
+        rng = random.Random(2)
+        covered = 0
+        for _ in range(100):
+            batches = BatchMeans()
+            for _ in range(1000):
+                batches.add(rng.expovariate(0.1))
+            mean, half = batches.interval(num_batches=20)
+            covered += abs(mean - 10) <= half
+        self.assertEqual(batches.count, 1000)
+        self.assertTrue(88 <= covered <= 100, covered)
+        self.assertIsNone(BatchMeans().interval())
+
+
+if __name__ == "__main__":
+    unittest.main()
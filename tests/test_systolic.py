@@ -0,0 +1,79 @@
+import unittest
+
+from sim_core.event import Event
+from sim_hw import systolic
+from sim_hw.systolic import SystolicArray
+from tests.test_npu_extended import setup_env
+
+
+def run_gemm_program(gemm=None, cmd_opcode_cycles=3):
+    """Cycles from dispatch to completion of one ``NPU_CMD`` on a 4x4 array."""
+    engine, cp = setup_env()
+    cp.npus[0].systolic = SystolicArray(4, 4)
+    cfg = {
+        "program_cycles": 3,
+        "in_size": 16,
+        "out_size": 16,
+        "dma_in_opcode_cycles": 2,
+        "dma_out_opcode_cycles": 2,
+        "cmd_opcode_cycles": cmd_opcode_cycles,
+    }
+    cp.load_program("gemm", [
+        {"event_type": "NPU_DMA_IN", "payload": dict(cfg, stream_id="A", eaddr=0, iaddr=0)},
+        {"event_type": "NPU_CMD", "payload": dict(cfg, stream_id="A", gemm=gemm)},
+    ])
+    cp.send_event(Event(src=None, dst=cp, cycle=1, program="gemm", event_type="RUN_PROGRAM"))
+    engine.run_until_idle(max_tick=5000)
+    entry = cp.program_scoreboards["gemm"]["entries"][1]
+    return entry["complete_cycle"] - entry["dispatch_cycle"]
+
+
+class SystolicArrayTest(unittest.TestCase):
+    def test_fold_latency(self):
+        array = SystolicArray(4, 4)
+        # One fold: preload 4, skew 4 + 4 - 2, stream the 10 rows of A
+        self.assertEqual(array.gemm_cycles(10, 4, 4), 20)
+        # Output stationary folds M instead and streams K
+        self.assertEqual(array.gemm_cycles(10, 4, 4, dataflow="os"), 3 * 14)
+        self.assertEqual(array.gemm_cycles(10, 4, 4, dtype="fp32"), 50)
+        self.assertEqual(array.gemm_cycles(10, 9, 4), 3 * 20)
+
+    def test_ragged_tiles_lose_utilization(self):
+        array = SystolicArray(128, 128)
+        full = array.utilization(1024, 128, 128)
+        ragged = array.utilization(1024, 129, 129)
+        self.assertGreater(full, 0.7)
+        self.assertLess(ragged, full / 3)
+        self.assertLessEqual(array.utilization(4096, 4096, 4096), 1.0)
+
+    def test_latency_is_memoized(self):
+        array = SystolicArray(32, 16)
+        before = systolic.cache_info()
+        first = array.gemm_cycles(321, 77, 999)
+        # A separate array with the same configuration shares the entry
+        self.assertEqual(SystolicArray(32, 16).gemm_cycles(321, 77, 999), first)
+        after = systolic.cache_info()
+        self.assertEqual(after.misses - before.misses, 1)
+        self.assertEqual(after.hits - before.hits, 1)
+        self.assertNotEqual(SystolicArray(16, 32).gemm_cycles(321, 77, 999), first)
+
+    def test_npu_times_gemm_commands(self):
+        gemm = {"m": 24, "n": 8, "k": 6, "dtype": "int8", "dataflow": "os"}
+        cycles = SystolicArray(4, 4).command_cycles(gemm)
+        self.assertEqual(cycles, 12 * 16)
+        by_shape = run_gemm_program(gemm)
+        by_hand = run_gemm_program(cmd_opcode_cycles=cycles)
+        self.assertEqual(by_shape, by_hand)
+        self.assertGreater(by_shape, cycles)
+
+    def test_option_checks(self):
+        with self.assertRaises(ValueError):
+            SystolicArray(dataflow="rs")
+        with self.assertRaises(ValueError):
+            SystolicArray().gemm_cycles(8, 8, 8, dtype="fp8")
+        with self.assertRaises(ValueError):
+            SystolicArray().gemm_cycles(0, 8, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
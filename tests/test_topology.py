@@ -0,0 +1,161 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.router import DIR_INDEX
+from sim_core.topology import (
+    create_cmesh,
+    create_ring,
+    create_torus,
+    hop_distances,
+    ring_offset,
+    topology_summary,
+)
+from tests.test_flat_router import RecordingSink
+from tests.test_timeline import PacketSource
+from tests.test_traffic.traffic_gen import TrafficGenerator
+from tests.test_traffic.uniform_traffic import run_uniform_traffic_with_mesh
+
+
+def assert_drained(test, mesh):
+    for router in set(mesh.values()):
+        for port, neighbor in enumerate(router.output_links):
+            if neighbor[1] is None:
+                continue
+            test.assertEqual(router.credit_counts[port],
+                             [router.buffer_capacity] * router.port_num_vcs[port],
+                             (router.name, port))
+
+
+class TopologyTest(unittest.TestCase):
+    def test_ring_offset_takes_short_way(self):
+        self.assertEqual(ring_offset(3, 4), -1)
+        self.assertEqual(ring_offset(-3, 8), -3)
+        self.assertEqual(ring_offset(4, 8), 4)
+        self.assertEqual(ring_offset(-1, 2), -1)
+
+    def test_hop_distances(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 4, 4, {})
+        torus = create_torus(engine, 4, 4, {})
+        ring = create_ring(engine, 8, {})
+        self.assertEqual(topology_summary(mesh)["diameter"], 6)
+        self.assertEqual(topology_summary(torus)["diameter"], 4)
+        self.assertEqual(topology_summary(ring)["diameter"], 4)
+        dist = hop_distances(torus)
+        self.assertEqual(dist[0, 15], 2)  # (0, 0) -> (3, 3) over both wraps
+        self.assertTrue((dist == dist.T).all())
+        self.assertLess(topology_summary(torus)["average_hops"],
+                        topology_summary(mesh)["average_hops"])
+
+    def test_torus_routes_over_wrap_link_on_dateline_vc(self):
+        engine = SimulatorEngine()
+        mesh_info = {}
+        torus = create_torus(engine, 5, 3, mesh_info)
+        table = torus[(0, 0)].routing
+        self.assertEqual(table.next_port((0, 0), (4, 0)), DIR_INDEX["W"])
+        self.assertEqual(table.next_port((4, 1), (0, 1)), DIR_INDEX["E"])
+        self.assertEqual(mesh_info["hop_distances"].shape, (15, 15))
+        # Crossing ahead uses VC0, after the dateline VC1
+        before = table.allowed_vcs(torus[(4, 0)], {"dst_coords": (1, 0)}, DIR_INDEX["E"])
+        after = table.allowed_vcs(torus[(0, 0)], {"dst_coords": (1, 0)}, DIR_INDEX["E"])
+        self.assertEqual((before, after), (0b01, 0b10))
+        self.assertIsNone(table.allowed_vcs(torus[(0, 0)], {"dst_coords": (0, 0)}, 0))
+
+    def test_torus_needs_two_vcs(self):
+        with self.assertRaises(ValueError):
+            create_torus(SimulatorEngine(), 4, 4, {}, num_vcs=1)
+        with self.assertRaises(ValueError):
+            create_torus(SimulatorEngine(), 4, 4, {}, routing="o1turn")
+        with self.assertRaises(ValueError):
+            create_torus(SimulatorEngine(), 4, 4, {}, backend="vector")
+
+    def test_torus_delivers_all_packets(self):
+        for topology in ("mesh", "torus"):
+            for backend in ("router", "flat"):
+                random.seed(3)
+                _, engine, mesh = run_uniform_traffic_with_mesh(
+                    x=4, y=4, packets_per_node=10, max_tick=20000,
+                    backend=backend, topology=topology)
+                self.assertFalse(engine.event_queue, (topology, backend))
+                gens = [r.attached_module for r in mesh.values()]
+                self.assertEqual(sum(g.received for g in gens), 160)
+                assert_drained(self, mesh)
+
+    def test_wrap_link_cuts_zero_load_latency(self):
+        arrivals = {}
+        for name in ("mesh", "ring"):
+            for backend in ("router", "flat", "analytic"):
+                engine = SimulatorEngine()
+                mesh_info = {"mesh_size": (6, 1)}
+                if name == "ring":
+                    mesh = create_ring(engine, 6, mesh_info, backend=backend)
+                else:
+                    mesh = create_mesh(engine, 6, 1, mesh_info, backend=backend)
+                mesh_info["router_map"] = mesh
+                src = PacketSource(engine, "SRC", mesh_info, (0, 0), (5, 0), num_packets=1)
+                dst = RecordingSink(engine, "DST", mesh_info, (5, 0))
+                mesh[(0, 0)].attach_module(src)
+                mesh[(5, 0)].attach_module(dst)
+                engine.register_module(src)
+                engine.register_module(dst)
+                src.start()
+                engine.run_until_idle(max_tick=1000)
+                arrivals[name, backend] = dst.arrivals[0]
+        self.assertLess(arrivals["ring", "router"], arrivals["mesh", "router"])
+        self.assertAlmostEqual(arrivals["ring", "analytic"], arrivals["ring", "flat"], delta=1)
+        # One wrap hop instead of five mesh hops, at five cycles per hop
+        self.assertEqual(arrivals["mesh", "flat"] - arrivals["ring", "flat"], 20)
+
+    def test_ring_is_deadlock_free_under_load(self):
+        # Every packet travels 3-5 hops round an 8-router ring, so most
+        # use a wrap link; without dateline VCs this load deadlocks.
+        for backend in ("router", "flat"):
+            engine = SimulatorEngine()
+            mesh_info = {"mesh_size": (8, 1)}
+            ring = create_ring(engine, 8, mesh_info, buffer_capacity=1, backend=backend)
+            mesh_info["router_map"] = ring
+            random.seed(0)
+            gens = []
+            for coords in sorted(ring):
+                tg = TrafficGenerator(engine, f"TG_{coords[0]}", mesh_info, coords, 20,
+                                      injection_rate=0.3)
+                tg.pick_destination = (
+                    lambda x=coords[0]: ((x + random.choice((3, 4, 5))) % 8, 0))
+                ring[coords].attach_module(tg)
+                engine.register_module(tg)
+                tg.start()
+                gens.append(tg)
+            engine.run_until_idle(max_tick=200000)
+            self.assertEqual(sum(g.received for g in gens), 160, backend)
+            assert_drained(self, ring)
+
+    def test_cmesh_endpoints_share_routers(self):
+        for backend in ("router", "flat"):
+            random.seed(4)
+            _, engine, mesh = run_uniform_traffic_with_mesh(
+                x=2, y=2, packets_per_node=10, max_tick=20000, backend=backend,
+                topology="cmesh", concentration=(2, 2))
+            self.assertEqual(len(mesh), 16)
+            routers = set(mesh.values())
+            self.assertEqual(len(routers), 4)
+            router = mesh[(1, 1)]
+            self.assertIs(router, mesh[(0, 0)])
+            self.assertEqual(router.local_ports, (0, 5, 6, 7))
+            self.assertEqual(router.port_num_vcs, [1, 2, 2, 2, 2, 1, 1, 1])
+            gens = [mod for r in routers for mod, _ in
+                    (r.output_links[p] for p in r.local_ports)]
+            self.assertEqual(len(set(gens)), 16)
+            self.assertEqual(sum(g.received for g in gens), 160)
+            self.assertEqual(sum(g.sent for g in gens), 160)
+            assert_drained(self, mesh)
+            # Every packet reached the generator at its destination
+            for coords in mesh:
+                router = mesh[coords]
+                port = router.routing.endpoint_port(coords)
+                self.assertEqual(router.output_links[port][0].coords, coords)
+
+    def test_cmesh_rejects_mesh_backends(self):
+        with self.assertRaises(ValueError):
+            create_cmesh(SimulatorEngine(), 2, 2, {}, backend="analytic")
@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.trace import (
+    TraceRecord,
+    TraceRecorder,
+    TraceWriter,
+    read_header,
+    read_trace,
+    replay_trace,
+)
+from tests.test_multicast import run_cp
+
+
+class TraceTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "noc.trace")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def record_cp(self, multicast=True):
+        recorders = []
+
+        def setup(mesh):
+            recorders.append(TraceRecorder(mesh, self.path))
+
+        _, _, engine = run_cp(6, multicast, setup=setup)
+        recorders[0].close()
+        return recorders[0], engine
+
+    def test_round_trip(self):
+        records = [
+            TraceRecord(5, 0, -1, 0, (1, 0), 0, "DMA_READ", 128, ((3, 1),)),
+            TraceRecord(9, 1, 0, 4, (3, 1), 5, "DMA_READ_REPLY", 0, ((1, 0), (2, 0))),
+            TraceRecord(12, 2, -1, 0, (0, 0), 0, "DMA_READ", 4, ((1, 1),)),
+        ]
+        writer = TraceWriter(self.path, (4, 2))
+        for rec in records:
+            writer.write(rec)
+        writer.close()
+        self.assertEqual(read_header(self.path), (4, 2))
+        self.assertEqual(list(read_trace(self.path)), records)
+        # Two type names plus three fixed-size packet records
+        self.assertLess(os.path.getsize(self.path), 8 + 4 + 2 * 30 + 3 * 40)
+        with open(self.path, "wb") as f:
+            f.write(b"NOTATRACE" * 2)
+        with self.assertRaises(ValueError):
+            read_header(self.path)
+
+    def test_records_cp_traffic_with_dependencies(self):
+        recorder, _ = self.record_cp()
+        records = list(read_trace(self.path))
+        self.assertEqual(len(records), recorder.count)
+        first = records[0]
+        self.assertEqual((first.event_type, first.src, first.dep_id), ("NPU_DMA_IN", (0, 0), -1))
+        self.assertEqual(len(first.dsts), 6)
+        # Every NPU reads its input after the multicast instruction arrives
+        reads = [r for r in records if r.event_type == "DMA_READ"]
+        self.assertEqual(len(reads), 6)
+        self.assertTrue(all(r.dep_id == 0 for r in reads))
+        cycles = [r.cycle for r in records]
+        self.assertEqual(cycles, sorted(cycles))
+        self.assertTrue(all(r.dep_id < r.packet_id for r in records))
+
+    def test_replay_on_bare_mesh(self):
+        _, engine = self.record_cp(multicast=False)
+        full = engine.current_cycle
+        finish = {}
+        for backend in ("router", "flat", "analytic"):
+            replayer, replay_engine = replay_trace(self.path, backend=backend)
+            self.assertEqual((replayer.injected, replayer.received), (60, 60), backend)
+            self.assertFalse(replay_engine.event_queue)
+            finish[backend] = replay_engine.current_cycle
+            self.assertAlmostEqual(finish[backend], full, delta=0.1 * full)
+        # Dependent packets wait for their slower dependencies
+        replayer, replay_engine = replay_trace(self.path, bitwidth=16)
+        self.assertEqual(replayer.received, 60)
+        self.assertGreater(replay_engine.current_cycle, finish["router"])
+
+    def test_recorder_needs_router_backend(self):
+        engine = SimulatorEngine()
+        with self.assertRaises(ValueError):
+            TraceRecorder(create_mesh(engine, 2, 2, {}, backend="analytic"), self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
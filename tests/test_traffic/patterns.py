@@ -0,0 +1,136 @@
+"""Synthetic traffic patterns and injection processes.
+
+A pattern maps a source ``(x, y)`` to a destination on an ``(X, Y)`` mesh:
+
+``uniform``
+    Uniformly random destination.
+``transpose``
+    ``(x, y) -> (y, x)``; the mesh must be square.
+``bit_complement``
+    ``(x, y) -> (X - 1 - x, Y - 1 - y)``.
+``bit_reverse``
+    Reverses the bits of the node id ``y * X + x``; the node count must be
+    a power of two.
+``tornado``
+    Moves ``ceil(k / 2) - 1`` hops along each dimension of ``k`` routers.
+``neighbor``
+    ``(x, y) -> (x + 1, y + 1)`` modulo the mesh size.
+``hotspot``
+    Sends ``hotspot_fraction`` of the packets to ``hotspot`` and the rest
+    uniformly.
+
+An injection process decides each cycle whether a source offers a packet:
+:class:`BernoulliInjection` independently with probability ``rate``,
+:class:`BurstyInjection` in on/off bursts with the same mean rate.
+"""
+
+import random
+
+
+def uniform(src, size):
+    return (random.randrange(size[0]), random.randrange(size[1]))
+
+
+def transpose(src, size):
+    return (src[1], src[0])
+
+
+def bit_complement(src, size):
+    return (size[0] - 1 - src[0], size[1] - 1 - src[1])
+
+
+def bit_reverse(src, size):
+    n = size[0] * size[1]
+    bits = n.bit_length() - 1
+    node = src[1] * size[0] + src[0]
+    rev = int(format(node, f"0{bits}b")[::-1], 2) if bits else 0
+    return (rev % size[0], rev // size[0])
+
+
+def tornado(src, size):
+    return tuple((s + (k + 1) // 2 - 1) % k for s, k in zip(src, size))
+
+
+def neighbor(src, size):
+    return ((src[0] + 1) % size[0], (src[1] + 1) % size[1])
+
+
+PATTERNS = {
+    "uniform": uniform,
+    "transpose": transpose,
+    "bit_complement": bit_complement,
+    "bit_reverse": bit_reverse,
+    "tornado": tornado,
+    "neighbor": neighbor,
+    "hotspot": uniform,
+}
+
+
+def make_pattern(name, mesh_size, hotspot=None, hotspot_fraction=0.2):
+    """Return ``pick(src) -> dst`` for pattern ``name`` on ``mesh_size``."""
+    if name not in PATTERNS:
+        raise ValueError(f"unknown traffic pattern {name!r}")
+    x, y = mesh_size
+    if name == "transpose" and x != y:
+        raise ValueError("transpose traffic needs a square mesh")
+    if name == "bit_reverse" and (x * y) & (x * y - 1):
+        raise ValueError("bit_reverse traffic needs a power-of-two node count")
+    func = PATTERNS[name]
+    if name == "hotspot":
+        target = tuple(hotspot) if hotspot is not None else (x // 2, y // 2)
+
+        def pick(src):
+            if random.random() < hotspot_fraction:
+                return target
+            return func(src, mesh_size)
+        return pick
+    return lambda src: func(src, mesh_size)
+
+
+class BernoulliInjection:
+    """Offer a packet each cycle with probability ``rate``."""
+
+    def __init__(self, rate):
+        self.rate = rate
+
+    def fires(self):
+        return self.rate >= 1.0 or random.random() < self.rate
+
+
+class BurstyInjection:
+    """Two-state Markov on/off source with mean rate ``rate``.
+
+    The source offers a packet every cycle while on.  Bursts last
+    ``burst_length`` cycles on average and the off periods are sized so
+    the long-run fraction of on cycles is ``rate``.
+    """
+
+    def __init__(self, rate, burst_length=8):
+        self.rate = rate
+        self.on = False
+        self.p_off = 1.0 / burst_length
+        if rate >= 1.0:
+            self.p_on = 1.0
+        else:
+            self.p_on = min(1.0, rate * self.p_off / (1.0 - rate))
+
+    def fires(self):
+        if self.on:
+            if random.random() < self.p_off:
+                self.on = False
+        elif random.random() < self.p_on:
+            self.on = True
+        return self.on
+
+
+INJECTIONS = {
+    "bernoulli": BernoulliInjection,
+    "bursty": BurstyInjection,
+}
+
+
+def make_injection(name, rate, **kwargs):
+    """Instantiate the injection process called ``name`` at ``rate``."""
+    if name not in INJECTIONS:
+        raise ValueError(f"unknown injection process {name!r}")
+    return INJECTIONS[name](rate, **kwargs)
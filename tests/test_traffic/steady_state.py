@@ -0,0 +1,141 @@
+"""Uniform traffic runs that stop once the mean latency is known well enough.
+
+Run as ``python -m tests.test_traffic.steady_state`` from the repository
+root.  Latencies are folded into batch means of five packets in delivery
+order.  Every ``check_every`` cycles MSER picks the end of the warm-up on
+those batch means, and the run stops once the batch-means confidence
+interval of the remaining packets is narrower than ``rel_width`` of the
+mean.  :func:`compare_with_fixed` also runs the fixed ``packets_per_node``
+run of :func:`~.uniform_traffic.run_uniform_traffic` and reports the cycles
+and events saved.
+"""
+
+import argparse
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.stats import BatchMeans, LatencyStats
+from .traffic_gen import TrafficGenerator
+
+
+class SampleGenerator(TrafficGenerator):
+    """Traffic generator that also feeds latencies to a shared collector."""
+
+    def __init__(self, *args, samples=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.samples = samples
+
+    def handle_event(self, event):
+        if event.event_type == "PACKET":
+            self.samples.add(self.engine.current_cycle - event.payload.get("start_cycle", 0))
+        super().handle_event(event)
+
+
+def _build(x, y, injection_rate, num_packets, backend, samples):
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (x, y), "router_map": None}
+    mesh = create_mesh(engine, x, y, mesh_info, backend=backend)
+    mesh_info["router_map"] = mesh
+    gens = []
+    for cx in range(x):
+        for cy in range(y):
+            tg = SampleGenerator(engine, f"TG_{cx}_{cy}", mesh_info, (cx, cy), num_packets,
+                                 injection_rate=injection_rate, samples=samples)
+            mesh[(cx, cy)].attach_module(tg)
+            engine.register_module(tg)
+            tg.start()
+            gens.append(tg)
+    return engine, gens
+
+
+def run_until_converged(x=8, y=8, injection_rate=0.1, rel_width=0.05, confidence=0.95,
+                        num_batches=20, check_every=500, max_cycles=1_000_000,
+                        backend="router", seed=1):
+    """Run uniform traffic until the latency interval is narrow enough.
+
+    Returns the mean latency and confidence half width after the warm-up,
+    the warm-up and measured packet counts and the cycles and events run.
+    """
+    random.seed(seed)
+    samples = BatchMeans()
+    engine, gens = _build(x, y, injection_rate, max_cycles, backend, samples)
+    events = 0
+    next_check = check_every
+    warmup = interval = None
+    converged = False
+    while engine.event_queue and engine.current_cycle < max_cycles:
+        engine.tick()
+        events += 1
+        if engine.current_cycle < next_check:
+            continue
+        next_check += check_every
+        warmup = samples.warmup()
+        if warmup is None:
+            continue
+        interval = samples.interval(warmup, num_batches, confidence)
+        if interval is not None and interval[1] <= rel_width * interval[0]:
+            converged = True
+            break
+    mean, half_width = interval if interval is not None else (None, None)
+    skipped = (warmup or 0) * samples.batch_size
+    return {
+        "converged": converged,
+        "mean": mean,
+        "half_width": half_width,
+        "warmup_packets": skipped,
+        "measured_packets": samples.count - skipped,
+        "cycles": engine.current_cycle,
+        "events": events,
+    }
+
+
+def run_fixed(x=8, y=8, injection_rate=0.1, packets_per_node=200, backend="router", seed=1):
+    """Fixed-length run averaging every latency, as ``run_uniform_traffic`` does."""
+    random.seed(seed)
+    engine, gens = _build(x, y, injection_rate, packets_per_node, backend, BatchMeans())
+    events = 0
+    while engine.event_queue:
+        engine.tick()
+        events += 1
+    stats = LatencyStats.merged(g.latency_stats for g in gens)
+    return {"mean": stats.mean, "cycles": engine.current_cycle, "events": events}
+
+
+def compare_with_fixed(packets_per_node=200, **kwargs):
+    """Run both harnesses and report what the adaptive run saved."""
+    adaptive = run_until_converged(**kwargs)
+    fixed_kwargs = {k: v for k, v in kwargs.items()
+                    if k in ("x", "y", "injection_rate", "backend", "seed")}
+    fixed = run_fixed(packets_per_node=packets_per_node, **fixed_kwargs)
+    return {
+        "adaptive": adaptive,
+        "fixed": fixed,
+        "cycles_saved": fixed["cycles"] - adaptive["cycles"],
+        "events_saved": fixed["events"] - adaptive["events"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=0.1)
+    parser.add_argument("--rel-width", type=float, default=0.05)
+    parser.add_argument("--packets", type=int, default=200)
+    parser.add_argument("--backend", default="router")
+    args = parser.parse_args()
+    result = compare_with_fixed(args.packets, x=args.size, y=args.size,
+                                injection_rate=args.rate, rel_width=args.rel_width,
+                                backend=args.backend)
+    adaptive, fixed = result["adaptive"], result["fixed"]
+    print(f"fixed:    mean {fixed['mean']:.2f} cycles, {fixed['cycles']} cycles, "
+          f"{fixed['events']} events")
+    if adaptive["mean"] is not None:
+        print(f"adaptive: mean {adaptive['mean']:.2f} +/- {adaptive['half_width']:.2f} cycles "
+              f"after {adaptive['warmup_packets']} warm-up packets, "
+              f"{adaptive['cycles']} cycles, {adaptive['events']} events")
+    print(f"saved {result['cycles_saved']} cycles and {result['events_saved']} events")
+
+
+if __name__ == "__main__":
+    main()
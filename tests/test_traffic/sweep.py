@@ -0,0 +1,207 @@
+"""Latency-vs-load sweeps and saturation throughput search.
+
+Run as ``python -m tests.test_traffic.sweep`` from the repository root.
+Every load point is an independent open-loop run: each endpoint offers
+packets at ``rate`` packets per cycle for ``cycles`` cycles, packets
+generated after ``warmup`` are measured and the network then drains.  Load
+points run in parallel worker processes.
+
+The saturation throughput is the highest offered rate at which the network
+still accepts what is offered and the mean latency stays below
+``latency_factor`` times the zero-load latency.  :func:`find_saturation`
+narrows the bracket by testing ``workers`` rates at once, so with one
+worker it is a plain bisection.
+"""
+
+import argparse
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from sim_core.engine import SimulatorEngine
+from sim_core.stats import LatencyStats
+from sim_core.topology import TOPOLOGIES, attach_endpoint
+from .patterns import make_injection, make_pattern
+from .traffic_gen import TrafficGenerator
+
+
+class WindowedGenerator(TrafficGenerator):
+    """Traffic generator that stops at ``stop_cycle`` and measures a window.
+
+    Only packets generated at or after ``warmup`` count towards the
+    latency statistics; ``offered`` and ``accepted`` count packets
+    generated and received in ``[warmup, stop_cycle)``.
+    """
+
+    def __init__(self, *args, warmup=0, stop_cycle=1000, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.warmup = warmup
+        self.stop_cycle = stop_cycle
+        self.offered = 0
+        self.accepted = 0
+
+    def handle_event(self, event):
+        now = self.engine.current_cycle
+        if event.event_type == "GENERATE":
+            if now >= self.stop_cycle:
+                self.num_packets = self.sent
+            elif now >= self.warmup:
+                sent = self.sent
+                super().handle_event(event)
+                self.offered += self.sent - sent
+                return
+        if event.event_type == "PACKET":
+            self.received += 1
+            if self.warmup <= now < self.stop_cycle:
+                self.accepted += 1
+            start = event.payload.get("start_cycle", 0)
+            if start >= self.warmup:
+                self.latency_stats.add(now - start, event.payload.get("src_coords"),
+                                       self.coords)
+            return
+        super().handle_event(event)
+
+
+def run_load_point(rate, pattern="uniform", injection="bernoulli", x=8, y=8, cycles=1000,
+                   warmup=200, backend="router", topology="mesh", seed=1,
+                   burst_length=8, max_tick=5_000_000, **topology_kwargs):
+    """Run one load point and return its offered/accepted rates and latency.
+
+    ``topology_kwargs`` (``routing``, ``pipeline`` ...) go to the topology
+    builder.  ``delivered`` is False when ``max_tick`` events ran before the
+    network drained.  Packets left undelivered once no events are pending
+    raise ``RuntimeError``.
+    """
+    random.seed(seed)
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (x, y), "router_map": None}
+    mesh = TOPOLOGIES[topology](engine, x, y, mesh_info, backend=backend, **topology_kwargs)
+    mesh_info["router_map"] = mesh
+    pick = make_pattern(pattern, mesh_info["mesh_size"])
+    kwargs = {"burst_length": burst_length} if injection == "bursty" else {}
+    gens = []
+    for coords in sorted(mesh):
+        tg = WindowedGenerator(engine, f"TG_{coords[0]}_{coords[1]}", mesh_info, coords,
+                               num_packets=cycles, pattern=pick,
+                               injection=make_injection(injection, rate, **kwargs),
+                               warmup=warmup, stop_cycle=cycles)
+        attach_endpoint(mesh, coords, tg)
+        engine.register_module(tg)
+        tg.start()
+        gens.append(tg)
+    ticks = 0
+    while engine.event_queue and ticks < max_tick:
+        engine.tick()
+        ticks += 1
+    sent = sum(g.sent for g in gens)
+    received = sum(g.received for g in gens)
+    if not engine.event_queue and received != sent:
+        # Nothing left to move them: a simulator bug, not saturation
+        raise RuntimeError(f"{sent - received} of {sent} packets stranded with no "
+                           f"events pending at rate {rate}")
+    stats = LatencyStats.merged(g.latency_stats for g in gens)
+    window = len(gens) * (cycles - warmup)
+    return {
+        "rate": rate,
+        "offered": sum(g.offered for g in gens) / window,
+        "accepted": sum(g.accepted for g in gens) / window,
+        "latency": stats.mean,
+        "p99": stats.quantile(0.99) if stats.count else 0.0,
+        "delivered": received == sent,
+    }
+
+
+def _run_point(args):
+    rate, kwargs = args
+    return run_load_point(rate, **kwargs)
+
+
+def run_points(rates, workers=1, **kwargs):
+    """Run ``run_load_point`` for every rate, in ``workers`` processes."""
+    jobs = [(rate, kwargs) for rate in rates]
+    if workers <= 1:
+        return [_run_point(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_run_point, jobs))
+
+
+def is_saturated(point, zero_load, latency_factor=3.0, acceptance=0.95):
+    """True when ``point`` no longer keeps up with its offered load.
+
+    A point that did not drain within ``max_tick`` counts as saturated.
+    """
+    if not point["delivered"]:
+        return True
+    if point["accepted"] < acceptance * point["offered"]:
+        return True
+    return point["latency"] > latency_factor * zero_load
+
+
+def find_saturation(low=0.0, high=1.0, tolerance=0.01, workers=1, latency_factor=3.0,
+                    zero_load_rate=0.01, **kwargs):
+    """Return ``(saturation_rate, points)`` for the traffic given by ``kwargs``.
+
+    ``points`` holds every load point run, sorted by rate.
+    """
+    points = run_points([zero_load_rate], 1, **kwargs)
+    zero_load = points[0]["latency"]
+    while high - low > tolerance:
+        step = (high - low) / (workers + 1)
+        rates = [low + step * (i + 1) for i in range(workers)]
+        results = run_points(rates, workers, **kwargs)
+        points.extend(results)
+        below = [p["rate"] for p in results if not is_saturated(p, zero_load, latency_factor)]
+        above = [p["rate"] for p in results if is_saturated(p, zero_load, latency_factor)]
+        low = max(below + [low])
+        high = min([r for r in above if r > low] + [high])
+    points.sort(key=lambda p: p["rate"])
+    return low, points
+
+
+def latency_curve(rates, workers=1, **kwargs):
+    """Latency-vs-load points for ``rates``."""
+    return run_points(rates, workers, **kwargs)
+
+
+def save_html(curves, path="latency_load.html"):
+    """Plot ``{label: points}`` latency-vs-offered-load curves with Plotly."""
+    try:
+        import plotly.graph_objects as go
+    except Exception as e:
+        print("Plotly not available:", e)
+        return
+    fig = go.Figure()
+    for label, points in curves.items():
+        fig.add_trace(go.Scatter(x=[p["offered"] for p in points],
+                                 y=[p["latency"] for p in points],
+                                 mode="lines+markers", name=label))
+    fig.update_layout(title="Latency vs offered load",
+                      xaxis_title="offered load (packets/node/cycle)",
+                      yaxis_title="mean latency (cycles)")
+    fig.write_html(path, include_plotlyjs=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--patterns", nargs="+", default=["uniform", "transpose", "tornado"])
+    parser.add_argument("--injection", default="bernoulli", choices=["bernoulli", "bursty"])
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--cycles", type=int, default=1000)
+    parser.add_argument("--backend", default="router")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--points", type=int, default=8)
+    parser.add_argument("--html", default="latency_load.html")
+    args = parser.parse_args()
+    common = dict(injection=args.injection, x=args.size, y=args.size, cycles=args.cycles,
+                  warmup=args.cycles // 5, backend=args.backend)
+    curves = {}
+    print(f"{'pattern':15s} {'saturation':>10s}")
+    for pattern in args.patterns:
+        sat, _ = find_saturation(tolerance=0.02, workers=args.workers, pattern=pattern, **common)
+        rates = [sat * (i + 1) / args.points for i in range(args.points)]
+        curves[pattern] = latency_curve(rates, args.workers, pattern=pattern, **common)
+        print(f"{pattern:15s} {sat:10.3f}")
+    save_html(curves, args.html)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import unittest
+import random
+
+from .patterns import BurstyInjection, make_injection, make_pattern
+from .sweep import find_saturation, is_saturated, run_load_point
+
+
+class PatternTest(unittest.TestCase):
+    def test_permutations(self):
+        size = (4, 4)
+        self.assertEqual(make_pattern("transpose", size)((1, 3)), (3, 1))
+        self.assertEqual(make_pattern("bit_complement", size)((1, 3)), (2, 0))
+        # Node 1 = 0b0001 -> 0b1000 = node 8 = (0, 2)
+        self.assertEqual(make_pattern("bit_reverse", size)((1, 0)), (0, 2))
+        self.assertEqual(make_pattern("tornado", (8, 1))((6, 0)), (1, 0))
+        self.assertEqual(make_pattern("neighbor", size)((3, 1)), (0, 2))
+        for name in ("transpose", "bit_complement", "bit_reverse", "tornado", "neighbor"):
+            pick = make_pattern(name, size)
+            dsts = {pick((x, y)) for x in range(4) for y in range(4)}
+            self.assertEqual(len(dsts), 16, name)
+        with self.assertRaises(ValueError):
+            make_pattern("transpose", (4, 2))
+        with self.assertRaises(ValueError):
+            make_pattern("bit_reverse", (3, 3))
+        with self.assertRaises(ValueError):
+            make_pattern("shuffle", size)
+
+    def test_hotspot(self):
+        random.seed(0)
+        pick = make_pattern("hotspot", (4, 4), hotspot=(1, 1), hotspot_fraction=0.5)
+        hits = sum(pick((0, 0)) == (1, 1) for _ in range(4000))
+        self.assertAlmostEqual(hits / 4000, 0.5 + 0.5 / 16, delta=0.03)
+
+    def test_injection_rates(self):
+        random.seed(1)
+        for name in ("bernoulli", "bursty"):
+            inj = make_injection(name, 0.2)
+            fired = [inj.fires() for _ in range(50000)]
+            self.assertAlmostEqual(sum(fired) / len(fired), 0.2, delta=0.02, msg=name)
+        bursty = BurstyInjection(0.2, burst_length=10)
+        runs, run = [], 0
+        for _ in range(50000):
+            if bursty.fires():
+                run += 1
+            elif run:
+                runs.append(run)
+                run = 0
+        self.assertAlmostEqual(sum(runs) / len(runs), 10, delta=1.5)
+
+    def test_saturation_search(self):
+        sat, points = find_saturation(tolerance=0.15, workers=2, x=4, y=4, cycles=200,
+                                      warmup=50, backend="flat")
+        self.assertTrue(0.2 < sat < 0.7)
+        rates = [p["rate"] for p in points]
+        self.assertEqual(rates, sorted(rates))
+        zero_load = points[0]["latency"]
+        for p in points[1:]:
+            self.assertTrue(p["delivered"])
+            self.assertEqual(is_saturated(p, zero_load), p["rate"] > sat, p["rate"])
+
+    def test_load_point(self):
+        point = dict(x=4, y=4, cycles=200, warmup=50, backend="flat")
+        zero_load = run_load_point(0.01, **point)["latency"]
+        uniform = run_load_point(0.25, **point)
+        tornado = run_load_point(0.25, pattern="tornado", **point)
+        self.assertFalse(is_saturated(uniform, zero_load))
+        self.assertAlmostEqual(uniform["accepted"], uniform["offered"], delta=0.02)
+        # All tornado packets turn the same way, so they share links
+        self.assertGreater(tornado["latency"], uniform["latency"])
+
+    def test_overload_drains(self):
+        # Far past saturation every packet still arrives, so the rate is
+        # judged saturated on acceptance rather than on stranded packets
+        for backend, pattern in (("flat", "transpose"), ("vector", "bit_complement")):
+            point = run_load_point(0.6, pattern=pattern, x=4, y=4, cycles=300, warmup=50,
+                                   backend=backend)
+            self.assertTrue(point["delivered"], backend)
+            self.assertLess(point["accepted"], 0.95 * point["offered"], backend)
+            self.assertTrue(is_saturated(point, point["latency"]), backend)
+
+
+if __name__ == "__main__":
+    unittest.main()
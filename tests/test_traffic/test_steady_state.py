@@ -0,0 +1,26 @@
+import unittest
+
+from .steady_state import compare_with_fixed, run_until_converged
+
+
+class SteadyStateTest(unittest.TestCase):
+    def test_stops_early_with_narrow_interval(self):
+        result = compare_with_fixed(200, x=4, y=4, injection_rate=0.1, rel_width=0.05,
+                                    backend="flat")
+        adaptive, fixed = result["adaptive"], result["fixed"]
+        self.assertTrue(adaptive["converged"])
+        self.assertLessEqual(adaptive["half_width"], 0.05 * adaptive["mean"])
+        self.assertAlmostEqual(adaptive["mean"], fixed["mean"], delta=2 * adaptive["half_width"])
+        self.assertGreater(result["cycles_saved"], 0)
+        self.assertGreater(result["events_saved"], 0)
+
+    def test_tighter_target_runs_longer(self):
+        loose = run_until_converged(x=4, y=4, rel_width=0.05, backend="flat", check_every=100)
+        tight = run_until_converged(x=4, y=4, rel_width=0.01, backend="flat", check_every=100)
+        self.assertTrue(tight["converged"])
+        self.assertGreater(tight["measured_packets"], loose["measured_packets"])
+        self.assertGreater(tight["events"], loose["events"])
+
+
+if __name__ == "__main__":
+    unittest.main()
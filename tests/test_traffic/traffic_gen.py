@@ -1,16 +1,31 @@
 from sim_core.module import HardwareModule
 from sim_core.event import Event
+from sim_core.stats import LatencyStats
 import random
 
 class TrafficGenerator(HardwareModule):
-    """Generates uniform random traffic and records latency."""
-    def __init__(self, engine, name, mesh_info, coords, num_packets=10, buffer_capacity=4):
+    """Generates uniform random traffic and records latency.
+
+    ``injection_rate`` is the probability of offering a packet each cycle.
+    ``pattern`` (a :func:`~.patterns.make_pattern` name or ``pick(src)``
+    callable) and ``injection`` (an object with ``fires()``, see
+    :mod:`.patterns`) replace the uniform destinations and the Bernoulli
+    injection.
+    """
+    def __init__(self, engine, name, mesh_info, coords, num_packets=10, buffer_capacity=4,
+                 injection_rate=1.0, pattern=None, injection=None):
         super().__init__(engine, name, mesh_info, buffer_capacity)
         self.coords = coords
         self.num_packets = num_packets
+        self.injection_rate = injection_rate
+        if isinstance(pattern, str):
+            from .patterns import make_pattern
+            pattern = make_pattern(pattern, mesh_info["mesh_size"])
+        self.pattern = pattern
+        self.injection = injection
         self.sent = 0
         self.received = 0
-        self.latencies = []
+        self.latency_stats = LatencyStats()
 
     def start(self):
         evt = Event(src=self, dst=self, cycle=self.engine.current_cycle + 1,
@@ -20,14 +35,25 @@ class TrafficGenerator(HardwareModule):
     def get_my_router(self):
         return self.mesh_info["router_map"][self.coords]
 
+    def offers_packet(self):
+        if self.injection is not None:
+            return self.injection.fires()
+        return self.injection_rate >= 1.0 or random.random() < self.injection_rate
+
+    def pick_destination(self):
+        if self.pattern is not None:
+            return self.pattern(self.coords)
+        x_max, y_max = self.mesh_info["mesh_size"]
+        return (random.randrange(x_max), random.randrange(y_max))
+
     def handle_event(self, event):
         if event.event_type == "GENERATE":
-            if self.sent < self.num_packets:
-                x_max, y_max = self.mesh_info["mesh_size"]
-                dst = (random.randrange(x_max), random.randrange(y_max))
+            if self.sent < self.num_packets and self.offers_packet():
+                dst = self.pick_destination()
                 payload = {
                     "dst_coords": dst,
                     "start_cycle": self.engine.current_cycle,
+                    "src_coords": self.coords,
                     "input_port": 0,
                     "vc": 0,
                 }
@@ -43,7 +69,22 @@ class TrafficGenerator(HardwareModule):
                 self.engine.push_event(nxt)
         elif event.event_type == "PACKET":
             latency = self.engine.current_cycle - event.payload.get("start_cycle", 0)
-            self.latencies.append(latency)
+            self.latency_stats.add(latency, event.payload.get("src_coords"), self.coords)
             self.received += 1
         else:
             super().handle_event(event)
+
+
+class HotspotTrafficGenerator(TrafficGenerator):
+    """Sends a ``hotspot_fraction`` of packets to ``hotspot`` coordinates."""
+    def __init__(self, engine, name, mesh_info, coords, num_packets=10, buffer_capacity=4,
+                 injection_rate=1.0, hotspot=(0, 0), hotspot_fraction=0.2):
+        super().__init__(engine, name, mesh_info, coords, num_packets, buffer_capacity,
+                         injection_rate)
+        self.hotspot = tuple(hotspot)
+        self.hotspot_fraction = hotspot_fraction
+
+    def pick_destination(self):
+        if random.random() < self.hotspot_fraction:
+            return self.hotspot
+        return super().pick_destination()
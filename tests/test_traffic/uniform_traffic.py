@@ -1,15 +1,17 @@
 from sim_core.engine import SimulatorEngine
 from sim_core.mesh import create_mesh
+from sim_core.stats import LatencyStats
+from sim_core.topology import TOPOLOGIES, attach_endpoint
 from .traffic_gen import TrafficGenerator
 
 
-def run_uniform_traffic(x=16, y=16, packets_per_node=20, max_tick=10000):
+def run_uniform_traffic(x=16, y=16, packets_per_node=20, max_tick=10000, backend="router"):
     engine = SimulatorEngine()
     mesh_info = {
         "mesh_size": (x, y),
         "router_map": None,
     }
-    mesh = create_mesh(engine, x, y, mesh_info)
+    mesh = create_mesh(engine, x, y, mesh_info, backend=backend)
     mesh_info["router_map"] = mesh
 
     gens = []
@@ -24,33 +26,41 @@ def run_uniform_traffic(x=16, y=16, packets_per_node=20, max_tick=10000):
 
     engine.run_until_idle(max_tick=max_tick)
 
-    latencies = [lat for g in gens for lat in g.latencies]
-    avg = sum(latencies) / len(latencies) if latencies else 0
+    stats = LatencyStats.merged(g.latency_stats for g in gens)
+    avg = stats.mean
     print(f"Generated packets: {sum(g.sent for g in gens)}")
     print(f"Received packets: {sum(g.received for g in gens)}")
     print(f"Average waiting time: {avg:.2f} cycles")
+    if stats.count:
+        print(f"p50/p99/p999: {stats.quantile(0.5):.1f}/{stats.quantile(0.99):.1f}/"
+              f"{stats.quantile(0.999):.1f} cycles")
     return avg
 
 
-def run_uniform_traffic_with_mesh(x=16, y=16, packets_per_node=20, max_tick=10000):
-    """Run uniform traffic and return engine and mesh for inspection."""
+def run_uniform_traffic_with_mesh(x=16, y=16, packets_per_node=20, max_tick=10000,
+                                  backend="router", routing="xy", topology="mesh",
+                                  **topology_kwargs):
+    """Run uniform traffic and return engine and mesh for inspection.
+
+    ``x`` and ``y`` give the router grid of ``topology`` (a key of
+    :data:`sim_core.topology.TOPOLOGIES`); every endpoint gets a generator.
+    """
     engine = SimulatorEngine()
     mesh_info = {"mesh_size": (x, y), "router_map": None}
-    mesh = create_mesh(engine, x, y, mesh_info)
+    mesh = TOPOLOGIES[topology](engine, x, y, mesh_info, backend=backend, routing=routing,
+                                **topology_kwargs)
     mesh_info["router_map"] = mesh
 
     gens = []
-    for cx in range(x):
-        for cy in range(y):
-            tg = TrafficGenerator(engine, f"TG_{cx}_{cy}", mesh_info, (cx, cy), packets_per_node)
-            mesh[(cx, cy)].attach_module(tg)
-            engine.register_module(tg)
-            tg.start()
-            gens.append(tg)
+    for cx, cy in sorted(mesh):
+        tg = TrafficGenerator(engine, f"TG_{cx}_{cy}", mesh_info, (cx, cy), packets_per_node)
+        attach_endpoint(mesh, (cx, cy), tg)
+        engine.register_module(tg)
+        tg.start()
+        gens.append(tg)
 
     engine.run_until_idle(max_tick=max_tick)
-    latencies = [lat for g in gens for lat in g.latencies]
-    avg = sum(latencies) / len(latencies) if latencies else 0
+    avg = LatencyStats.merged(g.latency_stats for g in gens).mean
     return avg, engine, mesh
 
 
@@ -0,0 +1,137 @@
+"""Compare the analytical NoC model against a detailed router backend.
+
+Run as ``python -m tests.test_traffic.validate_analytic`` from the
+repository root.  For uniform and hotspot traffic at several injection
+rates it prints the mean latency of both models, the relative error, the
+wall-clock speedup and the ratio of network events.  Both runs spend the
+same per-cycle events on the traffic generators, which bounds the
+wall-clock speedup at low load; the event ratio counts only the events of
+the network and the endpoints' deliveries.
+
+Rows whose error exceeds ``--tolerance`` are flagged.  Rows where the
+analytical model reports an oversubscribed ejection port
+(:attr:`~sim_core.analytic_mesh.AnalyticMesh.saturated`) are outside its
+range and flagged as such; any other row out of tolerance makes the script
+exit with status 1.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from sim_core.engine import SimulatorEngine
+from sim_core.mesh import create_mesh
+from sim_core.stats import LatencyStats
+from .traffic_gen import TrafficGenerator, HotspotTrafficGenerator
+
+
+def run_pattern(backend, pattern="uniform", x=8, y=8, packets_per_node=50,
+                injection_rate=0.05, seed=1, max_tick=2_000_000):
+    """Run one pattern and return its results as a dict.
+
+    ``stats`` holds the merged latency statistics, ``wall`` the seconds the
+    event loop took, ``received`` the packets delivered, ``noc_events`` the
+    events not addressed to a traffic generator and ``saturated`` the
+    destinations an analytic mesh found oversubscribed.
+    """
+    random.seed(seed)
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (x, y), "router_map": None}
+    mesh = create_mesh(engine, x, y, mesh_info, backend=backend)
+    mesh_info["router_map"] = mesh
+    gens = []
+    for cx in range(x):
+        for cy in range(y):
+            name = f"TG_{cx}_{cy}"
+            if pattern == "hotspot":
+                tg = HotspotTrafficGenerator(engine, name, mesh_info, (cx, cy), packets_per_node,
+                                             injection_rate=injection_rate,
+                                             hotspot=(x // 2, y // 2))
+            else:
+                tg = TrafficGenerator(engine, name, mesh_info, (cx, cy), packets_per_node,
+                                      injection_rate=injection_rate)
+            mesh[(cx, cy)].attach_module(tg)
+            engine.register_module(tg)
+            tg.start()
+            gens.append(tg)
+
+    generators = set(gens)
+    start = time.perf_counter()
+    ticks = 0
+    noc_events = 0
+    while engine.event_queue and ticks < max_tick:
+        if engine.event_queue[0][2].dst not in generators:
+            noc_events += 1
+        engine.tick()
+        ticks += 1
+    wall = time.perf_counter() - start
+    noc = getattr(mesh[(0, 0)], "mesh", None)
+    return {
+        "stats": LatencyStats.merged(g.latency_stats for g in gens),
+        "wall": wall,
+        "received": sum(g.received for g in gens),
+        "noc_events": noc_events,
+        "saturated": sorted(noc.saturated) if noc is not None else [],
+    }
+
+
+def validate(reference="router", patterns=("uniform", "hotspot"),
+             rates=(0.02, 0.05, 0.1), tolerance=0.1, **kwargs):
+    """Return one result row per ``(pattern, rate)``.
+
+    ``ok`` is False for rows whose relative error exceeds ``tolerance``;
+    ``saturated`` lists the destinations outside the analytical model's
+    range.
+    """
+    rows = []
+    for pattern in patterns:
+        for rate in rates:
+            ref = run_pattern(reference, pattern, injection_rate=rate, **kwargs)
+            fast = run_pattern("analytic", pattern, injection_rate=rate, **kwargs)
+            ref_mean = ref["stats"].mean
+            error = (fast["stats"].mean - ref_mean) / ref_mean if ref_mean else 0.0
+            rows.append({
+                "pattern": pattern,
+                "rate": rate,
+                "reference_mean": ref_mean,
+                "analytic_mean": fast["stats"].mean,
+                "error": error,
+                "speedup": ref["wall"] / max(fast["wall"], 1e-9),
+                "event_ratio": ref["noc_events"] / max(fast["noc_events"], 1),
+                "delivered": (ref["received"], fast["received"]),
+                "saturated": fast["saturated"],
+                "ok": abs(error) <= tolerance,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--reference", default="router")
+    parser.add_argument("--size", type=int, default=8)
+    parser.add_argument("--packets", type=int, default=50)
+    parser.add_argument("--rates", type=float, nargs="+", default=[0.02, 0.05, 0.1])
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    rows = validate(args.reference, rates=args.rates, tolerance=args.tolerance,
+                    x=args.size, y=args.size, packets_per_node=args.packets)
+    print(f"{'pattern':8s} {'rate':>5s} {'ref':>8s} {'analytic':>8s} {'error':>7s} "
+          f"{'speedup':>8s} {'events':>7s}")
+    failed = False
+    for r in rows:
+        if r["ok"]:
+            flag = ""
+        elif r["saturated"]:
+            flag = "  out of range: ejection saturated at " + ", ".join(map(str, r["saturated"]))
+        else:
+            flag = "  OUT OF TOLERANCE"
+            failed = True
+        print(f"{r['pattern']:8s} {r['rate']:5.2f} {r['reference_mean']:8.2f} "
+              f"{r['analytic_mean']:8.2f} {r['error'] * 100:6.1f}% {r['speedup']:7.1f}x "
+              f"{r['event_ratio']:6.1f}x{flag}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
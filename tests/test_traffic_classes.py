@@ -0,0 +1,142 @@
+import random
+import unittest
+
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.mesh import create_mesh
+from sim_core.router import DIR_INDEX
+from sim_core.traffic_classes import TrafficClasses
+from tests.test_lookahead import LatencyProbe
+from tests.test_timeline import PacketSink, PacketSource
+from tests.test_traffic.traffic_gen import TrafficGenerator
+
+
+class BulkGenerator(TrafficGenerator):
+    """Traffic generator sending four-flit packets."""
+
+    def send_event(self, event):
+        if event.event_type == "PACKET":
+            event.data_size = 128
+        super().send_event(event)
+
+
+class CommandSource(PacketSource):
+    """Packet source sending an ``NPU_CMD`` packet every ``period`` cycles."""
+
+    def __init__(self, *args, period=10, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.period = period
+
+    def handle_event(self, event):
+        if event.event_type == "GENERATE" and self.engine.current_cycle % self.period:
+            self.start()
+            return
+        super().handle_event(event)
+
+    def send_event(self, event):
+        if event.event_type == "PACKET":
+            event.event_type = "NPU_CMD"
+        super().send_event(event)
+
+
+class CommandSink(PacketSink):
+    def handle_event(self, event):
+        if event.event_type == "NPU_CMD":
+            self.received += 1
+            return
+        super().handle_event(event)
+
+
+def run_bulk_load(backend, classes, rate=0.4, num_packets=60, commands=20):
+    """Mean ``NPU_CMD`` network latency from corner to corner of a 4x4
+    mesh whose other nodes exchange bulk packets."""
+    random.seed(1)
+    engine = SimulatorEngine()
+    mesh_info = {"mesh_size": (4, 4), "router_map": None}
+    mesh = create_mesh(engine, 4, 4, mesh_info, backend=backend)
+    mesh_info["router_map"] = mesh
+    probe = LatencyProbe()
+    for router in mesh.values():
+        router.trace = probe
+    if classes:
+        TrafficClasses(mesh)
+    coords = [c for c in sorted(mesh) if c not in ((0, 0), (3, 3))]
+    modules = []
+    for c in coords:
+        modules.append(BulkGenerator(engine, f"GEN_{c[0]}_{c[1]}", mesh_info, c,
+                                     num_packets=num_packets, injection_rate=rate,
+                                     pattern=lambda src: random.choice(coords)))
+    modules.append(CommandSource(engine, "CMD", mesh_info, (0, 0), (3, 3), num_packets=commands))
+    sink = CommandSink(engine, "SINK", mesh_info, (3, 3))
+    for mod in modules + [sink]:
+        mesh[mod.coords].attach_module(mod)
+        engine.register_module(mod)
+    for mod in modules:
+        mod.start()
+    engine.run_until_idle(max_tick=5_000_000)
+    assert not engine.event_queue
+    assert sink.received == commands
+    assert sum(g.received for g in modules[:-1]) == len(coords) * num_packets
+    return probe.mean("NPU_CMD")
+
+
+class TrafficClassesTest(unittest.TestCase):
+    def test_event_types_map_to_reserved_vcs(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend="flat", num_vcs=4)
+        classes = TrafficClasses(mesh)
+        router = mesh[(0, 0)]
+        self.assertIs(router.traffic_classes, classes)
+        cmd = Event(src=None, dst=router, cycle=0, event_type="NPU_CMD_DONE", payload={})
+        read = Event(src=None, dst=router, cycle=0, event_type="DMA_READ", payload={})
+        east = DIR_INDEX["E"]
+        self.assertEqual(classes.names, ["control", "bulk"])
+        self.assertEqual(classes.allowed_vcs(router, cmd, east), 0b1000)
+        self.assertEqual(classes.allowed_vcs(router, read, east), 0b0111)
+        self.assertEqual(classes.allowed_vcs(router, read, east, 0b1010), 0b0010)
+        # Endpoints keep their single VC
+        self.assertIsNone(classes.allowed_vcs(router, cmd, DIR_INDEX["LOCAL"]))
+
+    def test_starvation_limit(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend="flat")
+        classes = TrafficClasses(mesh, starvation_limit=3)
+        router = mesh[(0, 0)]
+        nv = router.num_vcs
+        west = DIR_INDEX["W"] * nv
+        north = DIR_INDEX["N"] * nv
+        router.sa_queues[west].append(
+            Event(src=None, dst=router, cycle=0, event_type="NPU_CMD", payload={}))
+        router.sa_queues[north].append(
+            Event(src=None, dst=router, cycle=0, event_type="DMA_WRITE", payload={}))
+        requests = {west: DIR_INDEX["E"], north: DIR_INDEX["E"]}
+        for _ in range(3):
+            self.assertEqual(classes.prioritize(router, requests), {west: DIR_INDEX["E"]})
+        # The bulk packet has waited long enough to go first
+        self.assertEqual(classes.prioritize(router, requests), {north: DIR_INDEX["E"]})
+        classes.served(router, [north])
+        self.assertEqual(classes.prioritize(router, requests), {west: DIR_INDEX["E"]})
+
+    def test_commands_overtake_bulk_traffic(self):
+        for backend in ("router", "flat"):
+            shared = run_bulk_load(backend, classes=False)
+            reserved = run_bulk_load(backend, classes=True)
+            # Six hops of the five-cycle pipeline plus ejection when unloaded
+            self.assertLess(reserved, 40, backend)
+            self.assertLess(reserved, 0.8 * shared, backend)
+
+    def test_option_checks(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, num_vcs=1)
+        with self.assertRaises(ValueError):
+            TrafficClasses(mesh)
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, routing="o1turn")
+        with self.assertRaises(ValueError):
+            TrafficClasses(mesh)
+        mesh = create_mesh(engine, 2, 2, {"mesh_size": (2, 2)}, backend="analytic")
+        with self.assertRaises(ValueError):
+            TrafficClasses(mesh)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import random
+
+from sim_core.engine import SimulatorEngine
+from sim_core.event import Event
+from sim_core.mesh import create_mesh
+from sim_core.noc_stats import NocStats
+from sim_core.vector_mesh import VectorRouter
+from tests.test_cp_serialization import setup_env
+from tests.test_flat_router import run_line
+from tests.test_traffic.traffic_gen import TrafficGenerator
+from tests.test_traffic.sweep import run_load_point
+from tests.test_traffic.uniform_traffic import run_uniform_traffic_with_mesh
+
+
+class VectorMeshTest(unittest.TestCase):
+    def test_views_share_mesh_state(self):
+        engine = SimulatorEngine()
+        mesh = create_mesh(engine, 3, 2, {"mesh_size": (3, 2)}, backend="vector")
+        self.assertTrue(all(isinstance(r, VectorRouter) for r in mesh.values()))
+        noc = mesh[(0, 0)].mesh
+        self.assertEqual(noc.credits.shape, (6, 5, 2))
+        # Edge ports have no credit, connected ports start full
+        self.assertEqual(int(mesh[(0, 0)].credit_counts[2, 0]), 0)
+        self.assertEqual(int(mesh[(0, 0)].credit_counts[1, 0]), 4)
+
+    def test_single_packet_latency(self):
+        flat, _ = run_line("flat", num_packets=1)
+        vec, _ = run_line("vector", num_packets=1)
+        self.assertEqual(vec.arrivals, flat.arrivals)
+
+    def test_uniform_traffic_drains(self):
+        random.seed(1)
+        _, engine, mesh = run_uniform_traffic_with_mesh(
+            x=4, y=4, packets_per_node=20, max_tick=20000, backend="vector")
+        self.assertFalse(engine.event_queue)
+        noc = mesh[(0, 0)].mesh
+        self.assertEqual(noc.packets, 0)
+        self.assertTrue((noc.alloc == -1).all())
+        for router in mesh.values():
+            for out_port in range(router.num_ports):
+                dest, _ = router.output_links[out_port]
+                if dest is None:
+                    continue
+                for vc in range(router.port_num_vcs[out_port]):
+                    self.assertEqual(router.credit_counts[out_port][vc], dest.buffer_capacity)
+        received = sum(r.attached_module.received for r in mesh.values())
+        self.assertEqual(received, 320)
+
+    def test_early_tick_reschedules(self):
+        engine = SimulatorEngine()
+        noc = create_mesh(engine, 2, 1, {"mesh_size": (2, 1)}, backend="vector")[(0, 0)].mesh
+        noc._schedule_tick(5)
+        _, _, tick = engine.event_queue.pop()
+        engine.current_cycle = 4
+        noc.handle_event(tick)
+        noc._schedule_tick(5)
+        self.assertEqual(len(engine.event_queue), 1)
+
+    def test_saturated_mesh_drains(self):
+        point = run_load_point(0.6, pattern="hotspot", x=4, y=4, cycles=200, warmup=50,
+                               backend="vector", max_tick=500_000)
+        self.assertTrue(point["delivered"])
+
+    def test_noc_stats(self):
+        random.seed(2)
+        engine = SimulatorEngine()
+        mesh_info = {"mesh_size": (4, 4), "router_map": None}
+        mesh = create_mesh(engine, 4, 4, mesh_info, buffer_capacity=2, backend="vector")
+        mesh_info["router_map"] = mesh
+        stats = NocStats(mesh)
+        for (x, y), router in mesh.items():
+            tg = TrafficGenerator(engine, f"TG_{x}_{y}", mesh_info, (x, y), 10)
+            router.attach_module(tg)
+            engine.register_module(tg)
+            tg.start()
+        engine.run_until_idle(max_tick=20000)
+        self.assertEqual(int(stats.flits[:, :, 0, :].sum()), 160)
+        self.assertEqual(int(stats.flits[0, :, 2, :].sum()), 0)
+        self.assertTrue((stats.occupancy_max[:, :, 1:] <= 2).all())
+
+    def test_endpoints_exchange_events(self):
+        engine, cp = setup_env(backend="vector")
+        cfg = {
+            "program_cycles": 3,
+            "in_size": 16,
+            "out_size": 16,
+            "dma_in_opcode_cycles": 2,
+            "dma_out_opcode_cycles": 2,
+            "cmd_opcode_cycles": 3,
+        }
+        instrs = [
+            {"event_type": "NPU_DMA_IN", "payload": dict(cfg, stream_id=0, eaddr=0, iaddr=0)},
+            {"event_type": "NPU_CMD", "payload": dict(cfg, stream_id=0)},
+            {"event_type": "NPU_DMA_OUT", "payload": dict(cfg, stream_id=0, eaddr=64, iaddr=0)},
+        ]
+        cp.load_program("p", instrs)
+        cp.send_event(Event(src=None, dst=cp, cycle=1, program="p", event_type="RUN_PROGRAM"))
+        engine.run_until_idle(max_tick=5000)
+        entries = cp.program_scoreboards["p"]["entries"]
+        self.assertTrue(all(e["complete_cycle"] is not None for e in entries))
+
+
+if __name__ == "__main__":
+    unittest.main()